@@ -0,0 +1,350 @@
+"""
+Measures the number of api calls and the wall time of the compute and
+storage providers against the local stand-in of the oci services in
+fakeoci.py. No cloudmesh.yaml and no credentials are needed and no request
+leaves the machine. Each case starts with a new fake service that is seeded
+with the given number of resources:
+
+    list      lists all vms
+    create    creates scale vms with create_many
+    destroy   destroys --destroy of the scale vms one by one
+    put       uploads a directory with scale files
+    get       downloads scale objects into a directory
+    delete    deletes scale objects
+    search    searches one file among scale objects recursively
+
+Usage::
+
+    python benchmarks/benchmark.py
+    python benchmarks/benchmark.py --scales 10,1000 --latency 0.02 --rate 50
+    python benchmarks/benchmark.py --save before.json
+    python benchmarks/benchmark.py --baseline before.json
+
+With --baseline the results are compared with a saved run and the exit code
+is 1 if a case makes more calls or takes longer than the tolerance allows.
+
+The script can be run from any directory, the cloudmesh.oracle package of
+the checkout it is in is used. The other dependencies (oci and the
+cloudmesh packages) have to be installed.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from time import perf_counter
+
+# the fake service next to this file and the cloudmesh.oracle package of
+# this checkout are used, also if the package is not installed
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+from fakeoci import FakeService  # noqa: E402
+
+from cloudmesh.oracle.Clients import Clients  # noqa: E402
+from cloudmesh.oracle.Metrics import Metrics  # noqa: E402
+
+CLOUD = "oracle"
+
+CREDENTIAL = {
+    'version': '1',
+    'user': "ocid1.user.oc1..benchmark",
+    'fingerprint': "00:00:00:00:00:00:00:00:00:00:00:00:00:00:00:00",
+    'key_file': "~/.oci/oci_api_key.pem",
+    'pass_phrase': None,
+    'tenancy': "ocid1.tenancy.oc1..benchmark",
+    'compartment_id': "ocid1.compartment.oc1..benchmark",
+    'region': "us-ashburn-1"
+}
+
+
+def compute_provider(workdir):
+    """
+    a compute provider that keeps its local state in workdir instead of
+    reading cloudmesh.yaml
+
+    :param workdir: the directory of the network pool, cache and inventory
+    :return: the provider
+    """
+    from cloudmesh.oracle.compute.InstanceCache import InstanceCache
+    from cloudmesh.oracle.compute.Inventory import Inventory
+    from cloudmesh.oracle.compute.NetworkPool import NetworkPool
+    from cloudmesh.oracle.compute.Provider import Provider
+
+    provider = Provider.__new__(Provider)
+    provider.cloud = CLOUD
+    provider.cloudtype = "oracle"
+    provider.default = {"image": "image-0001",
+                        "size": "VM.Standard2.1",
+                        "network": "cloudmesh"}
+    provider.credential = CREDENTIAL
+    provider.compartment_id = CREDENTIAL["compartment_id"]
+    provider.networks = NetworkPool(
+        cloud=CLOUD, filename=os.path.join(workdir, "networks.json"))
+    provider.instances = InstanceCache(
+        cloud=CLOUD, filename=os.path.join(workdir, "instances.json"))
+    provider._inventory = Inventory(
+        cloud=CLOUD, filename=os.path.join(workdir, "inventory.db"))
+    provider._public_ips = None
+    provider.key_path = os.path.join(workdir, "id_rsa.pub")
+    provider._key_val = "ssh-rsa AAAAB3NzaC1yc2E benchmark"
+    return provider
+
+
+def storage_provider(workdir, workers):
+    """
+    a storage provider that keeps its local state in workdir instead of
+    reading cloudmesh.yaml
+
+    :param workdir: the directory of the upload manifests and checksums
+    :param workers: the number of concurrent transfers
+    :return: the provider
+    """
+    from cloudmesh.oracle.storage.Provider import Provider
+
+    provider = Provider.__new__(Provider)
+    provider.cloud = CLOUD
+    provider.service = CLOUD
+    provider.credential = CREDENTIAL
+    provider.compartment_id = CREDENTIAL["compartment_id"]
+    provider.bucket_name = "home"
+    provider.workers = workers
+    provider.multipart_threshold = 128 * 1024 * 1024
+    provider.part_size = 64 * 1024 * 1024
+    provider.part_slots = threading.BoundedSemaphore(max(1, workers))
+    provider.manifest_dir = os.path.join(workdir, "uploads")
+    provider.checksum_cache = os.path.join(workdir, "md5.json")
+    provider.storage_dict = {}
+    return provider
+
+
+#
+# the cases seed the service and return the function that is measured
+#
+
+def case_list(service, workdir, scale, args):
+    service.seed_instances(scale)
+    provider = compute_provider(workdir)
+    return provider, lambda: provider.list()
+
+
+def case_create(service, workdir, scale, args):
+    service.seed_images()
+    provider = compute_provider(workdir)
+    names = [f"vm{n:06d}" for n in range(1, scale + 1)]
+    return provider, lambda: provider.create_many(names=names,
+                                                  image="image-0001",
+                                                  size="VM.Standard2.1",
+                                                  parallel=args.parallel)
+
+
+def case_destroy(service, workdir, scale, args):
+    vcn, subnet = service.seed_network()
+    instances = service.seed_instances(scale, subnet=subnet)
+    provider = compute_provider(workdir)
+    provider.networks.add("cloudmesh",
+                          vcn_id=vcn.id,
+                          subnet_id=subnet.id,
+                          availability_domain=subnet.availability_domain)
+    provider.networks.attach("cloudmesh", [vm.id for vm in instances])
+    names = [vm.display_name for vm in instances[:args.destroy]]
+
+    def run():
+        for name in names:
+            provider.destroy(name)
+
+    return provider, run
+
+
+def case_put(service, workdir, scale, args):
+    source = os.path.join(workdir, "put")
+    os.makedirs(source)
+    content = os.urandom(args.size)
+    for n in range(1, scale + 1):
+        with open(os.path.join(source, f"file-{n:06d}"), "wb") as f:
+            f.write(content)
+    provider = storage_provider(workdir, args.workers)
+    return provider, lambda: provider.put(source=source,
+                                          destination="bench",
+                                          recursive=True)
+
+
+def case_get(service, workdir, scale, args):
+    service.seed_objects(scale, size=args.size)
+    destination = os.path.join(workdir, "get")
+    os.makedirs(destination)
+    provider = storage_provider(workdir, args.workers)
+    return provider, lambda: provider.get(source="bench",
+                                          destination=destination)
+
+
+def case_delete(service, workdir, scale, args):
+    service.seed_objects(scale, size=args.size)
+    provider = storage_provider(workdir, args.workers)
+    return provider, lambda: provider.delete(source="bench")
+
+
+def case_search(service, workdir, scale, args):
+    service.seed_objects(scale, size=args.size)
+    provider = storage_provider(workdir, args.workers)
+    filename = f"file-{scale // 2 + 1:06d}"
+    return provider, lambda: provider.search(directory="bench",
+                                             filename=filename,
+                                             recursive=True)
+
+
+CASES = {
+    "list": case_list,
+    "create": case_create,
+    "destroy": case_destroy,
+    "put": case_put,
+    "get": case_get,
+    "delete": case_delete,
+    "search": case_search,
+}
+
+
+def measure(operation, scale, args):
+    """
+    runs a case against a new fake service
+
+    :param operation: the name of the case
+    :param scale: the number of resources
+    :param args: the parsed arguments
+    :return: dict with the wall time and the calls of the case
+    """
+    service = FakeService(latency=args.latency,
+                          jitter=args.jitter,
+                          page_size=args.page_size,
+                          object_page_size=args.object_page_size,
+                          rate=args.rate or None,
+                          burst=args.burst,
+                          provision=args.provision)
+    Clients.clear()
+    for kind, client in service.clients().items():
+        Clients.set(kind, CREDENTIAL, client)
+
+    result = {"scale": scale, "operation": operation, "error": None}
+    with tempfile.TemporaryDirectory() as workdir:
+        provider, run = CASES[operation](service, workdir, scale, args)
+        service.calls.clear()
+        start = perf_counter()
+        try:
+            with open(os.devnull, "w") as devnull, \
+                    contextlib.redirect_stdout(devnull):
+                run()
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = perf_counter() - start
+
+    failed = getattr(provider, "storage_dict", {}).get("failed")
+    if failed and result["error"] is None:
+        result["error"] = f"{len(failed)} failed: {failed[0][1]}"
+    result["calls"] = sum(service.calls.values())
+    result["throttled"] = sum(service.throttled.values())
+    result["operations"] = dict(service.calls.most_common())
+    Clients.clear()
+    # the calls against the fake service are not added to the saved metrics
+    Metrics.reset()
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    :param results: the results of this run
+    :param baseline: the results of a saved run
+    :param tolerance: the allowed relative increase of the wall time
+    :return: the list of regressions
+    """
+    saved = {(entry["scale"], entry["operation"]): entry
+             for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = saved.get((entry["scale"], entry["operation"]))
+        if before is None:
+            continue
+        name = f"{entry['operation']} at {entry['scale']}"
+        if entry["calls"] > before["calls"]:
+            regressions.append(f"{name}: {entry['calls']} calls, "
+                               f"baseline {before['calls']}")
+        if entry["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: {entry['seconds']:.2f} s, "
+                               f"baseline {before['seconds']:.2f} s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default="10,1000,100000",
+                        help="comma separated numbers of resources")
+    parser.add_argument("--operations", default=",".join(CASES),
+                        help="comma separated cases")
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="seconds per api call")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="maximum random seconds added to the latency")
+    parser.add_argument("--page-size", type=int, default=100,
+                        help="entries per page of the list calls")
+    parser.add_argument("--object-page-size", type=int, default=1000,
+                        help="objects per page of list_objects")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="calls per second before calls are throttled, "
+                             "0 for no throttling")
+    parser.add_argument("--burst", type=int, default=None,
+                        help="calls that can be made at once")
+    parser.add_argument("--provision", type=float, default=0.0,
+                        help="seconds until a resource reaches its state")
+    parser.add_argument("--parallel", type=int, default=10,
+                        help="concurrent launch calls of create")
+    parser.add_argument("--workers", type=int, default=16,
+                        help="concurrent transfers of the storage cases")
+    parser.add_argument("--size", type=int, default=256,
+                        help="bytes per file of the storage cases")
+    parser.add_argument("--destroy", type=int, default=10,
+                        help="vms destroyed by the destroy case")
+    parser.add_argument("--save", default=None,
+                        help="write the results as json to this file")
+    parser.add_argument("--baseline", default=None,
+                        help="compare with the results in this file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative increase of the wall time")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    operations = args.operations.split(",")
+    for operation in operations:
+        if operation not in CASES:
+            parser.error(f"unknown operation {operation}")
+
+    print(f"{'operation':<10} {'scale':>8} {'seconds':>10} {'calls':>8} "
+          f"{'throttled':>9}  calls by operation")
+    results = []
+    for scale in scales:
+        for operation in operations:
+            entry = measure(operation, scale, args)
+            results.append(entry)
+            top = " ".join(f"{name}={count}" for name, count in
+                           list(entry["operations"].items())[:4])
+            print(f"{operation:<10} {scale:>8} {entry['seconds']:>10.2f} "
+                  f"{entry['calls']:>8} {entry['throttled']:>9}  {top}")
+            if entry["error"]:
+                print(f"{'':<10} {'':>8} error: {entry['error']}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
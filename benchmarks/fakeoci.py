@@ -0,0 +1,1316 @@
+"""
+A local stand-in of the oci compute, virtual network, identity and object
+storage services used by the benchmarks. The fake clients implement the
+operations the providers call, keep the resources in memory and answer with
+the models and responses of the sdk, so the providers run unchanged. The
+service simulates
+
+* latency: every call sleeps latency seconds plus a random jitter
+* pagination: list calls return at most page_size (object_page_size for
+  list_objects) entries and the opc-next-page header or next_start_with
+* throttling: calls above rate per second (with bursts of burst calls) fail
+  with a 429 TooManyRequests service error
+* provisioning: new, started, stopped and deleted resources reach their
+  final state after provision seconds
+
+and counts every call by operation.
+
+Example::
+
+    service = FakeService(latency=0.01, page_size=100)
+    service.seed_instances(1000)
+    Clients.set("compute", credential, service.compute)
+"""
+import base64
+import bisect
+import copy
+import functools
+import hashlib
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import formatdate
+
+import oci
+from requests.structures import CaseInsensitiveDict
+
+
+class Table(dict):
+    """
+    resources by OCID with a cached list of the resources, so a listing is
+    paged without copying all resources for each page
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._values = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._values = None
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._values = None
+
+    def pop(self, key, *default):
+        self._values = None
+        return super().pop(key, *default)
+
+    def list(self):
+        if self._values is None:
+            self._values = list(self.values())
+        return self._values
+
+
+class Body(object):
+    """
+    the data of a get_object response that is read like the streamed
+    urllib3 response of the sdk
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self.raw = self
+
+    def stream(self, amt=1024 * 1024, decode_content=None):
+        for start in range(0, len(self.content), amt):
+            yield self.content[start:start + amt]
+
+
+def api(method):
+    """
+    marks a method of a fake client as an api operation. The call is
+    counted, throttled and delayed before the method runs under the lock of
+    the service.
+    """
+
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        self.service.request(method.__name__)
+        with self.service.lock:
+            self.service.settle()
+            return method(self, *args, **kwargs)
+
+    return call
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def snapshot(data):
+    """
+    copies the models of a response like the sdk deserializes new models
+    for each response, so callers can change them without changing the
+    state of the service
+    """
+    if isinstance(data, list):
+        return [snapshot(entry) for entry in data]
+    if hasattr(data, "swagger_types"):
+        return copy.copy(data)
+    return data
+
+
+def not_found(kind, id):
+    return oci.exceptions.ServiceError(
+        404, "NotAuthorizedOrNotFound", {},
+        f"{kind} {id} not found or not authorized")
+
+
+def conflict(message):
+    return oci.exceptions.ServiceError(409, "IncorrectState", {}, message)
+
+
+class FakeService(object):
+    """
+    the in memory state of the fake services and the simulated behaviour
+    that is shared by all fake clients
+    """
+
+    def __init__(self,
+                 latency=0.0,
+                 jitter=0.0,
+                 page_size=100,
+                 object_page_size=1000,
+                 rate=None,
+                 burst=None,
+                 provision=0.0,
+                 compartment_id="ocid1.compartment.oc1..benchmark",
+                 namespace="benchmark"):
+        """
+        :param latency: the seconds each call takes
+        :param jitter: the maximum random seconds added to the latency
+        :param page_size: the maximum number of entries of a list call
+        :param object_page_size: the maximum number of objects of
+                                 list_objects
+        :param rate: the number of calls per second before calls are
+                     throttled, None for no throttling
+        :param burst: the number of calls that can be made at once, defaults
+                      to rate
+        :param provision: the seconds until a resource reaches its final
+                          state
+        :param compartment_id: the OCID of the compartment
+        :param namespace: the object storage namespace
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.object_page_size = object_page_size
+        self.rate = rate
+        self.burst = burst or rate
+        self.provision = provision
+        self.compartment_id = compartment_id
+        self.namespace = namespace
+
+        self.lock = threading.RLock()
+        self.calls = Counter()
+        self.throttled = Counter()
+        self.tokens = self.burst
+        self.refilled = time.monotonic()
+        self.pending = []
+        self.sequence = itertools.count(1)
+
+        self.domains = [
+            oci.identity.models.AvailabilityDomain(
+                name=f"bench:US-ASHBURN-AD-{n}",
+                compartment_id=compartment_id)
+            for n in range(1, 4)]
+
+        self.instances = Table()
+        self.instance_names = {}
+        self.images = Table()
+        self.shapes = [oci.core.models.Shape(shape=shape)
+                       for shape in ["VM.Standard2.1",
+                                     "VM.Standard2.2",
+                                     "VM.Standard2.4",
+                                     "VM.Standard2.8",
+                                     "VM.Standard.E2.1.Micro"]]
+        self.attachments = Table()
+        self.attachments_by_instance = {}
+        self.private_ips = {}
+        self.private_by_vnic = {}
+        self.public_ips = {"REGION": Table()}
+        self.public_by_private = {}
+
+        self.vcns = Table()
+        self.subnets = Table()
+        self.gateways = Table()
+        self.route_tables = {}
+        self.nsgs = Table()
+        self.rules = {}
+
+        self.buckets = {}
+        self.uploads = {}
+
+        self.compute = FakeComputeClient(self)
+        self.virtual_network = FakeVirtualNetworkClient(self)
+        self.identity = FakeIdentityClient(self)
+        self.object_storage = FakeObjectStorageClient(self)
+
+    def clients(self):
+        """
+        :return: the fake clients by the kinds of the Clients registry
+        """
+        return {
+            "compute": self.compute,
+            "virtual_network": self.virtual_network,
+            "identity": self.identity,
+            "object_storage": self.object_storage
+        }
+
+    def ocid(self, kind):
+        return f"ocid1.{kind}.oc1..bench{next(self.sequence):08d}"
+
+    def request(self, operation):
+        """
+        counts a call, fails it if the rate is exceeded and waits for the
+        latency of the call
+
+        :param operation: the name of the operation
+        """
+        with self.lock:
+            self.calls[operation] += 1
+            if self.rate:
+                current = time.monotonic()
+                self.tokens = min(
+                    self.burst,
+                    self.tokens + (current - self.refilled) * self.rate)
+                self.refilled = current
+                if self.tokens < 1:
+                    self.throttled[operation] += 1
+                    raise oci.exceptions.ServiceError(
+                        429, "TooManyRequests", {},
+                        "Too many requests for the tenancy")
+                self.tokens -= 1
+        delay = self.latency
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def transition(self, resource, state, final):
+        """
+        moves a resource to its final state, after the provisioning time if
+        one is set
+
+        :param resource: the sdk model
+        :param state: the state until the resource is provisioned
+        :param final: the final state
+        """
+        if self.provision > 0:
+            resource.lifecycle_state = state
+            heapq.heappush(self.pending,
+                           (time.monotonic() + self.provision,
+                            next(self.sequence), resource, final))
+        else:
+            resource.lifecycle_state = final
+
+    def settle(self):
+        """
+        moves the resources whose provisioning time passed to their final
+        state
+        """
+        current = time.monotonic()
+        while self.pending and self.pending[0][0] <= current:
+            _, _, resource, final = heapq.heappop(self.pending)
+            resource.lifecycle_state = final
+
+    @staticmethod
+    def response(data=None, status=200, headers=None, next_page=None,
+                 reload=None):
+        """
+        builds an sdk response. Responses with a reload function are
+        responses of get operations that can be passed to oci.wait_until.
+
+        :param data: the data of the response
+        :param status: the http status
+        :param headers: the response headers
+        :param next_page: the page token of the next page
+        :param reload: the function that gets the resource again
+        :return: the oci.response.Response
+        """
+        headers = CaseInsensitiveDict(headers or {})
+        if next_page is not None:
+            headers["opc-next-page"] = str(next_page)
+        request = oci.Request("GET" if reload else "POST",
+                              "https://benchmark.invalid")
+        request.reload = reload
+        return oci.Response(status, headers, snapshot(data), request)
+
+    def page(self, entries, page=None, limit=None, **kwargs):
+        """
+        returns a page of the entries
+
+        :param entries: the list of all entries
+        :param page: the page token, the offset of the first entry
+        :param limit: the maximum number of entries
+        :return: the response with the entries of the page
+        """
+        start = int(page or 0)
+        limit = min(int(limit or self.page_size), self.page_size)
+        end = start + limit
+        return self.response(entries[start:end],
+                             next_page=end if end < len(entries) else None)
+
+    @staticmethod
+    def select(entries, sort_by=None, sort_order=None, **filters):
+        """
+        filters the entries by the given attributes and sorts them
+
+        :param entries: the list of sdk models
+        :param sort_by: TIMECREATED or DISPLAYNAME
+        :param sort_order: ASC or DESC
+        :param filters: the attribute values, None values are ignored
+        :return: the list of selected entries
+        """
+        filters = {key: value for key, value in filters.items()
+                   if value is not None}
+        if filters:
+            entries = [entry for entry in entries
+                       if all(getattr(entry, key) == value
+                              for key, value in filters.items())]
+        if sort_by is not None:
+            key = "time_created" if sort_by == "TIMECREATED" \
+                else "display_name"
+            entries = sorted(entries,
+                             key=lambda entry: getattr(entry, key),
+                             reverse=sort_order == "DESC")
+        return entries
+
+    #
+    # seeding, not counted as calls
+    #
+
+    def seed_images(self, count=20):
+        """
+        adds images with the names image-0001, image-0002, ...
+
+        :param count: the number of images
+        :return: the list of images
+        """
+        with self.lock:
+            for n in range(1, count + 1):
+                image = oci.core.models.Image(
+                    id=self.ocid("image"),
+                    compartment_id=self.compartment_id,
+                    display_name=f"image-{n:04d}",
+                    operating_system="Canonical Ubuntu",
+                    operating_system_version="18.04",
+                    launch_mode="NATIVE",
+                    launch_options=oci.core.models.LaunchOptions(
+                        boot_volume_type="PARAVIRTUALIZED",
+                        firmware="UEFI_64",
+                        network_type="VFIO"),
+                    lifecycle_state="AVAILABLE",
+                    size_in_mbs=47694,
+                    time_created=now())
+                self.images[image.id] = image
+            return self.images.list()
+
+    def seed_network(self, name="cloudmesh"):
+        """
+        adds a vcn with a subnet and an internet gateway as created by
+        create_vcn_and_subnet of the compute provider
+
+        :param name: the name of the network
+        :return: the vcn and the subnet
+        """
+        with self.lock:
+            provision, self.provision = self.provision, 0
+            try:
+                vcn = self.virtual_network.add_vcn(
+                    oci.core.models.CreateVcnDetails(
+                        cidr_block="11.0.0.0/16",
+                        display_name="vcn_" + name,
+                        compartment_id=self.compartment_id))
+                subnet = self.virtual_network.add_subnet(
+                    oci.core.models.CreateSubnetDetails(
+                        compartment_id=self.compartment_id,
+                        availability_domain=self.domains[0].name,
+                        display_name="subnet_" + name,
+                        vcn_id=vcn.id,
+                        cidr_block="11.0.0.0/25"))
+                self.virtual_network.add_internet_gateway(
+                    oci.core.models.CreateInternetGatewayDetails(
+                        compartment_id=self.compartment_id,
+                        display_name="gateway_" + name,
+                        is_enabled=True,
+                        vcn_id=vcn.id))
+            finally:
+                self.provision = provision
+            return vcn, subnet
+
+    def seed_instances(self, count, subnet=None, prefix="vm"):
+        """
+        adds running instances with a public ip named vm000001, vm000002, ...
+
+        :param count: the number of instances
+        :param subnet: the subnet of the instances, by default a new network
+        :param prefix: the prefix of the names
+        :return: the list of instances
+        """
+        with self.lock:
+            if not self.images:
+                self.seed_images()
+            if subnet is None:
+                _, subnet = self.seed_network()
+            image = self.images.list()[0]
+            provision, self.provision = self.provision, 0
+            try:
+                vnic = oci.core.models.CreateVnicDetails(
+                    subnet_id=subnet.id, assign_public_ip=True)
+                instances = [
+                    self.compute.add_instance(
+                        oci.core.models.LaunchInstanceDetails(
+                            compartment_id=self.compartment_id,
+                            availability_domain=subnet.availability_domain,
+                            display_name=f"{prefix}{n:06d}",
+                            image_id=image.id,
+                            shape=self.shapes[0].shape,
+                            metadata={},
+                            create_vnic_details=vnic))
+                    for n in range(1, count + 1)]
+            finally:
+                self.provision = provision
+            return instances
+
+    def seed_objects(self, count, prefix="bench/", size=256,
+                     bucket="home"):
+        """
+        adds objects named <prefix>file-000001, <prefix>file-000002, ...
+        with the same content
+
+        :param count: the number of objects
+        :param prefix: the prefix of the names
+        :param size: the size of each object in bytes
+        :param bucket: the name of the bucket, created if it does not exist
+        :return: the list of object names
+        """
+        with self.lock:
+            content = bytes(random.getrandbits(8) for _ in range(size))
+            md5 = base64.b64encode(
+                hashlib.md5(content).digest()).decode("utf-8")
+            store = self.object_storage.add_bucket(bucket)
+            names = [f"{prefix}file-{n:06d}" for n in range(1, count + 1)]
+            for name in names:
+                store.put(name, content, md5)
+            return names
+
+
+class FakeClient(object):
+    """
+    the base of the fake clients. The client is its own base_client, so
+    oci.wait_until polls the fake service.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.base_client = self
+
+    def request(self, request):
+        """
+        repeats a get operation for oci.wait_until
+
+        :param request: the request of a previous response
+        :return: the response
+        """
+        return request.reload()
+
+
+class FakeComputeClient(FakeClient):
+
+    def add_instance(self, details):
+        service = self.service
+        vnic_details = details.create_vnic_details
+        subnet = service.subnets.get(vnic_details.subnet_id)
+        if subnet is None:
+            raise not_found("subnet", vnic_details.subnet_id)
+        instance = oci.core.models.Instance(
+            id=service.ocid("instance"),
+            compartment_id=details.compartment_id,
+            availability_domain=details.availability_domain,
+            display_name=details.display_name,
+            image_id=details.image_id,
+            shape=details.shape,
+            metadata=details.metadata,
+            region="iad",
+            launch_mode="NATIVE",
+            launch_options=oci.core.models.LaunchOptions(
+                boot_volume_type="PARAVIRTUALIZED",
+                firmware="UEFI_64",
+                network_type="VFIO"),
+            source_details=oci.core.models.InstanceSourceViaImageDetails(
+                source_type="image",
+                image_id=details.image_id),
+            agent_config=oci.core.models.InstanceAgentConfig(
+                is_monitoring_disabled=False),
+            time_created=now())
+        service.transition(instance, "PROVISIONING", "RUNNING")
+        service.instances[instance.id] = instance
+        service.instance_names.setdefault(instance.display_name,
+                                          []).append(instance.id)
+
+        vnic_id = service.ocid("vnic")
+        attachment = oci.core.models.VnicAttachment(
+            id=service.ocid("vnicattachment"),
+            compartment_id=details.compartment_id,
+            availability_domain=details.availability_domain,
+            instance_id=instance.id,
+            subnet_id=subnet.id,
+            vnic_id=vnic_id,
+            nic_index=0,
+            lifecycle_state="ATTACHED",
+            time_created=now())
+        service.attachments[attachment.id] = attachment
+        service.attachments_by_instance[instance.id] = [attachment]
+
+        n = len(service.attachments)
+        private = oci.core.models.PrivateIp(
+            id=service.ocid("privateip"),
+            compartment_id=details.compartment_id,
+            availability_domain=details.availability_domain,
+            subnet_id=subnet.id,
+            vnic_id=vnic_id,
+            ip_address=f"11.0.{n // 250 % 250}.{n % 250 + 2}",
+            is_primary=True,
+            time_created=now())
+        service.private_ips.setdefault(subnet.id, Table())[private.id] = \
+            private
+        service.private_by_vnic[vnic_id] = private
+
+        if vnic_details.assign_public_ip is not False:
+            public = oci.core.models.PublicIp(
+                id=service.ocid("publicip"),
+                compartment_id=details.compartment_id,
+                availability_domain=details.availability_domain,
+                display_name=f"publicip{n}",
+                ip_address=f"129.{n // 62500 % 250}.{n // 250 % 250}."
+                           f"{n % 250 + 2}",
+                lifetime="EPHEMERAL",
+                scope="AVAILABILITY_DOMAIN",
+                private_ip_id=private.id,
+                lifecycle_state="ASSIGNED",
+                time_created=now())
+            service.public_ips.setdefault(details.availability_domain,
+                                          Table())[public.id] = public
+            service.public_by_private[private.id] = public
+        return instance
+
+    def instance(self, instance_id):
+        instance = self.service.instances.get(instance_id)
+        if instance is None:
+            raise not_found("instance", instance_id)
+        return instance
+
+    @api
+    def launch_instance(self, launch_instance_details, **kwargs):
+        return self.service.response(self.add_instance(
+            launch_instance_details))
+
+    @api
+    def get_instance(self, instance_id, **kwargs):
+        return self.service.response(
+            self.instance(instance_id),
+            reload=lambda: self.get_instance(instance_id))
+
+    @api
+    def list_instances(self, compartment_id, display_name=None,
+                       lifecycle_state=None, availability_domain=None,
+                       sort_by=None, sort_order=None, **kwargs):
+        service = self.service
+        if display_name is not None:
+            entries = [service.instances[id]
+                       for id in service.instance_names.get(display_name, [])]
+        else:
+            entries = service.instances.list()
+        if lifecycle_state or availability_domain or sort_by:
+            entries = service.select(entries,
+                                     sort_by=sort_by,
+                                     sort_order=sort_order,
+                                     lifecycle_state=lifecycle_state,
+                                     availability_domain=availability_domain)
+        return service.page(entries, **kwargs)
+
+    @api
+    def instance_action(self, instance_id, action, **kwargs):
+        instance = self.instance(instance_id)
+        if instance.lifecycle_state in ["TERMINATING", "TERMINATED"]:
+            raise conflict(f"instance {instance_id} is "
+                           f"{instance.lifecycle_state}")
+        if action == "START":
+            self.service.transition(instance, "STARTING", "RUNNING")
+        elif action in ["STOP", "SOFTSTOP"]:
+            self.service.transition(instance, "STOPPING", "STOPPED")
+        elif action in ["RESET", "SOFTRESET"]:
+            self.service.transition(instance, "STOPPING", "RUNNING")
+        else:
+            raise oci.exceptions.ServiceError(
+                400, "InvalidParameter", {}, f"unknown action {action}")
+        return self.service.response(instance)
+
+    @api
+    def update_instance(self, instance_id, update_instance_details,
+                        **kwargs):
+        instance = self.instance(instance_id)
+        name = update_instance_details.display_name
+        if name is not None and name != instance.display_name:
+            self.service.instance_names[instance.display_name].remove(
+                instance.id)
+            self.service.instance_names.setdefault(name, []).append(
+                instance.id)
+            instance.display_name = name
+        return self.service.response(instance)
+
+    @api
+    def terminate_instance(self, instance_id, **kwargs):
+        service = self.service
+        instance = self.instance(instance_id)
+        if instance.lifecycle_state != "TERMINATED":
+            service.transition(instance, "TERMINATING", "TERMINATED")
+            for attachment in service.attachments_by_instance.get(
+                    instance_id, []):
+                attachment.lifecycle_state = "DETACHED"
+                private = service.private_by_vnic.pop(attachment.vnic_id,
+                                                      None)
+                if private is None:
+                    continue
+                service.private_ips[private.subnet_id].pop(private.id)
+                public = service.public_by_private.pop(private.id, None)
+                if public is None:
+                    continue
+                if public.lifetime == "EPHEMERAL":
+                    service.public_ips[public.availability_domain].pop(
+                        public.id)
+                else:
+                    # reserved ips stay in the region without an owner
+                    public.private_ip_id = None
+                    public.lifecycle_state = "AVAILABLE"
+        return service.response(status=204)
+
+    @api
+    def list_vnic_attachments(self, compartment_id, instance_id=None,
+                              **kwargs):
+        service = self.service
+        if instance_id is not None:
+            entries = service.attachments_by_instance.get(instance_id, [])
+        else:
+            entries = service.attachments.list()
+        return service.page(entries, **kwargs)
+
+    @api
+    def get_image(self, image_id, **kwargs):
+        image = self.service.images.get(image_id)
+        if image is None:
+            raise not_found("image", image_id)
+        return self.service.response(image)
+
+    @api
+    def list_images(self, compartment_id, display_name=None,
+                    operating_system=None, lifecycle_state=None,
+                    sort_by=None, sort_order=None, **kwargs):
+        entries = self.service.select(self.service.images.list(),
+                                      sort_by=sort_by,
+                                      sort_order=sort_order,
+                                      display_name=display_name,
+                                      operating_system=operating_system,
+                                      lifecycle_state=lifecycle_state)
+        return self.service.page(entries, **kwargs)
+
+    @api
+    def list_shapes(self, compartment_id, **kwargs):
+        return self.service.page(self.service.shapes, **kwargs)
+
+
+class FakeVirtualNetworkClient(FakeClient):
+
+    def add_vcn(self, details):
+        service = self.service
+        route_table = oci.core.models.RouteTable(
+            id=service.ocid("routetable"),
+            compartment_id=details.compartment_id,
+            display_name="Default Route Table for " + details.display_name,
+            lifecycle_state="AVAILABLE",
+            route_rules=[],
+            time_created=now())
+        vcn = oci.core.models.Vcn(
+            id=service.ocid("vcn"),
+            compartment_id=details.compartment_id,
+            cidr_block=details.cidr_block,
+            display_name=details.display_name,
+            default_route_table_id=route_table.id,
+            time_created=now())
+        route_table.vcn_id = vcn.id
+        service.transition(vcn, "PROVISIONING", "AVAILABLE")
+        service.route_tables[route_table.id] = route_table
+        service.vcns[vcn.id] = vcn
+        return vcn
+
+    def add_subnet(self, details):
+        service = self.service
+        vcn = self.vcn(details.vcn_id)
+        subnet = oci.core.models.Subnet(
+            id=service.ocid("subnet"),
+            compartment_id=details.compartment_id,
+            availability_domain=details.availability_domain,
+            cidr_block=details.cidr_block,
+            display_name=details.display_name,
+            route_table_id=vcn.default_route_table_id,
+            vcn_id=vcn.id,
+            time_created=now())
+        service.transition(subnet, "PROVISIONING", "AVAILABLE")
+        service.subnets[subnet.id] = subnet
+        return subnet
+
+    def add_internet_gateway(self, details):
+        service = self.service
+        gateway = oci.core.models.InternetGateway(
+            id=service.ocid("internetgateway"),
+            compartment_id=details.compartment_id,
+            display_name=details.display_name,
+            is_enabled=details.is_enabled,
+            vcn_id=self.vcn(details.vcn_id).id,
+            time_created=now())
+        service.transition(gateway, "PROVISIONING", "AVAILABLE")
+        service.gateways[gateway.id] = gateway
+        return gateway
+
+    def resource(self, table, kind, id):
+        resource = table.get(id)
+        if resource is None:
+            raise not_found(kind, id)
+        return resource
+
+    def vcn(self, vcn_id):
+        return self.resource(self.service.vcns, "vcn", vcn_id)
+
+    def terminate(self, resource):
+        if resource.lifecycle_state not in ["TERMINATING", "TERMINATED"]:
+            self.service.transition(resource, "TERMINATING", "TERMINATED")
+        return self.service.response(status=204)
+
+    @api
+    def create_vcn(self, create_vcn_details, **kwargs):
+        return self.service.response(self.add_vcn(create_vcn_details))
+
+    @api
+    def get_vcn(self, vcn_id, **kwargs):
+        return self.service.response(self.vcn(vcn_id),
+                                     reload=lambda: self.get_vcn(vcn_id))
+
+    @api
+    def list_vcns(self, compartment_id, display_name=None,
+                  lifecycle_state=None, sort_by=None, sort_order=None,
+                  **kwargs):
+        entries = self.service.select(self.service.vcns.list(),
+                                      sort_by=sort_by,
+                                      sort_order=sort_order,
+                                      display_name=display_name,
+                                      lifecycle_state=lifecycle_state)
+        return self.service.page(entries, **kwargs)
+
+    @api
+    def delete_vcn(self, vcn_id, **kwargs):
+        return self.terminate(self.vcn(vcn_id))
+
+    @api
+    def create_subnet(self, create_subnet_details, **kwargs):
+        return self.service.response(self.add_subnet(create_subnet_details))
+
+    @api
+    def get_subnet(self, subnet_id, **kwargs):
+        return self.service.response(
+            self.resource(self.service.subnets, "subnet", subnet_id),
+            reload=lambda: self.get_subnet(subnet_id))
+
+    @api
+    def list_subnets(self, compartment_id, vcn_id, display_name=None,
+                     lifecycle_state=None, sort_by=None, sort_order=None,
+                     **kwargs):
+        entries = self.service.select(self.service.subnets.list(),
+                                      sort_by=sort_by,
+                                      sort_order=sort_order,
+                                      vcn_id=vcn_id,
+                                      display_name=display_name,
+                                      lifecycle_state=lifecycle_state)
+        return self.service.page(entries, **kwargs)
+
+    @api
+    def delete_subnet(self, subnet_id, **kwargs):
+        return self.terminate(
+            self.resource(self.service.subnets, "subnet", subnet_id))
+
+    @api
+    def create_internet_gateway(self, create_internet_gateway_details,
+                                **kwargs):
+        return self.service.response(
+            self.add_internet_gateway(create_internet_gateway_details))
+
+    @api
+    def get_internet_gateway(self, ig_id, **kwargs):
+        return self.service.response(
+            self.resource(self.service.gateways, "internet gateway", ig_id),
+            reload=lambda: self.get_internet_gateway(ig_id))
+
+    @api
+    def list_internet_gateways(self, compartment_id, vcn_id, **kwargs):
+        entries = self.service.select(self.service.gateways.list(),
+                                      vcn_id=vcn_id)
+        return self.service.page(entries, **kwargs)
+
+    @api
+    def delete_internet_gateway(self, ig_id, **kwargs):
+        return self.terminate(
+            self.resource(self.service.gateways, "internet gateway", ig_id))
+
+    @api
+    def get_route_table(self, rt_id, **kwargs):
+        return self.service.response(
+            self.resource(self.service.route_tables, "route table", rt_id))
+
+    @api
+    def update_route_table(self, rt_id, update_route_table_details,
+                           **kwargs):
+        route_table = self.resource(self.service.route_tables,
+                                    "route table", rt_id)
+        if update_route_table_details.route_rules is not None:
+            route_table.route_rules = update_route_table_details.route_rules
+        return self.service.response(route_table)
+
+    @api
+    def create_network_security_group(self,
+                                      create_network_security_group_details,
+                                      **kwargs):
+        service = self.service
+        details = create_network_security_group_details
+        nsg = oci.core.models.NetworkSecurityGroup(
+            id=service.ocid("networksecuritygroup"),
+            compartment_id=details.compartment_id,
+            display_name=details.display_name,
+            vcn_id=self.vcn(details.vcn_id).id,
+            time_created=now())
+        service.transition(nsg, "PROVISIONING", "AVAILABLE")
+        service.nsgs[nsg.id] = nsg
+        service.rules[nsg.id] = Table()
+        return service.response(nsg)
+
+    @api
+    def get_network_security_group(self, network_security_group_id,
+                                   **kwargs):
+        return self.service.response(
+            self.resource(self.service.nsgs, "network security group",
+                          network_security_group_id),
+            reload=lambda: self.get_network_security_group(
+                network_security_group_id))
+
+    @api
+    def list_network_security_groups(self, compartment_id, vcn_id=None,
+                                     display_name=None, lifecycle_state=None,
+                                     sort_by=None, sort_order=None,
+                                     **kwargs):
+        entries = self.service.select(self.service.nsgs.list(),
+                                      sort_by=sort_by,
+                                      sort_order=sort_order,
+                                      vcn_id=vcn_id,
+                                      display_name=display_name,
+                                      lifecycle_state=lifecycle_state)
+        return self.service.page(entries, **kwargs)
+
+    @api
+    def delete_network_security_group(self, network_security_group_id,
+                                      **kwargs):
+        return self.terminate(
+            self.resource(self.service.nsgs, "network security group",
+                          network_security_group_id))
+
+    @api
+    def add_network_security_group_security_rules(
+            self, network_security_group_id,
+            add_network_security_group_security_rules_details, **kwargs):
+        service = self.service
+        self.resource(service.nsgs, "network security group",
+                      network_security_group_id)
+        rules = service.rules[network_security_group_id]
+        details = add_network_security_group_security_rules_details
+        added = []
+        for rule in details.security_rules or []:
+            added.append(oci.core.models.SecurityRule(
+                id=f"{next(service.sequence):06X}",
+                description=rule.description,
+                direction=rule.direction,
+                protocol=rule.protocol,
+                source=rule.source,
+                source_type=rule.source_type,
+                destination=rule.destination,
+                destination_type=rule.destination_type,
+                is_stateless=rule.is_stateless,
+                tcp_options=rule.tcp_options,
+                udp_options=rule.udp_options,
+                icmp_options=rule.icmp_options,
+                is_valid=True,
+                time_created=now()))
+        if len(rules) + len(added) > 120:
+            raise oci.exceptions.ServiceError(
+                400, "LimitExceeded", {},
+                "a network security group has at most 120 rules")
+        for rule in added:
+            rules[rule.id] = rule
+        return service.response(
+            oci.core.models.AddedNetworkSecurityGroupSecurityRules(
+                security_rules=added))
+
+    @api
+    def remove_network_security_group_security_rules(
+            self, network_security_group_id,
+            remove_network_security_group_security_rules_details, **kwargs):
+        rules = self.service.rules.get(network_security_group_id)
+        if rules is None:
+            raise not_found("network security group",
+                            network_security_group_id)
+        details = remove_network_security_group_security_rules_details
+        for rule_id in details.security_rule_ids or []:
+            rules.pop(rule_id, None)
+        return self.service.response(status=200)
+
+    @api
+    def list_network_security_group_security_rules(
+            self, network_security_group_id, direction=None, sort_by=None,
+            sort_order=None, **kwargs):
+        rules = self.service.rules.get(network_security_group_id)
+        if rules is None:
+            raise not_found("network security group",
+                            network_security_group_id)
+        entries = self.service.select(rules.list(), direction=direction)
+        return self.service.page(entries, **kwargs)
+
+    @api
+    def list_private_ips(self, subnet_id=None, vnic_id=None,
+                         ip_address=None, **kwargs):
+        service = self.service
+        if subnet_id is not None:
+            entries = service.private_ips.get(subnet_id, Table()).list()
+        else:
+            entries = [private for table in service.private_ips.values()
+                       for private in table.values()]
+        if vnic_id or ip_address:
+            entries = service.select(entries, vnic_id=vnic_id,
+                                     ip_address=ip_address)
+        return service.page(entries, **kwargs)
+
+    @api
+    def list_public_ips(self, scope, compartment_id,
+                        availability_domain=None, lifetime=None, **kwargs):
+        service = self.service
+        if scope == "REGION":
+            entries = service.public_ips["REGION"].list()
+        else:
+            entries = service.public_ips.get(availability_domain,
+                                             Table()).list()
+        if lifetime is not None:
+            entries = service.select(entries, lifetime=lifetime)
+        return service.page(entries, **kwargs)
+
+    @api
+    def get_public_ip_by_private_ip_id(
+            self, get_public_ip_by_private_ip_id_details, **kwargs):
+        private_ip_id = get_public_ip_by_private_ip_id_details.private_ip_id
+        public = self.service.public_by_private.get(private_ip_id)
+        if public is None:
+            raise not_found("public ip of private ip", private_ip_id)
+        return self.service.response(public)
+
+    @api
+    def create_public_ip(self, create_public_ip_details, **kwargs):
+        service = self.service
+        details = create_public_ip_details
+        if details.lifetime != "RESERVED":
+            raise oci.exceptions.ServiceError(
+                400, "InvalidParameter", {},
+                "only RESERVED public ips can be created")
+        n = sum(len(table) for table in service.public_ips.values()) + 1
+        public = oci.core.models.PublicIp(
+            id=service.ocid("publicip"),
+            compartment_id=details.compartment_id,
+            display_name=details.display_name or f"publicip{n}",
+            ip_address=f"132.{n // 62500 % 250}.{n // 250 % 250}."
+                       f"{n % 250 + 2}",
+            lifetime="RESERVED",
+            scope="REGION",
+            time_created=now())
+        self.assign(public, details.private_ip_id)
+        service.public_ips["REGION"][public.id] = public
+        return service.response(public)
+
+    def assign(self, public, private_ip_id):
+        service = self.service
+        if public.private_ip_id is not None:
+            service.public_by_private.pop(public.private_ip_id, None)
+        public.private_ip_id = private_ip_id
+        if private_ip_id is None:
+            service.transition(public, "UNASSIGNING", "AVAILABLE")
+            return
+        if private_ip_id in service.public_by_private:
+            raise conflict(f"private ip {private_ip_id} already has a "
+                           f"public ip")
+        service.public_by_private[private_ip_id] = public
+        service.transition(public, "ASSIGNING", "ASSIGNED")
+
+    def public_ip(self, public_ip_id):
+        for table in self.service.public_ips.values():
+            if public_ip_id in table:
+                return table[public_ip_id]
+        raise not_found("public ip", public_ip_id)
+
+    @api
+    def get_public_ip(self, public_ip_id, **kwargs):
+        return self.service.response(
+            self.public_ip(public_ip_id),
+            reload=lambda: self.get_public_ip(public_ip_id))
+
+    @api
+    def update_public_ip(self, public_ip_id, update_public_ip_details,
+                         **kwargs):
+        public = self.public_ip(public_ip_id)
+        details = update_public_ip_details
+        if details.display_name is not None:
+            public.display_name = details.display_name
+        # an empty private ip unassigns a reserved ip
+        private_ip_id = details.private_ip_id or None
+        if private_ip_id != public.private_ip_id:
+            self.assign(public, private_ip_id)
+        return self.service.response(public)
+
+    @api
+    def delete_public_ip(self, public_ip_id, **kwargs):
+        public = self.public_ip(public_ip_id)
+        self.service.public_by_private.pop(public.private_ip_id, None)
+        scope = "REGION" if public.scope == "REGION" \
+            else public.availability_domain
+        self.service.public_ips[scope].pop(public.id)
+        return self.service.response(status=204)
+
+
+class FakeIdentityClient(FakeClient):
+
+    @api
+    def list_availability_domains(self, compartment_id, **kwargs):
+        return self.service.response(list(self.service.domains))
+
+
+class FakeBucket(object):
+    """
+    the objects of a bucket with the sorted list of their names for
+    list_objects
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.objects = {}
+        self._names = []
+        self.sorted = True
+
+    def put(self, name, content, md5):
+        if name not in self.objects and self._names is not None:
+            self._names.append(name)
+            self.sorted = False
+        self.objects[name] = (content, md5, now())
+
+    def delete(self, name):
+        del self.objects[name]
+        self._names = None
+
+    def names(self):
+        if self._names is None:
+            self._names = list(self.objects)
+            self.sorted = False
+        if not self.sorted:
+            self._names.sort()
+            self.sorted = True
+        return self._names
+
+
+class FakeObjectStorageClient(FakeClient):
+
+    def add_bucket(self, name, compartment_id=None):
+        service = self.service
+        if name not in service.buckets:
+            service.buckets[name] = FakeBucket(
+                oci.object_storage.models.Bucket(
+                    namespace=service.namespace,
+                    name=name,
+                    compartment_id=compartment_id or service.compartment_id,
+                    created_by="benchmark",
+                    etag=service.ocid("etag"),
+                    public_access_type="NoPublicAccess",
+                    storage_tier="Standard",
+                    time_created=now()))
+        return service.buckets[name]
+
+    def store(self, bucket_name):
+        store = self.service.buckets.get(bucket_name)
+        if store is None:
+            raise not_found("bucket", bucket_name)
+        return store
+
+    def object(self, bucket_name, object_name):
+        entry = self.store(bucket_name).objects.get(object_name)
+        if entry is None:
+            raise not_found("object", object_name)
+        return entry
+
+    @staticmethod
+    def headers(content, md5, time_created, **headers):
+        headers.update({
+            "Content-Length": str(len(content)),
+            "Content-MD5": md5,
+            "ETag": md5,
+            "last-modified": formatdate(time_created.timestamp(),
+                                        usegmt=True),
+            "Date": formatdate(usegmt=True)
+        })
+        return headers
+
+    @staticmethod
+    def read(body):
+        if hasattr(body, "read"):
+            return body.read()
+        if isinstance(body, str):
+            return body.encode("utf-8")
+        return bytes(body)
+
+    @api
+    def get_namespace(self, **kwargs):
+        return self.service.response(self.service.namespace)
+
+    @api
+    def get_bucket(self, namespace_name, bucket_name, **kwargs):
+        return self.service.response(self.store(bucket_name).bucket)
+
+    @api
+    def create_bucket(self, namespace_name, create_bucket_details, **kwargs):
+        details = create_bucket_details
+        if details.name in self.service.buckets:
+            raise oci.exceptions.ServiceError(
+                409, "BucketAlreadyExists", {},
+                f"bucket {details.name} already exists")
+        bucket = self.add_bucket(details.name, details.compartment_id).bucket
+        return self.service.response(bucket, headers={
+            "Content-Length": "0",
+            "Date": formatdate(usegmt=True),
+            "ETag": bucket.etag
+        })
+
+    @api
+    def list_objects(self, namespace_name, bucket_name, prefix=None,
+                     start=None, end=None, limit=None, fields=None,
+                     **kwargs):
+        store = self.store(bucket_name)
+        names = store.names()
+        prefix = prefix or ""
+        first = max(prefix, start or "")
+        limit = min(int(limit or self.service.object_page_size),
+                    self.service.object_page_size)
+        fields = (fields or "name").split(",")
+        objects = []
+        next_start_with = None
+        for name in itertools.islice(names, bisect.bisect_left(names, first),
+                                     None):
+            if not name.startswith(prefix) or (end and name >= end):
+                break
+            if len(objects) == limit:
+                next_start_with = name
+                break
+            content, md5, time_created = store.objects[name]
+            objects.append(oci.object_storage.models.ObjectSummary(
+                name=name,
+                size=len(content) if "size" in fields else None,
+                md5=md5 if "md5" in fields else None,
+                time_created=time_created
+                if "timeCreated" in fields else None))
+        return self.service.response(
+            oci.object_storage.models.ListObjects(
+                objects=objects,
+                prefixes=[],
+                next_start_with=next_start_with))
+
+    @api
+    def head_object(self, namespace_name, bucket_name, object_name,
+                    **kwargs):
+        content, md5, time_created = self.object(bucket_name, object_name)
+        return self.service.response(
+            headers=self.headers(content, md5, time_created))
+
+    @api
+    def get_object(self, namespace_name, bucket_name, object_name,
+                   range=None, if_match=None, **kwargs):
+        content, md5, time_created = self.object(bucket_name, object_name)
+        if if_match is not None and if_match != md5:
+            raise oci.exceptions.ServiceError(
+                412, "IfMatchFailed", {},
+                f"the etag of {object_name} does not match")
+        headers = self.headers(content, md5, time_created)
+        status = 200
+        if range is not None:
+            start, end = range.split("=", 1)[1].split("-")
+            start = int(start)
+            end = min(int(end), len(content) - 1) if end \
+                else len(content) - 1
+            headers["Content-Range"] = \
+                f"bytes {start}-{end}/{len(content)}"
+            content = content[start:end + 1]
+            headers["Content-Length"] = str(len(content))
+            status = 206
+        return self.service.response(Body(content), status=status,
+                                     headers=headers)
+
+    @api
+    def put_object(self, namespace_name, bucket_name, object_name,
+                   put_object_body, **kwargs):
+        content = self.read(put_object_body)
+        md5 = base64.b64encode(hashlib.md5(content).digest()).decode("utf-8")
+        store = self.store(bucket_name)
+        store.put(object_name, content, md5)
+        _, _, time_created = store.objects[object_name]
+        return self.service.response(headers={
+            "opc-content-md5": md5,
+            "ETag": md5,
+            "last-modified": formatdate(time_created.timestamp(),
+                                        usegmt=True)
+        })
+
+    @api
+    def delete_object(self, namespace_name, bucket_name, object_name,
+                      **kwargs):
+        self.object(bucket_name, object_name)
+        self.store(bucket_name).delete(object_name)
+        return self.service.response(status=204)
+
+    @api
+    def create_multipart_upload(self, namespace_name, bucket_name,
+                                create_multipart_upload_details, **kwargs):
+        self.store(bucket_name)
+        upload = oci.object_storage.models.MultipartUpload(
+            namespace=namespace_name,
+            bucket=bucket_name,
+            object=create_multipart_upload_details.object,
+            upload_id=self.service.ocid("upload"),
+            time_created=now())
+        self.service.uploads[upload.upload_id] = (upload, {})
+        return self.service.response(upload)
+
+    def upload(self, upload_id):
+        if upload_id not in self.service.uploads:
+            raise not_found("upload", upload_id)
+        return self.service.uploads[upload_id]
+
+    @api
+    def upload_part(self, namespace_name, bucket_name, object_name,
+                    upload_id, upload_part_num, upload_part_body, **kwargs):
+        _, parts = self.upload(upload_id)
+        content = self.read(upload_part_body)
+        digest = hashlib.md5(content).digest()
+        etag = f"{upload_id}-{upload_part_num}-{digest.hex()}"
+        parts[etag] = (upload_part_num, content, digest)
+        return self.service.response(headers={
+            "ETag": etag,
+            "opc-content-md5": base64.b64encode(digest).decode("utf-8")
+        })
+
+    @api
+    def commit_multipart_upload(self, namespace_name, bucket_name,
+                                object_name, upload_id,
+                                commit_multipart_upload_details, **kwargs):
+        upload, parts = self.upload(upload_id)
+        committed = []
+        for part in commit_multipart_upload_details.parts_to_commit:
+            if part.etag not in parts:
+                raise oci.exceptions.ServiceError(
+                    400, "InvalidUploadPart", {},
+                    f"part {part.part_num} of {object_name} not found")
+            committed.append(parts[part.etag])
+        committed.sort(key=lambda part: part[0])
+        content = b"".join(part[1] for part in committed)
+        md5 = base64.b64encode(hashlib.md5(
+            b"".join(part[2] for part in committed)).digest()).decode(
+            "utf-8") + f"-{len(committed)}"
+        store = self.store(bucket_name)
+        store.put(object_name, content, md5)
+        del self.service.uploads[upload_id]
+        _, _, time_created = store.objects[object_name]
+        return self.service.response(headers={
+            "opc-multipart-md5": md5,
+            "ETag": md5,
+            "last-modified": formatdate(time_created.timestamp(),
+                                        usegmt=True)
+        })
+
+    @api
+    def abort_multipart_upload(self, namespace_name, bucket_name,
+                               object_name, upload_id, **kwargs):
+        self.upload(upload_id)
+        del self.service.uploads[upload_id]
+        return self.service.response(status=204)
@@ -0,0 +1,78 @@
+"""
+Measures the startup cost of the oracle plugin: the time to import the
+providers and, if a cloud name is given, to construct them. Each sample
+runs in a fresh python interpreter so module caching does not hide the
+import time.
+
+Usage::
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 20 --cloud oracle --storage oracle
+
+The --cloud and --storage options need a cloudmesh.yaml with the oracle
+credentials. No api calls are made.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+SAMPLE = """
+from time import perf_counter
+start = perf_counter()
+{code}
+print(perf_counter() - start)
+"""
+
+CASES = {
+    "import oci": "import oci",
+    "import compute Provider":
+        "from cloudmesh.oracle.compute.Provider import Provider",
+    "import storage Provider":
+        "from cloudmesh.oracle.storage.Provider import Provider",
+    "construct compute Provider":
+        "from cloudmesh.oracle.compute.Provider import Provider\n"
+        "Provider(name='{cloud}')",
+    "construct storage Provider":
+        "from cloudmesh.oracle.storage.Provider import Provider\n"
+        "Provider(service='{storage}')",
+}
+
+
+def sample(code):
+    result = subprocess.run([sys.executable, "-c", SAMPLE.format(code=code)],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--cloud", default=None,
+                        help="the compute cloud name in cloudmesh.yaml")
+    parser.add_argument("--storage", default=None,
+                        help="the storage service name in cloudmesh.yaml")
+    args = parser.parse_args()
+
+    print(f"{'case':<30} {'min ms':>10} {'median ms':>10} {'max ms':>10}")
+    for name, code in CASES.items():
+        if "{cloud}" in code and args.cloud is None:
+            continue
+        if "{storage}" in code and args.storage is None:
+            continue
+        code = code.format(cloud=args.cloud, storage=args.storage)
+        try:
+            times = [sample(code) * 1000 for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{name:<30} failed: {e}")
+            continue
+        print(f"{name:<30} {min(times):>10.1f} "
+              f"{statistics.median(times):>10.1f} {max(times):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import threading
+
+from cloudmesh.oracle.LazyImport import lazy_import
+from cloudmesh.oracle.Metrics import Metrics
+
+oci = lazy_import("oci")
+
+
+class Clients(object):
+    """
+    A process wide registry of the oci sdk clients. Clients are created on
+    first use and shared by all providers that use the same credentials and
+    region, so the key file is loaded once and the http connections of a
+    client are reused. The object storage namespace is cached as well.
+    The clients are instrumented with Metrics unless Metrics.enabled is
+    False.
+
+    Example::
+
+        compute = Clients.get("compute", credential)
+        namespace = Clients.namespace(credential)
+    """
+
+    kinds = {
+        "compute": lambda: oci.core.ComputeClient,
+        "virtual_network": lambda: oci.core.VirtualNetworkClient,
+        "identity": lambda: oci.identity.IdentityClient,
+        "object_storage": lambda: oci.object_storage.ObjectStorageClient,
+    }
+
+    # the number of pooled connections per client
+    pool_size = 50
+
+    # if False the connections are closed after each request
+    keep_alive = True
+
+    _lock = threading.Lock()
+    _clients = {}
+    _signers = {}
+    _namespaces = {}
+
+    @staticmethod
+    def key(credential):
+        """
+        :param credential: the dict for the oraclesdk
+        :return: the key identifying the credential and region
+        """
+        return (credential['tenancy'],
+                credential['user'],
+                credential['fingerprint'],
+                credential['key_file'],
+                credential['region'])
+
+    @classmethod
+    def configure(cls, pool_size=None, keep_alive=None, metrics=None):
+        """
+        sets the connection options of clients created afterwards
+
+        :param pool_size: the number of pooled connections per client
+        :param keep_alive: if False connections are not reused
+        :param metrics: if False the calls are not recorded in Metrics
+        """
+        if pool_size is not None:
+            cls.pool_size = int(pool_size)
+        if keep_alive is not None:
+            cls.keep_alive = bool(keep_alive)
+        if metrics is not None:
+            Metrics.enabled = bool(metrics)
+
+    @classmethod
+    def signer(cls, credential):
+        """
+        :param credential: the dict for the oraclesdk
+        :return: the shared request signer of the credential
+        """
+        key = cls.key(credential)[:4]
+        with cls._lock:
+            if key not in cls._signers:
+                cls._signers[key] = oci.signer.Signer(
+                    tenancy=credential['tenancy'],
+                    user=credential['user'],
+                    fingerprint=credential['fingerprint'],
+                    private_key_file_location=credential['key_file'],
+                    pass_phrase=credential.get('pass_phrase'))
+            return cls._signers[key]
+
+    @classmethod
+    def get(cls, kind, credential):
+        """
+        returns the shared client of a kind and creates it on first use
+
+        :param kind: compute, virtual_network, identity or object_storage
+        :param credential: the dict for the oraclesdk
+        :return: the client
+        """
+        key = (kind,) + cls.key(credential)
+        client = cls._clients.get(key)
+        if client is not None:
+            return client
+
+        signer = cls.signer(credential)
+        with cls._lock:
+            if key not in cls._clients:
+                client = cls.kinds[kind]()(credential, signer=signer)
+                session = client.base_client.session
+                adapter = type(session.get_adapter("https://"))
+                session.mount("https://", adapter(
+                    pool_connections=cls.pool_size,
+                    pool_maxsize=cls.pool_size))
+                if not cls.keep_alive:
+                    session.headers["Connection"] = "close"
+                if Metrics.enabled:
+                    client = Metrics.instrument(kind, client)
+                cls._clients[key] = client
+            return cls._clients[key]
+
+    @classmethod
+    def set(cls, kind, credential, client):
+        """
+        registers a client for a kind and credential, e.g. a local stand-in
+        of the service used by the benchmarks
+
+        :param kind: compute, virtual_network, identity or object_storage
+        :param credential: the dict for the oraclesdk
+        :param client: the client
+        """
+        if Metrics.enabled:
+            client = Metrics.instrument(kind, client)
+        with cls._lock:
+            cls._clients[(kind,) + cls.key(credential)] = client
+
+    @classmethod
+    def namespace(cls, credential):
+        """
+        :param credential: the dict for the oraclesdk
+        :return: the cached object storage namespace of the tenancy
+        """
+        key = cls.key(credential)
+        if key not in cls._namespaces:
+            namespace = cls.get("object_storage",
+                                credential).get_namespace().data
+            with cls._lock:
+                cls._namespaces[key] = namespace
+        return cls._namespaces[key]
+
+    @classmethod
+    def clear(cls):
+        """
+        removes all clients, signers and namespaces
+        """
+        with cls._lock:
+            cls._clients.clear()
+            cls._signers.clear()
+            cls._namespaces.clear()
@@ -0,0 +1,43 @@
+import os
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+
+class FileLock(object):
+    """
+    An exclusive lock between processes on a lock file next to a local
+    state file, so the read, merge and write of the file by concurrent cms
+    commands does not lose updates. On platforms without fcntl the lock
+    does nothing.
+
+    Example::
+
+        with FileLock("~/.cloudmesh/oracle/metrics.json"):
+            ...
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: the file that is protected, the lock is taken on
+                         filename.lock
+        """
+        self.filename = f"{filename}.lock"
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        self.fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+        return False
@@ -0,0 +1,28 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    Returns a module that is only loaded when one of its attributes is
+    accessed. This keeps large packages such as the oci sdk out of the
+    startup time of commands that do not use them.
+
+    Example::
+
+        oci = lazy_import("oci")
+
+    :param name: the name of the module
+    :return: the module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,414 @@
+import atexit
+import json
+import os
+import threading
+from time import perf_counter
+
+from cloudmesh.common.util import path_expand
+from cloudmesh.oracle.FileLock import FileLock
+
+
+class Metrics(object):
+    """
+    Records the calls of the oci sdk clients per operation: the number of
+    calls, errors by http status, polls, the bytes sent and received and a
+    histogram of the latency. The clients of the Clients registry are
+    wrapped with instrument, so every call of the providers is recorded.
+    The repeated requests of oci.wait_until are counted as polls of the get
+    operation they repeat. Retries of the sdk retry strategy happen inside
+    a call and are part of its latency, they are not counted.
+
+    The metrics of a process are added to a local file when it exits, so
+    the calls of several cms commands can be inspected with cms oracle
+    stats. Concurrent processes serialize the update of the file with a
+    FileLock.
+
+    Example::
+
+        Metrics.stats()
+        print(Metrics.prometheus())
+    """
+
+    # the upper bounds of the latency buckets in seconds
+    buckets = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+               10.0, 30.0, 60.0]
+
+    # if False the clients are not instrumented
+    enabled = True
+
+    filename = "~/.cloudmesh/oracle/metrics.json"
+
+    # the position of the request body of the upload operations
+    bodies = {
+        "put_object": 3,
+        "upload_part": 5,
+    }
+
+    _lock = threading.Lock()
+    _operations = {}
+    _registered = False
+
+    @classmethod
+    def entry(cls):
+        return {
+            "count": 0,
+            "errors": {},
+            "polls": 0,
+            "seconds": 0.0,
+            "sent": 0,
+            "received": 0,
+            "buckets": [0] * (len(cls.buckets) + 1)
+        }
+
+    @classmethod
+    def record(cls, operation, seconds, status=None, poll=False, sent=0,
+               received=0):
+        """
+        records a call
+
+        :param operation: the name, e.g. compute.list_instances
+        :param seconds: the duration of the call
+        :param status: the http status of a failed call
+        :param poll: True if the call is a poll of oci.wait_until
+        :param sent: the number of bytes sent
+        :param received: the number of bytes received
+        """
+        bucket = len(cls.buckets)
+        for i, bound in enumerate(cls.buckets):
+            if seconds <= bound:
+                bucket = i
+                break
+        with cls._lock:
+            if not cls._registered:
+                atexit.register(cls.save)
+                cls._registered = True
+            entry = cls._operations.setdefault(operation, cls.entry())
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            entry["sent"] += sent
+            entry["received"] += received
+            entry["buckets"][bucket] += 1
+            if poll:
+                entry["polls"] += 1
+            if status is not None:
+                status = str(status)
+                entry["errors"][status] = entry["errors"].get(status, 0) + 1
+
+    @staticmethod
+    def size(body):
+        """
+        :param body: the body of a request, bytes, a string or a file
+        :return: the number of bytes that are sent
+        """
+        if body is None:
+            return 0
+        if isinstance(body, (bytes, bytearray)):
+            return len(body)
+        if isinstance(body, str):
+            return len(body.encode("utf-8"))
+        try:
+            return os.fstat(body.fileno()).st_size - body.tell()
+        except (AttributeError, OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def received(response):
+        """
+        :param response: the response of an sdk call
+        :return: the content length of the response
+        """
+        headers = getattr(response, "headers", None)
+        try:
+            return int(headers.get("Content-Length", 0))
+        except (AttributeError, TypeError, ValueError):
+            return 0
+
+    @classmethod
+    def call(cls, operation, function, *args, poll=False, **kwargs):
+        """
+        calls an sdk function and records the call
+
+        :param operation: the name of the operation
+        :param function: the sdk function
+        :param poll: True if the call is a poll of oci.wait_until
+        :return: the response of the function
+        """
+        name = operation.rsplit(".", 1)[-1]
+        body = None
+        if name in cls.bodies:
+            if len(args) > cls.bodies[name]:
+                body = args[cls.bodies[name]]
+            else:
+                body = kwargs.get(f"{name}_body")
+        sent = kwargs.get("content_length") or cls.size(body)
+        start = perf_counter()
+        try:
+            response = function(*args, **kwargs)
+        except Exception as e:
+            cls.record(operation, perf_counter() - start,
+                       status=getattr(e, "status", "error"),
+                       poll=poll, sent=sent)
+            raise
+        cls.record(operation, perf_counter() - start, poll=poll,
+                   sent=sent, received=cls.received(response))
+        request = getattr(response, "request", None)
+        if request is not None:
+            # lets oci.wait_until attribute its requests to the operation
+            request.operation = operation
+        return response
+
+    @classmethod
+    def instrument(cls, kind, client):
+        """
+        :param kind: the kind of the client, e.g. compute
+        :param client: the sdk client
+        :return: the client with all calls recorded
+        """
+        return InstrumentedClient(kind, client)
+
+    @classmethod
+    def operations(cls):
+        """
+        :return: a copy of the metrics of this process by operation
+        """
+        with cls._lock:
+            return json.loads(json.dumps(cls._operations))
+
+    @classmethod
+    def load(cls):
+        """
+        :return: the saved metrics of previous processes by operation
+        """
+        try:
+            with open(path_expand(cls.filename), 'r') as f:
+                operations = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        for entry in operations.values():
+            # files of older versions counted the polls as retries
+            entry.setdefault("polls", entry.pop("retries", 0))
+        return operations
+
+    @classmethod
+    def merge(cls, operations, other):
+        """
+        adds the metrics in other to operations
+
+        :param operations: the metrics by operation, changed in place
+        :param other: the metrics by operation
+        :return: operations
+        """
+        for operation, value in other.items():
+            entry = operations.setdefault(operation, cls.entry())
+            for key in ["count", "polls", "seconds", "sent", "received"]:
+                entry[key] += value.get(key, 0)
+            for status, count in value.get("errors", {}).items():
+                entry["errors"][status] = \
+                    entry["errors"].get(status, 0) + count
+            if len(value.get("buckets", [])) == len(entry["buckets"]):
+                entry["buckets"] = [a + b for a, b in
+                                    zip(entry["buckets"], value["buckets"])]
+        return operations
+
+    @classmethod
+    def save(cls):
+        """
+        adds the metrics of this process to the local file and clears them
+        """
+        with cls._lock:
+            if not cls._operations:
+                return
+            filename = path_expand(cls.filename)
+            try:
+                with FileLock(filename):
+                    operations = cls.merge(cls.load(), cls._operations)
+                    tmp = f"{filename}.{os.getpid()}.tmp"
+                    with open(tmp, 'w') as f:
+                        json.dump(operations, f)
+                    os.replace(tmp, filename)
+            except OSError:
+                return
+            cls._operations.clear()
+
+    @classmethod
+    def reset(cls, saved=False):
+        """
+        clears the metrics of this process
+
+        :param saved: if True the saved metrics are removed as well
+        """
+        with cls._lock:
+            cls._operations.clear()
+            if saved:
+                filename = path_expand(cls.filename)
+                with FileLock(filename):
+                    try:
+                        os.remove(filename)
+                    except FileNotFoundError:
+                        pass
+
+    @classmethod
+    def quantile(cls, entry, q):
+        """
+        estimates a quantile of the latency as the upper bound of the
+        bucket it falls in
+
+        :param entry: the metrics of an operation
+        :param q: the quantile, e.g. 0.95
+        :return: the seconds or None if the quantile is above the last bound
+        """
+        rank = q * entry["count"]
+        seen = 0
+        for bound, count in zip(cls.buckets, entry["buckets"]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    @classmethod
+    def stats(cls, saved=False):
+        """
+        summarizes the metrics per operation
+
+        :param saved: if True the saved metrics of previous processes are
+                      included
+        :return: list of dicts sorted by the total time of the operation
+        """
+        operations = cls.operations()
+        if saved:
+            operations = cls.merge(cls.load(), operations)
+        result = []
+        for operation, entry in operations.items():
+            count = entry["count"]
+            result.append({
+                "operation": operation,
+                "count": count,
+                "errors": sum(entry["errors"].values()),
+                "polls": entry["polls"],
+                "seconds": round(entry["seconds"], 3),
+                "mean": round(entry["seconds"] / count, 3) if count else 0,
+                "p50": cls.quantile(entry, 0.5),
+                "p95": cls.quantile(entry, 0.95),
+                "sent": entry["sent"],
+                "received": entry["received"]
+            })
+        return sorted(result, key=lambda entry: entry["seconds"],
+                      reverse=True)
+
+    @classmethod
+    def prometheus(cls, saved=False):
+        """
+        exports the metrics in the prometheus text format
+
+        :param saved: if True the saved metrics of previous processes are
+                      included
+        :return: the text
+        """
+        operations = cls.operations()
+        if saved:
+            operations = cls.merge(cls.load(), operations)
+        names = sorted(operations)
+
+        lines = [
+            "# HELP oci_requests_total The number of oci api calls.",
+            "# TYPE oci_requests_total counter"]
+        for name in names:
+            lines.append(f'oci_requests_total{{operation="{name}"}} '
+                         f'{operations[name]["count"]}')
+
+        lines += [
+            "# HELP oci_request_errors_total The number of failed oci api "
+            "calls by http status.",
+            "# TYPE oci_request_errors_total counter"]
+        for name in names:
+            for status, count in sorted(operations[name]["errors"].items()):
+                lines.append(f'oci_request_errors_total{{operation="{name}",'
+                             f'status="{status}"}} {count}')
+
+        lines += [
+            "# HELP oci_request_polls_total The number of oci api calls "
+            "repeated by oci.wait_until.",
+            "# TYPE oci_request_polls_total counter"]
+        for name in names:
+            lines.append(f'oci_request_polls_total{{operation="{name}"}} '
+                         f'{operations[name]["polls"]}')
+
+        lines += [
+            "# HELP oci_request_bytes_total The number of bytes sent and "
+            "received by oci api calls.",
+            "# TYPE oci_request_bytes_total counter"]
+        for name in names:
+            for direction in ["sent", "received"]:
+                lines.append(f'oci_request_bytes_total{{operation="{name}",'
+                             f'direction="{direction}"}} '
+                             f'{operations[name][direction]}')
+
+        lines += [
+            "# HELP oci_request_duration_seconds The latency of oci api "
+            "calls.",
+            "# TYPE oci_request_duration_seconds histogram"]
+        for name in names:
+            entry = operations[name]
+            total = 0
+            for bound, count in zip(cls.buckets + ["+Inf"],
+                                    entry["buckets"]):
+                total += count
+                lines.append(f'oci_request_duration_seconds_bucket{{'
+                             f'operation="{name}",le="{bound}"}} {total}')
+            lines.append(f'oci_request_duration_seconds_sum{{'
+                         f'operation="{name}"}} {entry["seconds"]}')
+            lines.append(f'oci_request_duration_seconds_count{{'
+                         f'operation="{name}"}} {entry["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentedClient(object):
+    """
+    A proxy of an sdk client that records each call of its operations in
+    Metrics. All other attributes are passed through.
+    """
+
+    def __init__(self, kind, client):
+        """
+        :param kind: the kind of the client, e.g. compute
+        :param client: the sdk client
+        """
+        self._kind = kind
+        self._client = client
+
+    def __getattr__(self, name):
+        value = getattr(self._client, name)
+        if name == "base_client":
+            return InstrumentedBaseClient(self._kind, value)
+        if name.startswith("_") or not callable(value):
+            return value
+
+        operation = f"{self._kind}.{name}"
+
+        def call(*args, **kwargs):
+            return Metrics.call(operation, value, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = value.__doc__
+        return call
+
+
+class InstrumentedBaseClient(object):
+    """
+    A proxy of the base client of an sdk client. oci.wait_until repeats a
+    get request with base_client.request, these requests are recorded as
+    polls of the get operation.
+    """
+
+    def __init__(self, kind, base_client):
+        self._kind = kind
+        self._base_client = base_client
+
+    def __getattr__(self, name):
+        return getattr(self._base_client, name)
+
+    def request(self, request, *args, **kwargs):
+        operation = getattr(request, "operation",
+                            f"{self._kind}.request")
+        return Metrics.call(operation, self._base_client.request, request,
+                            *args, poll=True, **kwargs)
@@ -15,20 +15,52 @@ class OracleCommand(PluginCommand):
           Usage:
                 oracle --file=FILE
                 oracle list
+                oracle stats [--prometheus] [--reset] [--output=OUTPUT]
 
           This command is jsut for testing.
 
+          oracle stats shows the oci api calls of the oracle providers per
+          operation: the number of calls, errors and polls of
+          oci.wait_until, the total, mean, median and 95th percentile
+          latency in seconds and the bytes sent and received. The calls of
+          all cms commands since the last reset are included.
+
           Arguments:
               FILE   a file name
 
           Options:
-              -f      specify the file
+              -f                 specify the file
+              --prometheus       print the metrics in the prometheus text
+                                 format
+              --reset            remove the recorded metrics
+              --output=OUTPUT    the output format [default: table]
 
         """
         arguments.FILE = arguments['--file'] or None
 
         VERBOSE(arguments)
 
+        if arguments.stats:
+            from cloudmesh.common.Printer import Printer
+            from cloudmesh.oracle.Metrics import Metrics
+
+            if arguments['--reset']:
+                Metrics.reset(saved=True)
+                Console.ok("The oracle metrics are removed")
+            elif arguments['--prometheus']:
+                print(Metrics.prometheus(saved=True), end="")
+            else:
+                print(Printer.write(
+                    Metrics.stats(saved=True),
+                    order=["operation", "count", "errors", "polls",
+                           "seconds", "mean", "p50", "p95", "sent",
+                           "received"],
+                    header=["Operation", "Calls", "Errors", "Polls",
+                            "Seconds", "Mean", "P50", "P95", "Sent",
+                            "Received"],
+                    output=arguments['--output']))
+            return ""
+
         if arguments.FILE:
             print("option a")
 
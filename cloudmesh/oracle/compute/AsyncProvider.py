@@ -0,0 +1,288 @@
+import asyncio
+import functools
+import random
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from cloudmesh.oracle.LazyImport import lazy_import
+from cloudmesh.oracle.compute.Provider import Provider
+
+oci = lazy_import("oci")
+
+
+class AsyncProvider(object):
+    """
+    An asyncio interface to the oracle compute provider. The blocking sdk
+    calls run on a managed thread pool and the number of calls in flight is
+    limited by a semaphore. Waiting for lifecycle states is done with
+    awaitable polling instead of oci.wait_until, so waiting vms do not
+    occupy threads.
+
+    Example::
+
+        async with AsyncProvider(name="oracle") as provider:
+            vms = await asyncio.gather(
+                *[provider.create(name=f"vm{i}", image=image, size=size)
+                  for i in range(100)])
+    """
+
+    def __init__(self, name=None, provider=None, workers=32, limit=None):
+        """
+        :param name: The name of the provider as defined in the yaml file
+        :param provider: an existing compute Provider to use
+        :param workers: the number of threads running sdk calls
+        :param limit: the maximum number of sdk calls in flight, defaults to
+                      workers
+        """
+        self.provider = provider or Provider(name=name)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.limit = limit or workers
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    @property
+    def semaphore(self):
+        # created on first use so that it belongs to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking call on the executor
+
+        :param func: the function
+        :return: the result of the function
+        """
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs))
+
+    async def wait_until(self,
+                         get,
+                         state,
+                         timeout=600,
+                         interval=2,
+                         max_interval=30,
+                         succeed_on_not_found=False,
+                         leave=False):
+        """
+        Polls until the lifecycle state of a resource is reached, or left
+        if leave is True. The interval doubles with jitter up to
+        max_interval.
+
+        :param get: the sdk get function taking no arguments
+        :param state: the lifecycle state
+        :param timeout: the maximum number of seconds to wait
+        :param interval: the first polling interval
+        :param max_interval: the maximum polling interval
+        :param succeed_on_not_found: return None if the resource is gone
+        :param leave: if True wait until the resource is in another state
+        :return: the resource
+        """
+        start = time()
+        while True:
+            try:
+                data = (await self.run(get)).data
+            except oci.exceptions.ServiceError as e:
+                if e.status == 404 and succeed_on_not_found:
+                    return None
+                raise
+            if (data.lifecycle_state == state) != leave:
+                return data
+            remaining = timeout - (time() - start)
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"{state} not {'left' if leave else 'reached'} after "
+                    f"{timeout} seconds, state is {data.lifecycle_state}")
+            await asyncio.sleep(
+                min(random.uniform(interval / 2, interval), remaining))
+            interval = min(interval * 2, max_interval)
+
+    async def wait_instance(self, instance_id, state, timeout=600,
+                            leave=False):
+        return await self.wait_until(
+            functools.partial(self.provider.compute.get_instance,
+                              instance_id),
+            state,
+            timeout=timeout,
+            leave=leave)
+
+    async def list(self):
+        """
+        Lists the vms on the cloud
+
+        :return: dict of vms
+        """
+        return await self.run(self.provider.list)
+
+    async def list_public_ips(self, ip=None, available=False):
+        return await self.run(self.provider.list_public_ips,
+                              ip=ip, available=available)
+
+    async def create(self,
+                     name=None,
+                     image=None,
+                     size=None,
+                     key=None,
+                     secgroup=None,
+                     public=True,
+                     network=None,
+                     timeout=600,
+                     **kwargs):
+        """
+        creates a named node in the shared network and waits until it runs
+
+        :param name: the name of the node
+        :param image: the image used
+        :param size: the size of the image
+        :param key: the public key file
+        :param secgroup: the name of the security group
+        :param public: if True a public ip is assigned
+        :param network: the name of the shared network
+        :param timeout: the number of seconds to wait for the node
+        :return: the dict of the node
+        """
+        provider = self.provider
+        shared = await self.run(provider.network, network)
+        nsgs = None
+        if secgroup is not None:
+            nsgs = [await self.run(provider.network_secgroup,
+                                   secgroup, shared['vcn_id'])]
+        image_id = await self.run(provider.image_id, image)
+
+        instance_id = await self.run(
+            provider.launch,
+            name=name,
+            image_id=image_id,
+            size=size,
+            key=key,
+            subnet_id=shared['subnet_id'],
+            nsgs=nsgs,
+            public=public,
+            availability_domain=shared['availability_domain'])
+        await self.run(provider.networks.attach, shared['name'],
+                       [instance_id])
+        await self.run(provider.instances.put, name, instance_id)
+
+        instance = await self.wait_instance(instance_id, 'RUNNING',
+                                            timeout=timeout)
+        return (await self.run(provider.update_dict, instance.__dict__,
+                               kind="vm"))[0]
+
+    async def destroy(self, name=None, timeout=300):
+        """
+        Destroys the node and its network if no other node uses it
+
+        :param name: the name of the node
+        :param timeout: the number of seconds to wait for the termination
+        :return: the dict of the node
+        """
+        provider = self.provider
+        vm_instance = await self.run(provider.find_instance, name)
+        if vm_instance is None or vm_instance.lifecycle_state == 'TERMINATED':
+            print("VM instance not found")
+            return None
+
+        vcn_id, subnet_id = await self.run(provider.terminate, vm_instance)
+        instance = await self.wait_instance(vm_instance.id, 'TERMINATED',
+                                            timeout=timeout)
+        servers = await self.run(provider.update_dict, instance.__dict__,
+                                 kind='vm')
+        await self.run(provider.release_network, vm_instance.id,
+                       vcn_id, subnet_id)
+        return servers
+
+    async def _action(self, name, action, state, wait, timeout,
+                      change=False):
+        instance = await self.run(self.provider.instance_action, name, action)
+        if instance is None:
+            print("VM instance not found")
+            return None
+        if wait:
+            if change and instance.lifecycle_state == state:
+                # a rebooted vm is still running right after the action
+                await self.wait_instance(instance.id, state,
+                                         timeout=timeout, leave=True)
+            instance = await self.wait_instance(instance.id, state,
+                                                timeout=timeout)
+        return instance
+
+    async def start(self, name=None, wait=False, timeout=600):
+        return await self._action(name, 'START', 'RUNNING', wait, timeout)
+
+    async def stop(self, name=None, wait=False, timeout=600):
+        return await self._action(name, 'SOFTSTOP', 'STOPPED', wait, timeout)
+
+    async def reboot(self, name=None, wait=False, timeout=600):
+        return await self._action(name, 'SOFTRESET', 'RUNNING', wait,
+                                  timeout, change=True)
+
+    async def suspend(self, name=None, wait=False, timeout=600):
+        return await self.stop(name, wait=wait, timeout=timeout)
+
+    async def resume(self, name=None, wait=False, timeout=600):
+        return await self.start(name, wait=wait, timeout=timeout)
+
+    async def status(self, name=None):
+        return await self.run(self.provider.status, name)
+
+    async def log(self, vm=None, timeout=600):
+        """
+        Captures the console history of the vm
+
+        :param vm: the name of the vm
+        :param timeout: the number of seconds to wait for the capture
+        :return: the console history
+        """
+        compute = self.provider.compute
+        instance_id = await self.run(self.provider.get_instance_id, vm)
+        details = oci.core.models.CaptureConsoleHistoryDetails(
+            instance_id=instance_id)
+        history = (await self.run(compute.capture_console_history,
+                                  details)).data
+        await self.wait_until(
+            functools.partial(compute.get_console_history, history.id),
+            'SUCCEEDED',
+            timeout=timeout)
+        return (await self.run(compute.get_console_history_content,
+                               history.id)).data
+
+    async def ssh(self, vm=None, command=None):
+        """
+        Runs the command on the vm with an ssh subprocess over the shared
+        connection of the vm. Without a command an interactive shell is
+        opened as in the provider.
+
+        :param vm: the dict of the vm
+        :param command: the command, an interactive shell if None
+        :return: the output of the command, or None if it failed
+        """
+        session = self.provider.ssh_session(vm)
+        if not command:
+            await self.run(session.interactive)
+            return None
+        if session.multiplex:
+            await self.run(session.open)
+
+        args = session.args(session.location, command)
+
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE)
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            print("ERROR: %s" % stderr.decode("utf-8"))
+            return None
+        return stdout.decode("utf-8")
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+from time import time
+
+from cloudmesh.common.util import path_expand
+
+
+class InstanceCache(object):
+    """
+    Maps the display names of the vms to their instance OCIDs. The mapping
+    is kept in memory and in a local file so that it is shared between
+    processes. The file is read again when another process changed it.
+    Entries expire after ttl seconds and are invalidated when a vm is
+    created, destroyed or renamed.
+    """
+
+    def __init__(self, cloud="oracle", ttl=300,
+                 filename="~/.cloudmesh/oracle/instances.json"):
+        """
+        :param cloud: the name of the cloud in the yaml file
+        :param ttl: the number of seconds an entry is valid
+        :param filename: the location of the cache file
+        """
+        self.cloud = cloud
+        self.ttl = ttl
+        self.filename = path_expand(filename)
+        self.lock = threading.Lock()
+        self.entries = None
+        self.mtime = None
+
+    def _mtime(self):
+        # the file is replaced on each write, so a new inode also shows a
+        # change within the resolution of the modification time
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        mtime = self._mtime()
+        if self.entries is None or mtime != self.mtime:
+            try:
+                with open(self.filename, 'r') as f:
+                    self.entries = json.load(f).get(self.cloud, {})
+            except (FileNotFoundError, ValueError):
+                self.entries = {}
+            self.mtime = mtime
+        return self.entries
+
+    def _save(self):
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data[self.cloud] = self.entries
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        tmp = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.filename)
+        self.mtime = self._mtime()
+
+    def get(self, name):
+        """
+        :param name: the name of the vm
+        :return: the OCID or None if it is not cached or expired
+        """
+        with self.lock:
+            entry = self._load().get(name)
+        if entry is None or time() - entry["time"] > self.ttl:
+            return None
+        return entry["id"]
+
+    def put(self, name, instance_id):
+        self.update({name: instance_id})
+
+    def update(self, ids):
+        """
+        adds several entries with one write of the cache file
+
+        :param ids: dict of OCIDs by name
+        """
+        now = time()
+        with self.lock:
+            entries = self._load()
+            for name, instance_id in ids.items():
+                entries[name] = {"id": instance_id, "time": now}
+            self._save()
+
+    def invalidate(self, name=None):
+        """
+        removes the entry of a vm
+
+        :param name: the name of the vm, if None all entries are removed
+        """
+        with self.lock:
+            entries = self._load()
+            if name is None:
+                entries.clear()
+            else:
+                entries.pop(name, None)
+            self._save()
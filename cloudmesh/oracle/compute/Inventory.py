@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import threading
+from time import time
+
+from cloudmesh.common.util import path_expand
+
+
+class Inventory(object):
+    """
+    A local sqlite store of the compute resources of a cloud (vms, images,
+    flavors and ips) indexed by kind, OCID and name. Each entry holds the
+    dict returned by the provider together with its lifecycle state and
+    creation time, which are used to refresh the store incrementally. The
+    time of the last refresh is kept for each kind, so callers can decide if
+    the entries are stale.
+    """
+
+    def __init__(self, cloud="oracle",
+                 filename="~/.cloudmesh/oracle/inventory.db"):
+        """
+        :param cloud: the name of the cloud in the yaml file
+        :param filename: the location of the sqlite database
+        """
+        self.cloud = cloud
+        self.filename = path_expand(filename)
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS resources ("
+                "cloud TEXT, kind TEXT, id TEXT, name TEXT, state TEXT, "
+                "time_created TEXT, data TEXT, "
+                "PRIMARY KEY (cloud, kind, id))")
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS resources_name "
+                "ON resources (cloud, kind, name)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS refresh ("
+                "cloud TEXT, kind TEXT, time REAL, "
+                "PRIMARY KEY (cloud, kind))")
+
+    def _connect(self):
+        return sqlite3.connect(self.filename, timeout=30)
+
+    @staticmethod
+    def _encode(entry):
+        return json.dumps(
+            entry,
+            default=lambda o: o.__dict__ if hasattr(o, "__dict__") else str(o))
+
+    def age(self, kind):
+        """
+        :param kind: the kind of the resources
+        :return: the seconds since the last refresh or None if never
+                 refreshed
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT time FROM refresh WHERE cloud=? AND kind=?",
+                (self.cloud, kind)).fetchone()
+        return None if row is None else time() - row[0]
+
+    def touch(self, kind):
+        """
+        records that the resources of the kind were refreshed now
+
+        :param kind: the kind of the resources
+        """
+        with self.lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO refresh VALUES (?, ?, ?)",
+                (self.cloud, kind, time()))
+
+    def states(self, kind):
+        """
+        :param kind: the kind of the resources
+        :return: dict of (state, time_created, name) by OCID
+        """
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id, state, time_created, name FROM resources "
+                "WHERE cloud=? AND kind=?",
+                (self.cloud, kind)).fetchall()
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+    def upsert(self, kind, entries):
+        """
+        adds or replaces entries
+
+        :param kind: the kind of the resources
+        :param entries: list of dicts with the keys id, name, state,
+                        time_created and data
+        """
+        with self.lock, self._connect() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO resources "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.cloud, kind, entry["id"], entry["name"],
+                  entry["state"], entry["time_created"],
+                  self._encode(entry["data"]))
+                 for entry in entries])
+
+    def delete(self, kind, ids=None):
+        """
+        deletes entries
+
+        :param kind: the kind of the resources
+        :param ids: the OCIDs, if None all entries of the kind are deleted
+        """
+        with self.lock, self._connect() as db:
+            if ids is None:
+                db.execute(
+                    "DELETE FROM resources WHERE cloud=? AND kind=?",
+                    (self.cloud, kind))
+                db.execute(
+                    "DELETE FROM refresh WHERE cloud=? AND kind=?",
+                    (self.cloud, kind))
+            else:
+                db.executemany(
+                    "DELETE FROM resources WHERE cloud=? AND kind=? AND id=?",
+                    [(self.cloud, kind, id) for id in ids])
+
+    def find(self, kind, name=None, id=None):
+        """
+        finds the entries with the name or OCID
+
+        :param kind: the kind of the resources
+        :param name: the name
+        :param id: the OCID
+        :return: the list of dicts
+        """
+        query = "SELECT data FROM resources WHERE cloud=? AND kind=?"
+        args = [self.cloud, kind]
+        if name is not None:
+            query += " AND name=?"
+            args.append(name)
+        if id is not None:
+            query += " AND id=?"
+            args.append(id)
+        with self._connect() as db:
+            rows = db.execute(query + " ORDER BY name", args).fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+
+from cloudmesh.common.util import path_expand
+from cloudmesh.oracle.FileLock import FileLock
+
+
+class NetworkPool(object):
+    """
+    Keeps the named networks (vcn and subnet) that are shared by the vms of
+    the oracle provider in a local file, together with the OCIDs of the
+    instances that use them. Only networks created through the pool are
+    owned by it; a network that was found in the cloud may be used by other
+    workstations and is never deleted. An owned network can be deleted once
+    no instance refers to it anymore. The file is shared by the cms
+    commands of a workstation, every change of it holds a FileLock.
+
+    The file is stored as json in the form::
+
+        {
+            "cloudmesh": {
+                "vcn_id": "ocid1.vcn...",
+                "subnet_id": "ocid1.subnet...",
+                "availability_domain": "xyz:US-ASHBURN-AD-1",
+                "owned": true,
+                "instances": ["ocid1.instance..."]
+            }
+        }
+    """
+
+    def __init__(self, cloud="oracle",
+                 filename="~/.cloudmesh/oracle/networks.json"):
+        """
+        :param cloud: the name of the cloud in the yaml file
+        :param filename: the location of the pool file
+        """
+        self.cloud = cloud
+        self.filename = path_expand(filename)
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        return data.get(self.cloud, {})
+
+    def _save(self, networks):
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        data[self.cloud] = networks
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        tmp = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.filename)
+
+    def get(self, name):
+        """
+        :param name: the name of the network
+        :return: the dict of the network or None
+        """
+        with self.lock, FileLock(self.filename):
+            return self._load().get(name)
+
+    def add(self, name, vcn_id=None, subnet_id=None,
+            availability_domain=None, owned=False):
+        """
+        adds a network to the pool, keeping the instances of an existing
+        entry with the same name
+
+        :param name: the name of the network
+        :param vcn_id: the OCID of the vcn
+        :param subnet_id: the OCID of the subnet
+        :param availability_domain: the availability domain of the subnet
+        :param owned: True if the network was created through the pool
+        :return: the dict of the network
+        """
+        with self.lock, FileLock(self.filename):
+            networks = self._load()
+            instances = networks.get(name, {}).get("instances", [])
+            networks[name] = {
+                "vcn_id": vcn_id,
+                "subnet_id": subnet_id,
+                "availability_domain": availability_domain,
+                "owned": owned,
+                "instances": instances
+            }
+            self._save(networks)
+            return networks[name]
+
+    def names(self, vcn_id):
+        """
+        :param vcn_id: the OCID of a vcn
+        :return: the names of the networks in the vcn
+        """
+        with self.lock, FileLock(self.filename):
+            return [name for name, network in self._load().items()
+                    if network["vcn_id"] == vcn_id]
+
+    def remove(self, name):
+        with self.lock, FileLock(self.filename):
+            networks = self._load()
+            networks.pop(name, None)
+            self._save(networks)
+
+    def remove_vcn(self, vcn_id):
+        """
+        removes all networks in the vcn
+
+        :param vcn_id: the OCID of the vcn
+        """
+        with self.lock, FileLock(self.filename):
+            networks = self._load()
+            for name in [name for name, network in networks.items()
+                         if network["vcn_id"] == vcn_id]:
+                del networks[name]
+            self._save(networks)
+
+    def attach(self, name, instance_ids):
+        """
+        records that the instances use the network
+
+        :param name: the name of the network
+        :param instance_ids: the list of instance OCIDs
+        """
+        with self.lock, FileLock(self.filename):
+            networks = self._load()
+            instances = networks[name]["instances"]
+            for instance_id in instance_ids:
+                if instance_id not in instances:
+                    instances.append(instance_id)
+            self._save(networks)
+
+    def detach(self, instance_id):
+        """
+        removes the instance from the network it uses
+
+        :param instance_id: the OCID of the instance
+        :return: the name of the network and the number of remaining
+                 instances, or (None, None) if the instance is not in the
+                 pool
+        """
+        with self.lock, FileLock(self.filename):
+            networks = self._load()
+            for name, network in networks.items():
+                if instance_id in network["instances"]:
+                    network["instances"].remove(instance_id)
+                    self._save(networks)
+                    return name, len(network["instances"])
+        return None, None
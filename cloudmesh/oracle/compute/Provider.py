@@ -1,26 +1,35 @@
-import oci
-
+import copy
 import os
-import subprocess
-from time import sleep
-from sys import platform
-import ctypes
+import random
+import socket
+from fnmatch import fnmatch
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, \
+    as_completed
+from concurrent.futures import wait as wait_futures
+from time import sleep, time
 
 from cloudmesh.abstract.ComputeNodeABC import ComputeNodeABC
-from cloudmesh.common.Printer import Printer
 from cloudmesh.common.console import Console
 from cloudmesh.common.parameter import Parameter
 from cloudmesh.common.util import banner
 from cloudmesh.common.util import path_expand
-from cloudmesh.common.variables import Variables
-from cloudmesh.common.DictList import DictList
 from cloudmesh.configuration.Config import Config
 from cloudmesh.provider import ComputeProviderPlugin
-from cloudmesh.secgroup.Secgroup import Secgroup, SecgroupRule
-from cloudmesh.common.DateTime import DateTime
-from cloudmesh.image.Image import Image
+from cloudmesh.oracle.Clients import Clients
+from cloudmesh.oracle.LazyImport import lazy_import
+from cloudmesh.oracle.compute.InstanceCache import InstanceCache
+from cloudmesh.oracle.compute.Inventory import Inventory
+from cloudmesh.oracle.compute.NetworkPool import NetworkPool
+from cloudmesh.oracle.compute.PublicIpPool import PublicIpPool
+from cloudmesh.oracle.compute.SecgroupReconciler import SecgroupReconciler
+from cloudmesh.oracle.compute.Ssh import Ssh
 import textwrap
 
+# the sdk and the modules only needed by some commands are loaded on first
+# use to keep the startup of the cms shell fast
+oci = lazy_import("oci")
+
 
 class Provider(ComputeNodeABC, ComputeProviderPlugin):
     kind = "oracle"
@@ -40,6 +49,18 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
           default:
             image: ami-0f65671a86f061fcd
             size: t2.micro
+            network: cloudmesh
+            cache_ttl: 300
+            pool_size: 50
+            keep_alive: true
+            metrics: true
+            ssh_persist: 600
+            ip_pool: 0
+            inventory:
+              vm: 60
+              image: 3600
+              flavor: 86400
+              ip: 60
           credentials:
             user: {user}
             fingerprint: {fingerprint}
@@ -50,6 +71,14 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
             region: us-ashburn-1
     """)
 
+    # seconds after which the inventory of a kind is refreshed
+    inventory_ttl = {
+        "vm": 60,
+        "image": 3600,
+        "flavor": 86400,
+        "ip": 60
+    }
+
     vm_state = [
         'STARTING',
         'RUNNING',
@@ -175,10 +204,22 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
             "order": ["name", 'floating_ip_address', 'fixed_ip_address'],
             "header": ["Name", 'Floating', 'Fixed']
         },
+        "action": {
+            "sort_keys": ["name"],
+            "order": ["name",
+                      "action",
+                      "result",
+                      "state"],
+            "header": ["Name",
+                       "Action",
+                       "Result",
+                       "State"]
+        },
     }
 
     # noinspection PyPep8Naming
     def Print(self, data, output=None, kind=None):
+        from cloudmesh.common.Printer import Printer
 
         if output == "table":
             if kind == "secrule":
@@ -261,23 +302,67 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
                     f"The credential for Oracle cloud is incomplete. {field} "
                     "must not be TBD")
         self.credential = self._get_credentials(self.cred)
+        Clients.configure(pool_size=self.default.get("pool_size"),
+                          keep_alive=self.default.get("keep_alive"),
+                          metrics=self.default.get("metrics"))
 
-        self.compute = oci.core.ComputeClient(self.credential)
-        self.virtual_network = oci.core.VirtualNetworkClient(self.credential)
-        self.identity_client = oci.identity.IdentityClient(self.credential)
         self.compartment_id = self.credential["compartment_id"]
+        self.networks = NetworkPool(cloud=name)
+        self.instances = InstanceCache(
+            cloud=name, ttl=int(self.default.get("cache_ttl", 300)))
+        self._inventory = None
+        self._public_ips = None
 
         try:
             self.public_key_path = conf["profile"]["publickey"]
-            self.key_path = path_expand(
-                Config()["cloudmesh"]["profile"]["publickey"])
-            f = open(self.key_path, 'r')
-            self.key_val = f.read()
+            self.key_path = path_expand(self.public_key_path)
         except:
             raise ValueError("the public key location is not set in the "
                              "profile of the yaml file.")
+        self._key_val = None
 
-    def update_dict(self, elements, kind=None):
+    @property
+    def key_val(self):
+        # the public key is only read when a vm is created
+        if self._key_val is None:
+            try:
+                with open(self.key_path, 'r') as f:
+                    self._key_val = f.read()
+            except OSError:
+                raise ValueError("the public key location is not set in the "
+                                 "profile of the yaml file.")
+        return self._key_val
+
+    @property
+    def inventory(self):
+        # the database is only opened when the inventory is used
+        if self._inventory is None:
+            self._inventory = Inventory(cloud=self.cloud)
+        return self._inventory
+
+    @property
+    def public_ips(self):
+        # the public ips are only listed when the pool is used
+        if self._public_ips is None:
+            self._public_ips = PublicIpPool(
+                self,
+                warm=int(self.default.get("ip_pool", 0)),
+                ttl=self.inventory_ttl.get("ip", 60))
+        return self._public_ips
+
+    @property
+    def compute(self):
+        return Clients.get("compute", self.credential)
+
+    @property
+    def virtual_network(self):
+        return Clients.get("virtual_network", self.credential)
+
+    @property
+    def identity_client(self):
+        return Clients.get("identity", self.credential)
+
+    def update_dict(self, elements, kind=None, lookup=None):
         """
         This function adds a cloudmesh cm dict to each dict in the list
         elements.
@@ -290,9 +375,14 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
                          dict a list with a single element is returned.
         :param kind: for some kinds special attributes are added. This includes
                      key, vm, image, flavor.
+        :param lookup: for kind vm the image names and ip addresses as
+                       returned by vm_lookup. If None, they are fetched for
+                       each vm separately.
         :return: The list with the modified dicts
         """
 
+        from cloudmesh.common.DateTime import DateTime
+
         if elements is None:
             return None
         elif type(elements) == list:
@@ -324,18 +414,29 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
 
             elif kind == 'vm':
                 entry['name'] = entry["cm"]["name"] = entry["_display_name"]
-                entry['_image'] = self.compute.get_image(
-                    entry['_image_id']).data.display_name
-
-                private = self.get_private_ipobj(entry['_id'])
-                if private:
-                    details = oci.core.models.GetPublicIpByPrivateIpIdDetails(
-                        private_ip_id=private.id)
-                    public = self.virtual_network.get_public_ip_by_private_ip_id(
-                        details).data
-                    if public:
-                        entry['ip_public'] = public.ip_address
-                    entry['ip_private'] = private.ip_address
+                if lookup is None:
+                    entry['_image'] = self.compute.get_image(
+                        entry['_image_id']).data.display_name
+
+                    private = self.get_private_ipobj(entry['_id'])
+                    if private:
+                        details = \
+                            oci.core.models.GetPublicIpByPrivateIpIdDetails(
+                                private_ip_id=private.id)
+                        network = self.virtual_network
+                        public = network.get_public_ip_by_private_ip_id(
+                            details).data
+                        if public:
+                            entry['ip_public'] = public.ip_address
+                        entry['ip_private'] = private.ip_address
+                else:
+                    entry['_image'] = lookup['image'].get(entry['_image_id'])
+                    private = lookup['private'].get(entry['_id'])
+                    if private:
+                        public = lookup['public'].get(private.id)
+                        if public:
+                            entry['ip_public'] = public.ip_address
+                        entry['ip_private'] = private.ip_address
 
                 entry["cm"]["created"] = str(entry["_time_created"])
                 entry["status"] = entry["cm"]["status"] = str(
@@ -381,11 +482,97 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
     def get_instance(self, name):
         vm_instance = self.compute.list_instances(self.compartment_id,
                                                   display_name=name).data
-        if vm_instance:
+        alive = [vm for vm in vm_instance
+                 if vm.lifecycle_state != 'TERMINATED']
+        if alive:
+            self.instances.put(name, alive[0].id)
+            return alive[0]
+        elif vm_instance:
             return vm_instance[0]
         else:
             return None
 
+    def get_instance_id(self, name):
+        """
+        Returns the OCID of the named vm from the cache and only lists the
+        instances if it is not cached
+
+        :param name: the name of the vm
+        :return: the OCID or None
+        """
+        instance_id = self.instances.get(name)
+        if instance_id is None:
+            vm_instance = self.get_instance(name)
+            if vm_instance is not None:
+                instance_id = vm_instance.id
+        return instance_id
+
+    def find_instance(self, name):
+        """
+        Returns the named vm with a single get_instance call when its OCID is
+        cached. A cached OCID of a vm that is terminated, renamed or gone is
+        resolved again. Terminated vms are not returned.
+
+        :param name: the name of the vm
+        :return: the oci instance object or None
+        """
+        instance_id = self.instances.get(name)
+        if instance_id is not None:
+            try:
+                vm_instance = self.compute.get_instance(instance_id).data
+                if vm_instance.display_name == name and \
+                        vm_instance.lifecycle_state != 'TERMINATED':
+                    return vm_instance
+            except oci.exceptions.ServiceError as e:
+                if e.status != 404:
+                    raise
+            self.instances.invalidate(name)
+        vm_instance = self.get_instance(name)
+        if vm_instance is None or \
+                vm_instance.lifecycle_state == 'TERMINATED':
+            return None
+        return vm_instance
+
+    def instance_action(self, name, action):
+        """
+        Runs the action on the named vm. When the OCID of the vm is cached
+        this is a single api call. If the call fails with 404 or 409 the
+        cached OCID may belong to a vm that was terminated and created
+        again, the vm is then resolved again and the action is repeated for
+        a different OCID.
+
+        :param name: the name of the vm
+        :param action: the oci action, e.g. START, SOFTSTOP, SOFTRESET
+        :return: the oci instance object or None if the vm is not found
+        """
+        instance_id = self.instances.get(name)
+        error = None
+        if instance_id is not None:
+            try:
+                return self.compute.instance_action(instance_id, action).data
+            except oci.exceptions.ServiceError as e:
+                if e.status not in (404, 409):
+                    raise
+                self.instances.invalidate(name)
+                error = e
+        vm_instance = self.find_instance(name)
+        if vm_instance is None:
+            return None
+        if error is not None and vm_instance.id == instance_id:
+            # the cached OCID was right, the vm is in the wrong state
+            raise error
+        return self.compute.instance_action(vm_instance.id, action).data
+
+    def in_state(self, name, states):
+        """
+        :param name: the name of the vm
+        :param states: the list of lifecycle states
+        :return: True if the vm exists and is in one of the states
+        """
+        vm_instance = self.find_instance(name)
+        return vm_instance is not None and \
+            vm_instance.lifecycle_state in states
+
     def keys(self):
         """
         Lists the keys on the cloud
@@ -465,20 +652,16 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :param description: The description
         :return:
         """
-
-        try:
-            portmin, portmax = port.split(":")
-        except:
-            portmin = None
-            portmax = None
         sec_group = self.list_secgroups(name)
         if sec_group:
-            rule_details = oci.core.models.AddSecurityRuleDetails(
-                direction='INGRESS', protocol=protocol)
-            details = oci.core.models.AddNetworkSecurityGroupSecurityRulesDetails(
-                security_rules=[rule_details])
+            low, high = SecgroupReconciler.ports(port)
+            rule_details = SecgroupReconciler.details(
+                SecgroupReconciler.key(protocol, ip_range, low, high))
+            details = oci.core.models.\
+                AddNetworkSecurityGroupSecurityRulesDetails(
+                    security_rules=[rule_details])
             self.virtual_network.add_network_security_group_security_rules(
-                sec_group[0].id, details)
+                sec_group[0]['oracle_id'], details)
         else:
             print("Security group not found")
 
@@ -489,59 +672,60 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :param name: The name
         :return:
         """
-        sec_group = self.list_secgroups(name)
+        def alive():
+            return [group for group in self.list_secgroups(name)
+                    if group['_lifecycle_state'] not in
+                    ('TERMINATING', 'TERMINATED')]
+
+        sec_group = alive()
         if sec_group:
-            self.virtual_network.delete_network_security_group(sec_group[0].id)
-            sec_group = self.list_secgroups(name)
+            self.virtual_network.delete_network_security_group(
+                sec_group[0]['oracle_id'])
+            sec_group = alive()
         else:
             print("Security group with this name not found")
         return len(sec_group) == 0
 
     def upload_secgroup(self, name=None):
+        """
+        Uploads the local security group with its rules. The rules that
+        are missing in the cloud are added in batches.
+
+        :param name: the name of the group
+        """
+        reconciler = SecgroupReconciler(self)
 
         cgroups = self.list_secgroups(name)
-        group_exists = False
         if len(cgroups) > 0:
             print("Warning group already exists")
-            group_exists = True
-
-        groups = Secgroup().list()
-        rules = SecgroupRule().list()
-
-        data = {}
-        for rule in rules:
-            data[rule['name']] = rule
 
-        for group in groups:
-            if group['name'] == name:
-                break
+        group = reconciler.groups.get(name)
+        if group is None:
+            raise ValueError("group does not exist")
         print("upload group:", name)
 
-        if not group_exists:
-            self.add_secgroup(name=name, description=group['description'])
-
-            for r in group['rules']:
-                if r != 'nothing':
-                    found = data[r]
-                    print("    ", "rule:", found['name'])
-                    self.add_secgroup_rule(
-                        name=name,
-                        port=found["ports"],
-                        protocol=found["protocol"],
-                        ip_range=found["ip_range"])
-
+        if cgroups:
+            nsg_id = cgroups[0]['oracle_id']
         else:
+            secgroup = self.add_secgroup(name=name,
+                                         description=group['description'])
+            if secgroup is None:
+                return
+            nsg_id = secgroup.id
 
-            for r in group['rules']:
-                if r != 'nothing':
-                    found = data[r]
-                    print("    ", "rule:", found['name'])
-                    self.add_rules_to_secgroup(
-                        name=name,
-                        rules=[found['name']])
+        for r in group['rules']:
+            if r != 'nothing':
+                print("    ", "rule:", r)
+        reconciler.sync(name, nsg_id, remove=False)
 
     def add_rules_to_secgroup(self, name=None, rules=None):
+        """
+        Adds the local rules to the security group in batches. Rules that
+        exist in the cloud already are skipped.
 
+        :param name: the name of the group
+        :param rules: the names of the rules
+        """
         if name is None and rules is None:
             raise ValueError("name or rules are None")
 
@@ -549,26 +733,40 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         if len(cgroups) == 0:
             raise ValueError("group does not exist")
 
-        groups = DictList(Secgroup().list())
-        rules_details = DictList(SecgroupRule().list())
+        SecgroupReconciler(self).sync(name,
+                                      cgroups[0]['oracle_id'],
+                                      rules=rules,
+                                      remove=False)
 
-        try:
-            group = groups[name]
-        except:
-            raise ValueError("group does not exist")
-
-        for rule in rules:
-            try:
-                found = rules_details[rule]
-                self.add_secgroup_rule(name=name,
-                                       port=found["ports"],
-                                       protocol=found["protocol"],
-                                       ip_range=found["ip_range"])
-            except:
-                ValueError("rule can not be found")
+    def reconcile_secgroups(self, names=None, vcn_id=None, remove=True,
+                            parallel=10):
+        """
+        Makes the ingress rules of the security groups in the cloud equal
+        to the local Secgroup definitions. The local definitions and the
+        rules of each group are read once and the differences are applied
+        in batches, the groups are reconciled concurrently.
+
+        :param names: the names of the groups, all local groups if None
+        :param vcn_id: the OCID of the vcn, all vcns if None
+        :param remove: if False rules that are not defined locally are kept
+        :param parallel: the number of groups reconciled at the same time
+        :return: list of dicts with name, id, added, removed and calls
+        """
+        return list(SecgroupReconciler(self).reconcile(names=names,
+                                                       vcn_id=vcn_id,
+                                                       remove=remove,
+                                                       parallel=parallel))
 
     def remove_rules_from_secgroup(self, name=None, rules=None):
+        """
+        Removes the local rules from the security group in batches. Rules
+        that are not in the cloud are skipped.
 
+        :param name: the name of the group
+        :param rules: the names of the rules, all rules of the local group
+                      if None
+        :return: dict with name, id, added, removed and calls
+        """
         if name is None and rules is None:
             raise ValueError("name or rules are None")
 
@@ -576,50 +774,103 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         if len(cgroups) == 0:
             raise ValueError("group does not exist")
 
-        groups = DictList(Secgroup().list())
-        rules_details = DictList(SecgroupRule().list())
+        return SecgroupReconciler(self).remove(name,
+                                               cgroups[0]['oracle_id'],
+                                               rules=rules)
 
+    def refresh(self, kind, force=False):
+        """
+        Refreshes the inventory of a kind (vm, image, flavor, ip) if it is
+        older than the staleness configured in the inventory section of the
+        defaults in the yaml file.
+
+        Each kind is refreshed with one listing. The listed entries are
+        upserted and the rows that are missing from the listing are
+        deleted. Only vms and images that are new or whose name or
+        lifecycle state changed are converted, which avoids the image and
+        ip lookups for unchanged vms.
+
+        :param kind: the kind of the resources
+        :param force: refresh even if the inventory is not stale and
+                      convert all vms and images
+        """
+        ttl = self.inventory_ttl.get(kind, 60)
         try:
-            group = groups[name]
-        except:
-            raise ValueError("group does not exist")
+            ttl = float(self.default["inventory"][kind])
+        except (KeyError, TypeError):
+            pass
+        age = self.inventory.age(kind)
+        if not force and age is not None and age < ttl:
+            return
+
+        rows = self.inventory_rows
+
+        def replace(kind, entries):
+            # upserts the entries and deletes the rows missing from them
+            new = rows(entries)
+            current = {row["id"] for row in new}
+            self.inventory.upsert(kind, new)
+            self.inventory.delete(
+                kind, [id for id in self.inventory.states(kind)
+                       if id not in current])
+
+        if kind in ("vm", "image"):
+            list_call = self.compute.list_instances if kind == "vm" \
+                else self.compute.list_images
+            known = self.inventory.states(kind)
+            listed = []
+            for page in self.pages(list_call, self.compartment_id):
+                listed += page
+            current = {entry.id for entry in listed}
+            changed = [entry for entry in listed
+                       if force or known.get(entry.id) !=
+                       (str(entry.lifecycle_state),
+                        str(entry.time_created),
+                        entry.display_name)]
+            self.inventory.delete(
+                kind, [id for id in known if id not in current])
+            self.inventory.upsert(kind, rows(self.get_list(changed,
+                                                           kind=kind)))
+
+        elif kind == "flavor":
+            shapes = []
+            for page in self.pages(self.compute.list_shapes,
+                                   self.compartment_id):
+                shapes += page
+            replace("flavor", self.get_list(shapes, kind="flavor"))
+
+        elif kind == "ip":
+            ips = []
+            for page in self.pages(self.virtual_network.list_public_ips,
+                                   "REGION",
+                                   self.compartment_id):
+                ips += page
+            replace("ip", self.get_list(ips, kind="ip"))
 
-        for rule in rules:
-            try:
-                found = rules_details[rule]
-                try:
-                    pmin, pmax = rules['ports'].split(":")
-                except:
-                    pmin = None
-                    pmax = None
-            except:
-                ValueError("rule can not be found")
-
-            for r in cgroups['security_group_rules']:
-
-                test = \
-                    r["port_range_max"] == pmin and \
-                    r["port_range_min"] == pmax and \
-                    r["protocol"] == found["protocol"] and \
-                    r["remote_ip_prefix"] == found["ports"]
-                # r["direction"] == "egress" \
-                # r["ethertype"] == "IPv6" \
-                # r["id"] == "1234e4e3-ba72-4e33-9844-..." \
-                # r["remote_group_id"]] == null \
-                # r["tenant_id"]] == "CH-12345"
-
-                if test:
-                    id = r["security_group_id"]
-                    list_test = [test]
-                    self.virtual_network.remove_network_security_group_security_rules(
-                        id,
-                        oci.core.models.RemoveNetworkSecurityGroupSecurityRulesDetails(
-                            list_test
-                        ))
-
-    def get_list(self, d, kind=None, debug=False, **kwargs):
+        else:
+            raise ValueError(f"unknown kind {kind}")
+
+        self.inventory.touch(kind)
+
+    @staticmethod
+    def inventory_rows(entries):
+        """
+        :param entries: the dicts of the resources
+        :return: the rows of the entries for Inventory.upsert
+        """
+        return [{
+            "id": entry.get("oracle_id", entry["name"]),
+            "name": entry.get("_display_name", entry["name"]),
+            "state": str(entry.get("_lifecycle_state")),
+            "time_created": str(entry.get("_time_created")),
+            "data": entry
+        } for entry in entries]
+
+    def get_list(self, d, kind=None, debug=False, lookup=None, **kwargs):
         """
         Lists the dict d on the cloud
+        :param lookup: the result of vm_lookup for vms, looked up for the
+                       vms in d if None
         :return: dict or libcloud object
         """
 
@@ -627,45 +878,132 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
             entries = []
             for entry in d:
                 entries.append(entry.__dict__)
-            return self.update_dict(entries, kind=kind)
+            if kind == "vm" and lookup is None:
+                lookup = self.vm_lookup(entries)
+            return self.update_dict(entries, kind=kind, lookup=lookup)
         return None
 
-    def images(self, **kwargs):
+    @staticmethod
+    def pages(list_call, *args, **kwargs):
+        """
+        Calls an oci list function page by page following the opc-next-page
+        header.
+
+        :param list_call: the oci list function, e.g. compute.list_instances
+        :param args: the positional arguments of the list function
+        :param kwargs: the keyword arguments of the list function
+        :return: generator of the data of each page
+        """
+        page = None
+        while True:
+            if page is None:
+                response = list_call(*args, **kwargs)
+            else:
+                response = list_call(*args, page=page, **kwargs)
+            yield response.data
+            page = response.next_page
+            if not page:
+                break
+
+    def get_list_iter(self, list_call, kind=None, **kwargs):
+        """
+        Lists the objects returned by list_call page by page
+
+        :param list_call: the oci list function taking the compartment id
+        :param kind: the kind passed to get_list
+        :param kwargs: the keyword arguments of the list function
+        :return: generator of the converted dicts
+        """
+        for page in self.pages(list_call, self.compartment_id, **kwargs):
+            for entry in self.get_list(page, kind=kind):
+                yield entry
+
+    def images_iter(self, **kwargs):
+        """
+        Lists the images on the cloud page by page
+
+        :param kwargs: the keyword arguments of list_images, e.g.
+                       operating_system or shape
+        :return: generator of image dicts
+        """
+        return self.get_list_iter(self.compute.list_images, kind="image",
+                                  **kwargs)
+
+    def images(self, cached=False, **kwargs):
         """
         Lists the images on the cloud
+        :param cached: if True the images are read from the inventory
         :return: dict object
         """
-        d = self.compute.list_images(self.compartment_id).data
-        return self.get_list(d, kind="image")
+        if cached:
+            self.refresh("image")
+            return self.inventory.find("image")
+        return [entry for entry in self.images_iter(**kwargs)]
 
     def image(self, name=None):
         """
-        Gets the image with a given name
+        Gets the image with a given name. The image is looked up in the
+        inventory first.
+
         :param name: The name of the image
         :return: the dict of the image
         """
+        self.refresh("image")
+        found = self.inventory.find("image", name=name)
+        if found:
+            return found[0]
 
         img = self.compute.list_images(self.compartment_id, display_name=name)
-        return img.data[0]
+        if not img.data:
+            return None
+        return self.get_list(img.data[:1], kind="image")[0]
 
-    def flavors(self):
+    def image_id(self, name=None):
+        """
+        :param name: The name of the image
+        :return: the OCID of the image
+        """
+        image = self.image(name)
+        if image is None:
+            raise ValueError(f"image {name} not found")
+        return image["oracle_id"]
+
+    def flavors_iter(self):
+        """
+        Lists the flavors on the cloud page by page
+
+        :return: generator of flavor dicts
+        """
+        return self.get_list_iter(self.compute.list_shapes, kind="flavor")
+
+    def flavors(self, cached=False):
         """
         Lists the flavors on the cloud
 
+        :param cached: if True the flavors are read from the inventory
         :return: dict of flavors
         """
-        flavor_list = self.compute.list_shapes(self.compartment_id).data
-        print(flavor_list)
-        return self.get_list(flavor_list, kind="flavor")
+        if cached:
+            self.refresh("flavor")
+            return self.inventory.find("flavor")
+        return [entry for entry in self.flavors_iter()]
 
     def flavor(self, name=None):
         """
-        Gets the flavor with a given name
+        Gets the flavor with a given name from the inventory. On a miss the
+        flavors are listed again before the flavor is reported as missing.
+
         :param name: The name of the flavor
-        :return: The dict of the flavor
+        :return: The dict of the flavor or None
         """
-
-        return self.find(self.flavors(), name=name)
+        self.refresh("flavor")
+        found = self.inventory.find("flavor", name=name)
+        if not found:
+            self.refresh("flavor", force=True)
+            found = self.inventory.find("flavor", name=name)
+        if found:
+            return found[0]
+        return None
 
     def start(self, name=None):
         """
@@ -675,13 +1013,16 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :return:  A list of dict representing the nodes
         """
 
-        vm_instance = self.get_instance(name)
-
-        if vm_instance:
-            if self.compute.get_instance(
-                vm_instance.id).data.lifecycle_state in 'STOPPED':
-                self.compute.instance_action(vm_instance.id, 'START')
-        else:
+        try:
+            vm_instance = self.instance_action(name, 'START')
+        except oci.exceptions.ServiceError as e:
+            # a conflict is fine if the vm is already running
+            if e.status != 409 or \
+                    not self.in_state(name, ['STARTING', 'RUNNING']):
+                raise
+            vm_instance = True
+
+        if vm_instance is None:
             print("VM instance not found")
 
     def stop(self, name=None):
@@ -692,13 +1033,16 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :return:  A list of dict representing the nodes
         """
 
-        vm_instance = self.get_instance(name)
-
-        if vm_instance:
-            if self.compute.get_instance(
-                vm_instance.id).data.lifecycle_state in 'RUNNING':
-                self.compute.instance_action(vm_instance.id, 'SOFTSTOP')
-        else:
+        try:
+            vm_instance = self.instance_action(name, 'SOFTSTOP')
+        except oci.exceptions.ServiceError as e:
+            # a conflict is fine if the vm is already stopped
+            if e.status != 409 or \
+                    not self.in_state(name, ['STOPPING', 'STOPPED']):
+                raise
+            vm_instance = True
+
+        if vm_instance is None:
             print("VM instance not found")
 
     def pause(self, name=None):
@@ -726,10 +1070,15 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :param name: The name of the virtual machine
         :return: The dict representing the node including updated status
         """
-        data = self.get_instance(name)
+        self.refresh("vm")
+        found = self.inventory.find("vm", name=name)
+        if found:
+            return found[:1]
+
+        data = self.find_instance(name)
 
         if data is None:
-            print("VM not found {name}")
+            print(f"VM not found {name}")
             return None
 
         r = self.update_dict(data.__dict__, kind="vm")
@@ -737,9 +1086,11 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
 
     def status(self, name=None):
 
-        vm_instance = self.get_instance(name)
-        r = self.compute.get_instance(vm_instance.id).data
-        return r.lifecycle_state
+        # find_instance skips terminated vms
+        vm_instance = self.find_instance(name) or self.get_instance(name)
+        if vm_instance is None:
+            return None
+        return vm_instance.lifecycle_state
 
     def suspend(self, name=None):
         """
@@ -760,17 +1111,38 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :param name: the name of the node
         :return: the dict of the node
         """
-        vm_instance = self.get_instance(name)
-        res = self.compute.instance_action(vm_instance.id, 'START')
-        return res
+        return self.instance_action(name, 'START')
+
+    def list_iter(self):
+        """
+        Lists the vms on the cloud page by page. The image names and ips of
+        all vms of the compartment are looked up once before the first
+        page, images of vms that were launched since then are fetched
+        when they show up.
 
-    def list(self):
+        :return: generator of vm dicts
+        """
+        lookup = self.vm_lookup()
+        for page in self.pages(self.compute.list_instances,
+                               self.compartment_id):
+            self.lookup_images(lookup, {vm.image_id for vm in page})
+            for entry in self.get_list(page, kind="vm", lookup=lookup):
+                yield entry
+
+    def list(self, cached=False):
         """
         Lists the vms on the cloud
 
+        :param cached: if True the vms are read from the inventory
         :return: dict of vms
         """
-        vm_list = self.compute.list_instances(self.compartment_id).data
+        if cached:
+            self.refresh("vm")
+            return self.inventory.find("vm")
+        vm_list = []
+        for page in self.pages(self.compute.list_instances,
+                               self.compartment_id):
+            vm_list += page
         return self.get_list(vm_list, kind="vm")
 
     def destroy(self, name=None):
@@ -779,20 +1151,10 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :param name: the name of the node
         :return: the dict of the node
         """
-        vm_instance = self.get_instance(name)
+        vm_instance = self.find_instance(name)
         servers = None
         if vm_instance and vm_instance.lifecycle_state != 'TERMINATED':
-            vnic = self.compute.list_vnic_attachments(
-                self.compartment_id, instance_id=vm_instance.id).data[0]
-
-            # Get associated vcn and subnet
-            if vnic.lifecycle_state != "DETACHED":
-                subnet_id = vnic.subnet_id
-                vcn_id = self.virtual_network.get_subnet(
-                    vnic.subnet_id).data.vcn_id
-
-            print("Terminating instance...")
-            self.compute.terminate_instance(vm_instance.id)
+            vcn_id, subnet_id = self.terminate(vm_instance)
 
             ins = oci.wait_until(
                 self.compute,
@@ -804,44 +1166,120 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
 
             servers = self.update_dict(ins.__dict__, kind='vm')
             print("Instance terminated.")
-            print("Deleting associated resources...")
 
-            if subnet_id:
-                self.virtual_network.delete_subnet(subnet_id)
+            self.release_network(vm_instance.id, vcn_id, subnet_id)
+        else:
+            print("VM instance not found")
+        return servers
+
+    def terminate(self, vm_instance):
+        """
+        Terminates the instance without waiting
 
-            if vcn_id:
-                vcn = self.virtual_network.get_vcn(
-                    vcn_id).data
+        :param vm_instance: the oci instance object
+        :return: the OCIDs of the vcn and subnet of the instance
+        """
+        vnic = self.compute.list_vnic_attachments(
+            self.compartment_id, instance_id=vm_instance.id).data[0]
 
-                # Update route table
-                self.virtual_network.update_route_table(
-                    vcn.default_route_table_id,
-                    oci.core.models.UpdateRouteTableDetails(route_rules=[]))
+        # Get associated vcn and subnet
+        subnet_id = None
+        vcn_id = None
+        if vnic.lifecycle_state != "DETACHED":
+            subnet_id = vnic.subnet_id
+            vcn_id = self.virtual_network.get_subnet(
+                vnic.subnet_id).data.vcn_id
 
-                # Delete gateway
-                gateway_id = self.virtual_network.list_internet_gateways(
-                    self.compartment_id, vcn_id).data[0].id
-                self.virtual_network.delete_internet_gateway(gateway_id)
+        print("Terminating instance...")
+        self.compute.terminate_instance(vm_instance.id)
+        self.instances.invalidate(vm_instance.display_name)
+        self.inventory.delete("vm", [vm_instance.id])
+        return vcn_id, subnet_id
 
-                # Delete security group
-                nsg_id = self.virtual_network.list_network_security_groups(
-                    self.compartment_id, vcn_id=vcn.id).data[0].id
-                self.virtual_network.delete_network_security_group(nsg_id)
+    def release_network(self, instance_id, vcn_id=None, subnet_id=None):
+        """
+        Removes a terminated instance from its network and deletes the
+        network when it was created through the pool, no other instance in
+        the pool uses it and no vnic is left in its subnet in the cloud.
+        Networks that were found in the cloud are kept. The network of an
+        instance that is not in the pool, e.g. a vm created before the
+        pool, is deleted as before if its vcn is not in the pool and no vnic
+        is left in its subnet.
+
+        :param instance_id: the OCID of the terminated instance
+        :param vcn_id: the OCID of the vcn of the instance
+        :param subnet_id: the OCID of the subnet of the instance
+        :return: True if the network was deleted
+        """
+        name, remaining = self.networks.detach(instance_id)
+        if name is None:
+            if vcn_id is None or self.networks.names(vcn_id):
+                print("The network of the instance is shared, it is kept.")
+                return False
+            # the network of a vm created before the pool
+            name = vcn_id
+        elif remaining > 0:
+            print(f"Network {name} is still used by {remaining} "
+                  "instances.")
+            return False
+        else:
+            network = self.networks.get(name) or {}
+            vcn_id = network.get("vcn_id") or vcn_id
+            subnet_id = network.get("subnet_id") or subnet_id
+            if not network.get("owned"):
+                print(f"Network {name} was not created here, it is kept.")
+                self.networks.remove(name)
+                return False
+        if subnet_id and self.virtual_network.list_private_ips(
+                subnet_id=subnet_id, limit=1).data:
+            print(f"Network {name} is still used by other vms.")
+            return False
+        print("Deleting associated resources...")
+        self.delete_vcn_and_subnet(vcn_id, subnet_id)
+        self.networks.remove_vcn(vcn_id)
+        print("Associated resources deleted")
+        return True
+
+    def delete_vcn_and_subnet(self, vcn_id=None, subnet_id=None):
+        """
+        Deletes the subnet, the vcn and the gateway, route rules and
+        security groups in it
+
+        :param vcn_id: the OCID of the vcn
+        :param subnet_id: the OCID of the subnet
+        """
+        if subnet_id:
+            self.virtual_network.delete_subnet(subnet_id)
+
+        if vcn_id:
+            vcn = self.virtual_network.get_vcn(
+                vcn_id).data
+
+            # Update route table
+            self.virtual_network.update_route_table(
+                vcn.default_route_table_id,
+                oci.core.models.UpdateRouteTableDetails(route_rules=[]))
+
+            # Delete gateway
+            for gateway in self.virtual_network.list_internet_gateways(
+                    self.compartment_id, vcn_id).data:
+                self.virtual_network.delete_internet_gateway(gateway.id)
+
+            # Delete security groups
+            for nsg in self.virtual_network.list_network_security_groups(
+                    self.compartment_id, vcn_id=vcn.id).data:
+                self.virtual_network.delete_network_security_group(nsg.id)
                 oci.wait_until(
                     self.virtual_network,
-                    self.virtual_network.get_network_security_group(nsg_id),
+                    self.virtual_network.get_network_security_group(nsg.id),
                     'lifecycle_state',
                     'TERMINATED',
                     succeed_on_not_found=True,
                     max_wait_seconds=300
                 )
 
-                # Delete VCN
-                self.virtual_network.delete_vcn(vcn_id)
-                print("Associated resources deleted")
-        else:
-            print("VM instance not found")
-        return servers
+            # Delete VCN
+            self.virtual_network.delete_vcn(vcn_id)
 
     def reboot(self, name=None):
         """
@@ -851,9 +1289,162 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :return:  A list of dict representing the nodes
         """
 
-        vm_instance = self.get_instance(name)
-        res = self.compute.instance_action(vm_instance.id, 'SOFTRESET')
-        return res
+        return self.instance_action(name, 'SOFTRESET')
+
+    def instance_actions(self,
+                         names=None,
+                         action=None,
+                         state=None,
+                         wait=False,
+                         parallel=10,
+                         timeout=600,
+                         change=False):
+        """
+        Runs the action on many vms. The OCIDs are resolved with one listing
+        of the instances, the actions are sent through a pool of parallel
+        workers and, if wait is True, all vms are waited on together.
+
+        :param names: the list of names or a pattern such as vm[001-200]
+        :param action: the oci action, e.g. START, SOFTSTOP, SOFTRESET
+        :param state: the lifecycle state to wait for
+        :param wait: if True wait until all vms reach the state
+        :param parallel: the number of concurrent action calls
+        :param timeout: the number of seconds to wait
+        :param change: if True a vm that is still in the state after the
+                       action has to leave it before it counts, as after a
+                       reboot
+        :return: list of dicts with name, id, action, result and state
+        """
+        if names is None:
+            raise ValueError("the names of the vms are required")
+        if type(names) == str:
+            names = Parameter.expand(names)
+
+        wanted = set(names)
+        found = {}
+        for page in self.pages(self.compute.list_instances,
+                               self.compartment_id):
+            for instance in page:
+                if instance.display_name in wanted and \
+                        instance.lifecycle_state != 'TERMINATED':
+                    found[instance.display_name] = instance
+        self.instances.update({name: instance.id
+                               for name, instance in found.items()})
+
+        results = {}
+        for name in names:
+            results[name] = {
+                "name": name,
+                "id": found[name].id if name in found else None,
+                "action": action,
+                "result": "ok" if name in found else "not found",
+                "state": found[name].lifecycle_state
+                if name in found else None
+            }
+
+        def run(name):
+            return self.compute.instance_action(found[name].id, action).data
+
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = {executor.submit(run, name): name for name in found}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name]["state"] = future.result().lifecycle_state
+                except Exception as e:
+                    results[name]["result"] = str(e)
+
+        if wait and state is not None:
+            ids = [entry["id"] for entry in results.values()
+                   if entry["result"] == "ok"]
+            changed = None
+            if change:
+                changed = [entry["id"] for entry in results.values()
+                           if entry["result"] == "ok" and
+                           entry["state"] == state]
+            instances = self.wait_for_instances(ids, state=state,
+                                                timeout=timeout,
+                                                changed=changed)
+            for entry in results.values():
+                if entry["id"] not in instances:
+                    continue
+                instance = instances[entry["id"]]
+                if instance is None:
+                    # the vm never left the state
+                    entry["result"] = "timeout"
+                    continue
+                entry["state"] = instance.lifecycle_state
+                if instance.lifecycle_state != state:
+                    entry["result"] = "timeout"
+
+        return [results[name] for name in names]
+
+    def start_many(self, names=None, wait=False, parallel=10, timeout=600):
+        """
+        Starts many vms
+
+        :param names: the list of names or a pattern such as vm[001-200]
+        :param wait: if True wait until all vms are running
+        :param parallel: the number of concurrent action calls
+        :param timeout: the number of seconds to wait
+        :return: list of dicts with the outcome for each vm
+        """
+        return self.instance_actions(names, 'START', 'RUNNING', wait=wait,
+                                     parallel=parallel, timeout=timeout)
+
+    def stop_many(self, names=None, wait=False, parallel=10, timeout=600):
+        """
+        Stops many vms
+
+        :param names: the list of names or a pattern such as vm[001-200]
+        :param wait: if True wait until all vms are stopped
+        :param parallel: the number of concurrent action calls
+        :param timeout: the number of seconds to wait
+        :return: list of dicts with the outcome for each vm
+        """
+        return self.instance_actions(names, 'SOFTSTOP', 'STOPPED', wait=wait,
+                                     parallel=parallel, timeout=timeout)
+
+    def reboot_many(self, names=None, wait=False, parallel=10, timeout=600):
+        """
+        Reboots many vms
+
+        :param names: the list of names or a pattern such as vm[001-200]
+        :param wait: if True wait until all vms went down and are running
+                     again
+        :param parallel: the number of concurrent action calls
+        :param timeout: the number of seconds to wait
+        :return: list of dicts with the outcome for each vm
+        """
+        return self.instance_actions(names, 'SOFTRESET', 'RUNNING',
+                                     wait=wait, parallel=parallel,
+                                     timeout=timeout, change=True)
+
+    def suspend_many(self, names=None, wait=False, parallel=10, timeout=600):
+        """
+        Suspends many vms, which is the same as stopping them
+
+        :param names: the list of names or a pattern such as vm[001-200]
+        :param wait: if True wait until all vms are stopped
+        :param parallel: the number of concurrent action calls
+        :param timeout: the number of seconds to wait
+        :return: list of dicts with the outcome for each vm
+        """
+        return self.stop_many(names, wait=wait, parallel=parallel,
+                              timeout=timeout)
+
+    def resume_many(self, names=None, wait=False, parallel=10, timeout=600):
+        """
+        Resumes many stopped vms
+
+        :param names: the list of names or a pattern such as vm[001-200]
+        :param wait: if True wait until all vms are running
+        :param parallel: the number of concurrent action calls
+        :param timeout: the number of seconds to wait
+        :return: list of dicts with the outcome for each vm
+        """
+        return self.start_many(names, wait=wait, parallel=parallel,
+                               timeout=timeout)
 
     def set_server_metadata(self, name, cm):
         """
@@ -952,9 +1543,8 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
                 route_table_id).data
             self.virtual_network.update_route_table(
                 route_table.id,
-                                                    oci.core.models.UpdateRouteTableDetails(
-                                                        route_rules=route_rules
-                                                    ))
+                oci.core.models.UpdateRouteTableDetails(
+                    route_rules=route_rules))
 
             return {'vcn': vcn, 'subnet': subnet}
 
@@ -966,6 +1556,89 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
             if vcn is not None:
                 self.virtual_network.delete_vcn(vcn.id)
 
+    def network(self, name=None):
+        """
+        Returns the named network that is shared by the vms. The network is
+        looked up in the local pool, then in the cloud by the display names
+        of its vcn and subnet, and only created if it does not exist. Only a
+        created network is owned by the pool and deleted with its last vm.
+
+        :param name: the name of the network, defaults to the network in the
+                     yaml file
+        :return: dict with name, vcn_id, subnet_id and availability_domain
+        """
+        name = name or self.default.get("network", "cloudmesh")
+        network = self.networks.get(name)
+        if network is not None and \
+                not self.subnet_available(network["subnet_id"]):
+            print(f"Network {name} does not exist anymore, it is removed "
+                  "from the pool.")
+            self.networks.remove(name)
+            network = None
+        if network is None:
+            availability_domain = self.get_availability_domain().name
+            vcn_id = None
+            subnet_id = None
+            for vcn in self.virtual_network.list_vcns(
+                    self.compartment_id, display_name='vcn_' + name,
+                    lifecycle_state='AVAILABLE').data:
+                subnets = self.virtual_network.list_subnets(
+                    self.compartment_id, vcn_id=vcn.id,
+                    display_name='subnet_' + name,
+                    lifecycle_state='AVAILABLE').data
+                if subnets:
+                    vcn_id = vcn.id
+                    subnet_id = subnets[0].id
+                    availability_domain = subnets[0].availability_domain
+                    break
+            owned = vcn_id is None
+            if owned:
+                vcn_and_subnet = self.create_vcn_and_subnet(
+                    name, availability_domain)
+                if vcn_and_subnet is None:
+                    raise RuntimeError(f"network {name} can not be created")
+                vcn_id = vcn_and_subnet['vcn'].id
+                subnet_id = vcn_and_subnet['subnet'].id
+            network = self.networks.add(
+                name,
+                vcn_id=vcn_id,
+                subnet_id=subnet_id,
+                availability_domain=availability_domain,
+                owned=owned)
+        network['name'] = name
+        return network
+
+    def subnet_available(self, subnet_id):
+        """
+        :param subnet_id: the OCID of a subnet
+        :return: True if the subnet exists and is available
+        """
+        if not subnet_id:
+            return False
+        try:
+            subnet = self.virtual_network.get_subnet(subnet_id).data
+        except oci.exceptions.ServiceError as e:
+            if e.status == 404:
+                return False
+            raise
+        return subnet.lifecycle_state == 'AVAILABLE'
+
+    def network_secgroup(self, name, vcn_id):
+        """
+        Returns the OCID of the named security group in the vcn and adds the
+        group if it does not exist
+
+        :param name: the name of the security group
+        :param vcn_id: the OCID of the vcn
+        :return: the OCID of the security group
+        """
+        groups = self.virtual_network.list_network_security_groups(
+            self.compartment_id, vcn_id=vcn_id, display_name=name).data
+        for group in groups:
+            if group.lifecycle_state == 'AVAILABLE':
+                return group.id
+        return self.add_secgroup(name, name, vcn_id).id
+
     def create(self,
                name=None,
                image=None,
@@ -980,6 +1653,7 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
                group=None,
                metadata=None,
                cloud=None,
+               network=None,
                **kwargs):
         """
         creates a named node
@@ -991,10 +1665,14 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         :param size: the size of the image
         :param timeout: a timeout in seconds that is invoked in case the image
                         does not boot. The default is set to 3 minutes.
+        :param network: the name of the shared network, defaults to the
+                        network in the yaml file
         :param kwargs: additional arguments HEADING(c=".")ed along at time of
                        boot
         :return:
         """
+        from cloudmesh.common.variables import Variables
+        from cloudmesh.image.Image import Image
 
         # user is 'opc' for oracle linux and windows based systems and
         # otherwise ubuntu
@@ -1031,55 +1709,26 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         print()
 
         try:
-            create_instance_details = oci.core.models.LaunchInstanceDetails()
-            create_instance_details.compartment_id = self.compartment_id
-            availability_domain = self.get_availability_domain()
-
-            vcn_and_subnet = self.create_vcn_and_subnet(
-                name,
-                                                        availability_domain.name)
-
-            if secgroup is not None:
-                # s = self.list_secgroups(secgroup)
-                # if (len(s) == 0):
-                s = self.add_secgroup(secgroup, secgroup,
-                                      vcn_and_subnet['vcn'].id)
-                s_id = s.id
-            # else:
-            # s_id = s[0]['_id']
-
-            create_instance_details.availability_domain = availability_domain.name
-            create_instance_details.display_name = name
+            shared = self.network(network)
 
             if secgroup is not None:
-                nsgs = [s_id]
+                nsgs = [self.network_secgroup(secgroup, shared['vcn_id'])]
             else:
                 nsgs = None
 
-            subnet = vcn_and_subnet['subnet']
-            create_instance_details.create_vnic_details = \
-                oci.core.models.CreateVnicDetails(
-                nsg_ids=nsgs,
-                subnet_id=subnet.id,
-                assign_public_ip=public
-            )
-
-            create_instance_details.image_id = self.image(image).id
-            create_instance_details.shape = size
-
-            if os.path.isfile(key):
-                key_file = open(key, "r")
-                create_instance_details.metadata = {
-                    "ssh_authorized_keys": key_file.read()}
-            else:
-                create_instance_details.metadata = {
-                    "ssh_authorized_keys":
-                        self.key_val}
-
-            result = self.compute.launch_instance(create_instance_details)
-            instance_ocid = result.data.id
-
-            get_instance_response = oci.wait_until(
+            instance_ocid = self.launch(
+                name=name,
+                image_id=self.image_id(image),
+                size=size,
+                key=key,
+                subnet_id=shared['subnet_id'],
+                nsgs=nsgs,
+                public=public,
+                availability_domain=shared['availability_domain'])
+            self.networks.attach(shared['name'], [instance_ocid])
+            self.instances.put(name, instance_ocid)
+
+            oci.wait_until(
                 self.compute,
                 self.compute.get_instance(instance_ocid),
                 'lifecycle_state',
@@ -1099,101 +1748,307 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         vm_instance = self.compute.get_instance(instance_ocid).data.__dict__
         return self.update_dict(vm_instance, kind="vm")[0]
 
+    def launch(self,
+               name=None,
+               image_id=None,
+               size=None,
+               key=None,
+               subnet_id=None,
+               nsgs=None,
+               public=True,
+               availability_domain=None):
+        """
+        launches an instance without waiting for it to run
+
+        :param name: the name of the node
+        :param image_id: the OCID of the image
+        :param size: the shape
+        :param key: the public key file, if not a file the profile key is used
+        :param subnet_id: the OCID of the subnet of the primary vnic
+        :param nsgs: the list of network security group OCIDs
+        :param public: if True a public ip is assigned
+        :param availability_domain: the name of the availability domain
+        :return: the OCID of the instance
+        """
+        details = oci.core.models.LaunchInstanceDetails()
+        details.compartment_id = self.compartment_id
+        details.availability_domain = availability_domain
+        details.display_name = name
+        details.create_vnic_details = oci.core.models.CreateVnicDetails(
+            nsg_ids=nsgs,
+            subnet_id=subnet_id,
+            assign_public_ip=public
+        )
+        details.image_id = image_id
+        details.shape = size
+
+        if key is not None and os.path.isfile(key):
+            with open(key, "r") as key_file:
+                details.metadata = {"ssh_authorized_keys": key_file.read()}
+        else:
+            details.metadata = {"ssh_authorized_keys": self.key_val}
+
+        return self.compute.launch_instance(details).data.id
+
+    def wait_for_instances(self,
+                           ids,
+                           state='RUNNING',
+                           timeout=600,
+                           interval=5,
+                           max_interval=30,
+                           changed=None):
+        """
+        waits until all given instances reach the state. Instead of polling
+        each instance, the instances of the compartment are listed once per
+        round.
+
+        :param ids: the OCIDs of the instances
+        :param state: the lifecycle state to wait for
+        :param timeout: the maximum number of seconds to wait
+        :param interval: the first polling interval, doubled each round
+        :param max_interval: the maximum polling interval
+        :param changed: the OCIDs of the instances that only count once
+                        they were seen in another state, e.g. after a reboot
+        :return: dict of the instance objects by OCID, in the last seen
+                 state, None for an instance of changed that was not seen
+                 in another state
+        """
+        pending = set(ids)
+        unchanged = set(changed or [])
+        instances = {}
+        start = time()
+        while True:
+            for page in self.pages(self.compute.list_instances,
+                                   self.compartment_id):
+                for instance in page:
+                    if instance.id in pending:
+                        instances[instance.id] = instance
+            for instance_id, instance in instances.items():
+                if instance.lifecycle_state != state:
+                    unchanged.discard(instance_id)
+                if instance.lifecycle_state == 'TERMINATED' or \
+                    (instance.lifecycle_state == state and
+                     instance_id not in unchanged):
+                    pending.discard(instance_id)
+            elapsed = time() - start
+            if not pending or elapsed >= timeout:
+                for instance_id in unchanged:
+                    instances[instance_id] = None
+                return instances
+            sleep(min(interval, timeout - elapsed))
+            interval = min(interval * 2, max_interval)
+
+    def create_many(self,
+                    names=None,
+                    image=None,
+                    size=None,
+                    key=None,
+                    secgroup=None,
+                    public=True,
+                    network=None,
+                    parallel=10,
+                    timeout=600,
+                    **kwargs):
+        """
+        creates many nodes that share one vcn, subnet and security group.
+        The instances are launched concurrently and waited on together.
+
+        :param names: the list of names or a pattern such as vm[001-050]
+        :param image: the image used
+        :param size: the size of the image
+        :param key: the public key file
+        :param secgroup: the name of the security group
+        :param public: if True public ips are assigned
+        :param network: the name of the shared network, defaults to the
+                        network in the yaml file
+        :param parallel: the number of concurrent launch calls
+        :param timeout: the number of seconds to wait for all nodes
+        :return: the list of dicts of the nodes
+        """
+        if type(names) == str:
+            names = Parameter.expand(names)
+        if not names:
+            raise ValueError("no names given")
+
+        banner("Create Servers")
+        print("    Names:   ", ", ".join(names))
+        print("    Image:   ", image)
+        print("    Size:    ", size)
+        print("    Public:  ", public)
+        print("    secgroup:", secgroup)
+        print()
+
+        shared = self.network(network)
+
+        nsgs = None
+        if secgroup is not None:
+            nsgs = [self.network_secgroup(secgroup, shared['vcn_id'])]
+
+        image_id = self.image_id(image)
+
+        ids = {}
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = {}
+            for name in names:
+                future = executor.submit(
+                    self.launch,
+                    name=name,
+                    image_id=image_id,
+                    size=size,
+                    key=key,
+                    subnet_id=shared['subnet_id'],
+                    nsgs=nsgs,
+                    public=public,
+                    availability_domain=shared['availability_domain'])
+                futures[future] = name
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    ids[future.result()] = name
+                except Exception as e:
+                    Console.error(f"Problem launching vm {name}: {e}")
+
+        print(f"Launched {len(ids)} of {len(names)} instances")
+        self.networks.attach(shared['name'], list(ids))
+        self.instances.update({name: instance_id
+                               for instance_id, name in ids.items()})
+        instances = self.wait_for_instances(ids, timeout=timeout)
+
+        for instance_id, name in ids.items():
+            instance = instances.get(instance_id)
+            if instance is None or instance.lifecycle_state != 'RUNNING':
+                state = instance.lifecycle_state if instance else 'UNKNOWN'
+                Console.error(f"vm {name} is not running: {state}")
+
+        return self.get_list(instances.values(), kind="vm")
+
     # ok
     def list_public_ips(self,
                         ip=None,
-                        available=False):
+                        available=False,
+                        cached=False):
+
+        if cached:
+            self.refresh("ip")
+            ips = self.inventory.find("ip", name=ip)
+            if available:
+                ips = [entry for entry in ips
+                       if entry["_lifecycle_state"] == 'AVAILABLE']
+            return ips
 
-        ips = self.virtual_network.list_public_ips("REGION",
-                                                   self.compartment_id).data
         if ip is not None:
-            for ip_names in ips:
-                if ip_names.display_name == ip:
-                    ips = [ip_names]
-                    break
+            public = self.public_ips.find(ip)
+            ips = [public] if public is not None else []
+        else:
+            ips = self.public_ips.list()
 
         if available:
-            available_lists = []
-            for ip_names in ips:
-                if ip_names.lifecycle_state == 'AVAILABLE':
-                    available_lists.append(ip_names)
-            ips = available_lists
+            ips = [public for public in ips
+                   if public.lifecycle_state == 'AVAILABLE']
 
-        return self.get_list(ips, kind="ip")
+        # get_list changes the objects, the pool keeps the originals
+        return self.get_list([copy.copy(public) for public in ips],
+                             kind="ip")
 
     # ok
     def delete_public_ip(self, ip=None):
         try:
-            ips = self.list_public_ips(ip)
-
-            for _ip in ips:
-                r = self.virtual_network.delete_public_ip(ip['id'])
+            self.public_ips.delete(ip)
         except:
             pass
 
     # ok
-    def create_public_ip(self):
-        details = oci.core.models.CreatePublicIpDetails(
-            compartment_id=self.compartment_id, display_name="test_ip",
-            lifetime="RESERVED")
-        return self.virtual_network.create_public_ip(details)
+    def create_public_ip(self, name="test_ip"):
+        return self.public_ips.create(name=name)
 
     # ok
     def find_available_public_ip(self):
-        ips = self.virtual_network.list_public_ips("REGION",
-                                                   self.compartment_id).data
-        available = None
-        for ip_names in ips:
-            if ip_names.lifecycle_state == 'AVAILABLE':
-                available = ip_names.ip_address
-                break
+        available = self.public_ips.list("DETACHED")
+        if available:
+            return available[0].ip_address
+        return None
 
-        return available
+    def fill_public_ips(self, count=None):
+        """
+        reserves public ips until count unassigned ones are kept for
+        attach_public_ip
+
+        :param count: the number of unassigned ips, ip_pool of the
+                      defaults in the yaml file if None
+        :return: the list of created oci PublicIps
+        """
+        return self.public_ips.fill(count)
 
     def attach_public_ip(self, name=None, ip=None):
-        server = self.get_instance(name)
-        private = self.get_private_ipobj(server.id)
+        """
+        Assigns a reserved public ip to the vm. An unassigned reserved ip
+        is reused with a single update call, a new one is only created if
+        there is none.
+
+        :param name: the name of the vm
+        :param ip: the name or address of the public ip, any unassigned
+                   ip if None
+        :return: the oci instance object
+        """
+        instance_id = self.get_instance_id(name)
+        private = self.get_private_ipobj(instance_id)
+        public = self.public_ip_of(private)
+        if public is not None and ip is not None and \
+                ip in (public.display_name, public.ip_address, public.id):
+            # the ip is already assigned to the vm
+            return self.find_instance(name)
+
+        # the vm row is read fresh with its new ip
+        self.inventory.delete("vm", [instance_id])
 
         # Delete the already assigned public ip from the instance
-        self.detach_public_ip(name, ip)
+        if public is not None:
+            self.public_ips.release(public)
 
-        # Create new public ip and assign it to the instance
-        details = oci.core.models.CreatePublicIpDetails(
-            compartment_id=self.compartment_id, lifetime="RESERVED",
-            private_ip_id=private.id)
-        self.virtual_network.create_public_ip(details)
+        self.public_ips.assign(private.id, ip=ip)
+
+        return self.find_instance(name)
 
-        return self.get_instance(name)
+    def public_ip_of(self, private):
+        """
+        :param private: the oci PrivateIp or None
+        :return: the oci PublicIp assigned to the private ip or None
+        """
+        if not private:
+            return None
+        details = oci.core.models.GetPublicIpByPrivateIpIdDetails(
+            private_ip_id=private.id)
+        try:
+            return self.virtual_network.get_public_ip_by_private_ip_id(
+                details).data
+        except oci.exceptions.ServiceError as e:
+            if e.status != 404:
+                raise
+            return None
 
     def detach_public_ip(self, name=None, ip=None):
-        server = self.get_instance(name)
-        private = self.get_private_ipobj(server.id)
+        instance_id = self.get_instance_id(name)
+        public = self.public_ip_of(self.get_private_ipobj(instance_id))
+        self.inventory.delete("vm", [instance_id])
 
         # Delete the already assigned public ip from the instance
-        if private:
-            details = oci.core.models.GetPublicIpByPrivateIpIdDetails(
-                private_ip_id=private.id)
-            public = self.virtual_network.get_public_ip_by_private_ip_id(
-                details).data
-            if public:
-                # EPHEMERAL public ips are deleted on detaching from server
-                if public.lifetime == "EPHEMERAL":
-                    self.virtual_network.delete_public_ip(public.id)
-                else:
-                    # RESERVED public ips can be detached and used later
-                    self.virtual_network.update_public_ip(
-                        public.id, oci.core.models.UpdatePublicIpDetails(
-                            private_ip_id=None
-                        ))
+        if public:
+            # EPHEMERAL public ips are deleted on detaching from server,
+            # RESERVED public ips are detached and used later
+            self.public_ips.release(public)
 
     def get_public_ip(self,
                       server=None,
                       name=None):
         ip_public = None
-        private = self.get_private_ip(server, name)
+        if server is None:
+            server = self.get_instance(name)
+        # the public ip is looked up by the OCID of the private ip, not by
+        # its address
+        private = self.get_private_ipobj(server.id)
         if private:
             details = oci.core.models.GetPublicIpByPrivateIpIdDetails(
-                private_ip_id=private)
+                private_ip_id=private.id)
             public = self.virtual_network.get_public_ip_by_private_ip_id(
                 details).data
             if public:
@@ -1206,9 +2061,103 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
         private = None
         if vnic.lifecycle_state != "DETACHED":
             private = self.virtual_network.list_private_ips(
-                subnet_id=vnic.subnet_id).data[0]
+                vnic_id=vnic.vnic_id).data[0]
         return private
 
+    def vm_lookup(self, entries=None):
+        """
+        Fetches the image names and the private and public ips of the given
+        vms. Instead of several calls per vm this makes one listing per
+        resource type in the compartment (one per subnet for the private ips
+        and one per availability domain for the ephemeral public ips) and
+        joins the results by OCID.
+
+        :param entries: the vms as dicts of the oci instance objects, all
+                        vms of the compartment if None
+        :return: a dict with the image names by image OCID ("image"), the
+                 private ip objects by instance OCID ("private") and the
+                 public ip objects by private ip OCID ("public")
+        """
+        lookup = {"image": {}, "private": {}, "public": {}}
+        if entries is not None and not entries:
+            return lookup
+        instance_ids = None
+        if entries is not None:
+            instance_ids = {entry['_id'] for entry in entries}
+
+        # one vnic attachment per instance, as in get_private_ipobj
+        attachments = {}
+        for vnic in oci.pagination.list_call_get_all_results(
+                self.compute.list_vnic_attachments,
+                self.compartment_id).data:
+            if (instance_ids is None or
+                    vnic.instance_id in instance_ids) and \
+                    vnic.lifecycle_state != "DETACHED" and \
+                    vnic.instance_id not in attachments:
+                attachments[vnic.instance_id] = vnic
+
+        private_by_vnic = {}
+        for subnet_id in {vnic.subnet_id for vnic in attachments.values()}:
+            for private in oci.pagination.list_call_get_all_results(
+                    self.virtual_network.list_private_ips,
+                    subnet_id=subnet_id).data:
+                if private.vnic_id not in private_by_vnic or \
+                        private.is_primary:
+                    private_by_vnic[private.vnic_id] = private
+
+        for instance_id, vnic in attachments.items():
+            private = private_by_vnic.get(vnic.vnic_id)
+            if private:
+                lookup["private"][instance_id] = private
+
+        # reserved ips are regional, ephemeral ips are listed per domain
+        public_ips = oci.pagination.list_call_get_all_results(
+            self.virtual_network.list_public_ips,
+            "REGION",
+            self.compartment_id).data
+        if entries is None:
+            domains = {vnic.availability_domain
+                       for vnic in attachments.values()}
+        else:
+            domains = {entry['_availability_domain'] for entry in entries}
+        for domain in domains:
+            public_ips += oci.pagination.list_call_get_all_results(
+                self.virtual_network.list_public_ips,
+                "AVAILABILITY_DOMAIN",
+                self.compartment_id,
+                availability_domain=domain).data
+        for public in public_ips:
+            if public.private_ip_id:
+                lookup["public"][public.private_ip_id] = public
+
+        image_ids = None
+        if entries is not None:
+            image_ids = {entry['_image_id'] for entry in entries}
+        for image in oci.pagination.list_call_get_all_results(
+                self.compute.list_images,
+                self.compartment_id).data:
+            if image_ids is None or image.id in image_ids:
+                lookup["image"][image.id] = image.display_name
+
+        if image_ids is not None:
+            self.lookup_images(lookup, image_ids)
+        return lookup
+
+    def lookup_images(self, lookup, image_ids):
+        """
+        adds the names of the images that are not in the lookup, e.g.
+        deprecated images that are no longer listed
+
+        :param lookup: the result of vm_lookup
+        :param image_ids: the OCIDs of the images
+        """
+        for image_id in set(image_ids) - set(lookup["image"]):
+            try:
+                lookup["image"][image_id] = \
+                    self.compute.get_image(image_id).data.display_name
+            except oci.exceptions.ServiceError:
+                lookup["image"][image_id] = None
+
     def get_private_ip(self,
                        server=None,
                        name=None):
@@ -1243,115 +2192,490 @@ class Provider(ComputeNodeABC, ComputeProviderPlugin):
 
     def rename(self, name=None, destination=None):
         """
-        rename a node. NOT YET IMPLEMENTED.
+        rename a node.
 
         :param destination
         :param name: the current name
         :return: the dict with the new name
         """
         details = oci.core.models.UpdateInstanceDetails()
-        details.display_name = name
-        vm_instance = self.get_instance(name)
-        self.compute.update_instance(vm_instance.id, details)
+        details.display_name = destination
+        instance_id = self.get_instance_id(name)
+        self.compute.update_instance(instance_id, details)
+        self.instances.invalidate(name)
+        # the row keeps the ips and image of the vm under its new name
+        for entry in self.inventory.find("vm", id=instance_id):
+            entry['name'] = entry['cm']['name'] = \
+                entry['_display_name'] = destination
+            self.inventory.upsert("vm", self.inventory_rows([entry]))
+        self.instances.put(destination, instance_id)
+
+    def ssh_session(self, vm=None):
+        """
+        returns the shared ssh session to the vm. The commands of a session
+        reuse one multiplexed connection.
+
+        :param vm: the dict of the vm
+        :return: the Ssh session
+        """
+        from cloudmesh.image.Image import Image
 
-    def ssh(self, vm=None, command=None):
         ip = vm['ip_public']
-        image = vm['_image']
         key = self.key_path.rpartition('.pub')[0]
-        user = Image.guess_username(image)
-
-        if len(ip) == 0:
+        if not ip:
             Console.error("Public IP address not found")
-        if len(key) == 0:
+        if not key:
             Console.error("Key not found")
+        return Ssh.session(ip,
+                           user=Image.guess_username(vm['_image']),
+                           key=key,
+                           persist=int(self.default.get("ssh_persist", 600)))
 
-        if command is None:
-            command = ""
+    def execute(self, vm=None, command=None, timeout=None, stdout=None,
+                stderr=None):
+        """
+        runs a command on the vm over the shared ssh connection
+
+        :param vm: the dict of the vm
+        :param command: the command
+        :param timeout: the seconds after which the command is killed
+        :param stdout: a function called with each line of the output
+        :param stderr: a function called with each line of the errors
+        :return: dict with host, command, exit, stdout, stderr, seconds and
+                 timeout
+        """
+        return self.ssh_session(vm).run(command,
+                                        timeout=timeout,
+                                        stdout=stdout,
+                                        stderr=stderr)
 
-        if user is None:
-            location = ip
-        else:
-            location = user + '@' + ip
-        cmd = "ssh " \
-              "-o StrictHostKeyChecking=no " \
-              "-o UserKnownHostsFile=/dev/null " \
-              f"-i {key} {location} {command}"
-        cmd = cmd.strip()
-        # VERBOSE(cmd)
-        if command == "":
-            if platform.lower() == 'win32':
-                class disable_file_system_redirection:
-                    _disable = ctypes.windll.kernel32.Wow64DisableWow64FsRedirection
-                    _revert = ctypes.windll.kernel32.Wow64RevertWow64FsRedirection
-
-                    def __enter__(self):
-                        self.old_value = ctypes.c_long()
-                        self.success = self._disable(
-                            ctypes.byref(self.old_value))
-
-                    def __exit__(self, type, value, traceback):
-                        if self.success:
-                            self._revert(self.old_value)
-
-                with disable_file_system_redirection():
-                    os.system(cmd)
+    def ssh(self, vm=None, command=None, timeout=None):
+        """
+        opens an interactive shell on the vm or runs a command on it
+
+        :param vm: the dict of the vm
+        :param command: the command, an interactive shell if None
+        :param timeout: the seconds after which the command is killed
+        :return: the output of the command, or None if it failed
+        """
+        session = self.ssh_session(vm)
+        if not command:
+            session.interactive()
+            return None
+        result = session.run(command, timeout=timeout)
+        if result["exit"] != 0:
+            if result["timeout"]:
+                error = f"timeout after {timeout} seconds"
             else:
-                os.system(cmd)
-        else:
-            if platform.lower() == 'win32':
-                class disable_file_system_redirection:
-                    _disable = ctypes.windll.kernel32.Wow64DisableWow64FsRedirection
-                    _revert = ctypes.windll.kernel32.Wow64RevertWow64FsRedirection
-
-                    def __enter__(self):
-                        self.old_value = ctypes.c_long()
-                        self.success = self._disable(
-                            ctypes.byref(self.old_value))
-
-                    def __exit__(self, type, value, traceback):
-                        if self.success:
-                            self._revert(self.old_value)
-
-                with disable_file_system_redirection():
-                    ssh = subprocess.Popen(cmd,
-                                           shell=True,
-                                           stdout=subprocess.PIPE,
-                                           stderr=subprocess.PIPE)
+                error = result["stderr"]
+            print("ERROR: %s" % error)
+            return None
+        return result["stdout"]
+
+    def select_vms(self, names=None, vms=None, cached=False):
+        """
+        selects running vms by name
+
+        :param names: a list of names, a pattern such as vm[001-300] or
+                      shell wildcards such as vm*, all vms if None
+        :param vms: the list of vm dicts to select from, listed if None
+        :param cached: if True the vms are read from the inventory
+        :return: the list of vm dicts
+        """
+        if vms is None:
+            vms = self.list(cached=cached)
+        vms = [vm for vm in vms
+               if vm.get('_lifecycle_state', 'RUNNING') == 'RUNNING']
+        if names is None:
+            return vms
+        if type(names) == str:
+            names = Parameter.expand(names)
+        patterns = [name for name in names if any(c in name for c in "*?")]
+        names = set(names) - set(patterns)
+        return [vm for vm in vms
+                if vm['name'] in names or
+                any(fnmatch(vm['name'], pattern) for pattern in patterns)]
+
+    def run_iter(self, command=None, vms=None, names=None, parallel=50,
+                 timeout=60):
+        """
+        runs a command on many vms concurrently and yields the results as
+        the vms finish
+
+        :param command: the command
+        :param vms: the list of vm dicts
+        :param names: the names or a pattern of the vms if vms is None
+        :param parallel: the number of vms the command runs on at the same
+                         time
+        :param timeout: the seconds after which the command is killed on a
+                        vm
+        :return: generator of dicts with name, host, command, exit, stdout,
+                 stderr, seconds and timeout. The exit is None after a
+                 timeout or if the vm has no public ip.
+        """
+        if vms is None:
+            vms = self.select_vms(names=names)
+
+        def run(vm):
+            if not vm.get('ip_public'):
+                result = self.no_ip_result(command)
             else:
-                ssh = subprocess.Popen(cmd,
-                                       shell=True,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-            result = ssh.stdout.read().decode("utf-8")
-            if not result:
-                error = ssh.stderr.readlines()
-                print("ERROR: %s" % error)
+                result = self.execute(vm=vm, command=command,
+                                      timeout=timeout)
+            result["name"] = vm['name']
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = [executor.submit(run, vm) for vm in vms]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def run_many(self, command=None, vms=None, names=None, parallel=50,
+                 timeout=60, output=None):
+        """
+        runs a command on many vms concurrently. Each result is passed to
+        output as soon as its vm finishes.
+
+        :param command: the command
+        :param vms: the list of vm dicts
+        :param names: the names or a pattern of the vms if vms is None
+        :param parallel: the number of vms the command runs on at the same
+                         time
+        :param timeout: the seconds after which the command is killed on a
+                        vm
+        :param output: a function called with each result, by default the
+                       output is printed with the name of the vm in front
+                       of each line
+        :return: dict with the number of vms, ok, failed, timeout and
+                 unreachable vms, the seconds, the names of the vms that
+                 did not succeed and the list of results
+        """
+        return self.summary(
+            self.run_iter(command=command, vms=vms, names=names,
+                          parallel=parallel, timeout=timeout),
+            output=output)
+
+    def summary(self, results, output=None):
+        """
+        collects the results of run_iter or put_iter
+
+        :param results: iterator of results
+        :param output: a function called with each result, by default the
+                       output is printed with the name of the vm in front
+                       of each line
+        :return: dict with the number of vms, ok, failed, timeout and
+                 unreachable vms, the seconds, the names of the vms that
+                 did not succeed and the list of results
+        """
+        if output is None:
+            output = self.print_result
+        summary = {"vms": 0, "ok": 0, "failed": 0, "timeout": 0,
+                   "unreachable": 0, "seconds": 0.0, "errors": [],
+                   "results": []}
+        start = time()
+        for result in results:
+            summary["vms"] += 1
+            if result["timeout"]:
+                state = "timeout"
+            elif result["exit"] is None or result["exit"] == 255:
+                # ssh itself exits with 255 if it can not connect
+                state = "unreachable"
+            elif result["exit"] == 0:
+                state = "ok"
+            else:
+                state = "failed"
+            summary[state] += 1
+            if state != "ok":
+                summary["errors"].append(result["name"])
+            summary["results"].append(result)
+            output(result)
+        summary["seconds"] = round(time() - start, 3)
+        return summary
+
+    @staticmethod
+    def no_ip_result(command):
+        """
+        :param command: the command
+        :return: the result of a command on a vm without public ip
+        """
+        return {"host": None, "command": command, "exit": None,
+                "stdout": "", "stderr": "no public ip", "seconds": 0.0,
+                "timeout": False}
+
+    def put_iter(self, source=None, destination=None, vms=None, names=None,
+                 parallel=20, timeout=None, delta=True, seeds=0, fanout=4):
+        """
+        copies a file or directory to many vms and yields the results as
+        the vms finish. With seeds the workstation copies to that many vms
+        at a time and every vm that has the files copies them on to
+        fanout further vms over the private network, so the files leave
+        the workstation only a few times. A vm whose relay fails gets the
+        files from the workstation.
+
+        A relay forwards the local ssh agent to the vm that sends the
+        files, so that vm can use the keys of the agent for the time of the
+        copy, and it connects to the other vm with StrictHostKeyChecking=no
+        and without a known hosts file. Use seeds only with vms on a
+        trusted private network.
+
+        :param source: the local file or directory
+        :param destination: the path on the vms, relative to the home
+                            directory
+        :param vms: the list of vm dicts
+        :param names: the names or a pattern of the vms if vms is None
+        :param parallel: the number of copies at the same time
+        :param timeout: the seconds after which a copy is killed
+        :param delta: if True rsync is used if it is installed, it only
+                      sends the changed parts of existing files
+        :param seeds: the number of copies from the workstation at a time,
+                      0 to copy all files from the workstation
+        :param fanout: the number of copies a vm makes at a time
+        :return: generator of dicts like run_iter with the name of the vm
+                 that sent the files as source, None for the workstation
+        """
+        from cloudmesh.image.Image import Image
+
+        if vms is None:
+            vms = self.select_vms(names=names)
+        directory = os.path.isdir(source)
+        parallel = max(1, parallel)
+
+        def copy(holder, vm):
+            if holder is None:
+                if not vm.get('ip_public'):
+                    result = self.no_ip_result(destination)
+                else:
+                    result = self.ssh_session(vm).copy(source, destination,
+                                                       delta=delta,
+                                                       timeout=timeout)
+            else:
+                result = self.ssh_session(holders[holder]).relay(
+                    destination,
+                    vm['ip_private'],
+                    user=Image.guess_username(vm['_image']),
+                    directory=directory,
+                    delta=delta,
+                    timeout=timeout)
+            result["name"] = vm['name']
+            result["source"] = holder
+            return result
+
+        pending = deque(vms)
+        direct = deque()
+        holders = {}
+        slots = {None: seeds or parallel}
+        running = {}
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            while pending or direct or running:
+                for holder in list(slots):
+                    while slots[holder] > 0 and len(running) < parallel:
+                        if holder is None and direct:
+                            vm = direct.popleft()
+                        elif pending and (holder is None or
+                                          pending[0].get('ip_private')):
+                            vm = pending.popleft()
+                        else:
+                            break
+                        slots[holder] -= 1
+                        running[executor.submit(copy, holder, vm)] = \
+                            (holder, vm)
+                done, _ = wait_futures(running,
+                                       return_when=FIRST_COMPLETED)
+                for future in done:
+                    holder, vm = running.pop(future)
+                    slots[holder] += 1
+                    result = future.result()
+                    if result["exit"] == 0:
+                        if seeds and vm.get('ip_public'):
+                            holders[vm['name']] = vm
+                            slots[vm['name']] = fanout
+                    elif holder is not None:
+                        direct.append(vm)
+                        continue
+                    yield result
+
+    def put(self, source=None, destination=None, vms=None, names=None,
+            parallel=20, timeout=None, delta=True, seeds=0, fanout=4,
+            output=None):
+        """
+        copies a file or directory to many vms, see put_iter. With seeds
+        the vms copy the files on to each other with the forwarded ssh
+        agent and without checking the host keys of the other vms.
+
+        :param source: the local file or directory
+        :param destination: the path on the vms
+        :param vms: the list of vm dicts
+        :param names: the names or a pattern of the vms if vms is None
+        :param parallel: the number of copies at the same time
+        :param timeout: the seconds after which a copy is killed
+        :param delta: if True only the changes of existing files are sent
+        :param seeds: the number of copies from the workstation at a time,
+                      0 to copy all files from the workstation
+        :param fanout: the number of copies a vm makes at a time
+        :param output: a function called with each result
+        :return: the summary like run_many
+        """
+        return self.summary(
+            self.put_iter(source=source, destination=destination, vms=vms,
+                          names=names, parallel=parallel, timeout=timeout,
+                          delta=delta, seeds=seeds, fanout=fanout),
+            output=output)
+
+    def get(self, source=None, destination=None, vms=None, names=None,
+            parallel=20, timeout=None, delta=True, output=None):
+        """
+        copies a file or directory from many vms concurrently into
+        destination/<name of the vm>, or from a single vm dict into
+        destination
+
+        :param source: the path on the vms
+        :param destination: the local directory
+        :param vms: a vm dict or a list of vm dicts
+        :param names: the names or a pattern of the vms if vms is None
+        :param parallel: the number of copies at the same time
+        :param timeout: the seconds after which a copy is killed
+        :param delta: if True only the changes of existing files are sent
+        :param output: a function called with each result
+        :return: the summary like run_many
+        """
+        single = type(vms) == dict
+        if single:
+            vms = [vms]
+        elif vms is None:
+            vms = self.select_vms(names=names)
+        destination = path_expand(destination)
+
+        def copy(vm):
+            local = destination if single else os.path.join(destination,
+                                                            vm['name'])
+            os.makedirs(local, exist_ok=True)
+            if not vm.get('ip_public'):
+                result = self.no_ip_result(source)
             else:
-                return result
+                result = self.ssh_session(vm).copy(source, local, get=True,
+                                                   delta=delta,
+                                                   timeout=timeout)
+            result["name"] = vm['name']
+            return result
+
+        def results():
+            with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+                futures = [executor.submit(copy, vm) for vm in vms]
+                for future in as_completed(futures):
+                    yield future.result()
+
+        return self.summary(results(), output=output)
+
+    @staticmethod
+    def print_result(result):
+        """
+        prints the output of a command on a vm with the name of the vm in
+        front of each line
+
+        :param result: a result of run_iter
+        """
+        name = result["name"]
+        for line in result["stdout"].splitlines():
+            print(f"{name}: {line}")
+        for line in result["stderr"].splitlines():
+            print(f"{name}: ERROR: {line}")
+        if result["timeout"]:
+            print(f"{name}: ERROR: timeout after {result['seconds']} seconds")
+        elif result["exit"]:
+            print(f"{name}: exit {result['exit']}")
+
+    @staticmethod
+    def port_open(ip, port=22, timeout=3):
+        """
+        Checks if a tcp connection to the port can be opened
+
+        :param ip: the ip address
+        :param port: the port
+        :param timeout: the connect timeout in seconds
+        :return: True if the port accepts connections
+        """
+        try:
+            with socket.create_connection((ip, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
 
     def wait(self,
              vm=None,
              interval=None,
-             timeout=None):
+             timeout=None,
+             max_interval=30):
+        """
+        Waits until the vm is reachable with ssh. Only the state of this vm
+        is polled until it runs, then port 22 is probed and ssh is only
+        started once the port accepts connections. The polling interval
+        grows exponentially with jitter up to max_interval.
+
+        :param vm: the dict of the vm
+        :param interval: the first polling interval in seconds
+        :param timeout: the maximum number of seconds to wait
+        :param max_interval: the maximum polling interval in seconds
+        :return: True if the vm is reachable
+        """
         name = vm['name']
         if interval is None:
-            # if interval is too low, OS will block your ip (I think)
-            interval = 120
+            interval = 2
         if timeout is None:
             timeout = 360
         Console.info(
             f"waiting for instance {name} to be reachable: Interval: "
-            "{interval}, Timeout: {timeout}")
-        timer = 0
-        while timer < timeout:
-            sleep(interval)
-            timer += interval
+            f"{interval}, Timeout: {timeout}")
+        instance_id = vm.get('oracle_id') or self.get_instance_id(name)
+        start = time()
+        running = False
+        while True:
             try:
-                r = self.list()
-                r = self.ssh(vm=vm, command='echo IAmReady').strip()
-                if 'IAmReady' in r:
-                    return True
-            except:
+                if not running:
+                    instance = self.compute.get_instance(instance_id).data
+                    if instance.lifecycle_state == 'TERMINATED':
+                        return False
+                    running = instance.lifecycle_state == 'RUNNING'
+                    if running and not vm.get('ip_public'):
+                        vm['ip_public'] = self.get_public_ip(server=instance)
+                if running and vm.get('ip_public') and \
+                        self.port_open(vm['ip_public']):
+                    r = self.ssh(vm=vm, command='echo IAmReady')
+                    if r and 'IAmReady' in r:
+                        return True
+            except (oci.exceptions.ServiceError, OSError):
+                # the vnic or the public ip is not there yet or the
+                # connection failed, other errors are not retried
                 pass
 
-        return False
+            remaining = timeout - (time() - start)
+            if remaining <= 0:
+                return False
+            sleep(min(random.uniform(interval / 2, interval), remaining))
+            interval = min(interval * 2, max_interval)
+
+    def wait_many(self,
+                  vms=None,
+                  interval=None,
+                  timeout=None,
+                  parallel=50):
+        """
+        Waits concurrently until the vms are reachable with ssh
+
+        :param vms: the list of vm dicts
+        :param interval: the first polling interval in seconds
+        :param timeout: the maximum number of seconds to wait
+        :param parallel: the number of vms waited on at the same time
+        :return: dict with True or False for each vm name
+        """
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = {
+                executor.submit(self.wait, vm=vm, interval=interval,
+                                timeout=timeout): vm['name']
+                for vm in vms
+            }
+            return {futures[future]: future.result()
+                    for future in as_completed(futures)}
@@ -0,0 +1,342 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from cloudmesh.oracle.LazyImport import lazy_import
+
+oci = lazy_import("oci")
+
+
+class PublicIpPool(object):
+    """
+    Keeps the regional public ips of the compartment indexed by id, name,
+    address and state, so looking up, assigning and releasing an ip does
+    not list all ips again. The index is loaded with one listing and then
+    kept up to date with the results of the calls made through the pool;
+    it is reloaded when it is older than ttl seconds.
+
+    Detached RESERVED ips are reused before new ones are created. A released
+    ip that is still UNASSIGNING is counted as available and fetched again
+    when the pool runs empty. With warm the pool keeps that many unassigned
+    RESERVED ips so an ip can be given to a vm with a single update call;
+    it is topped up in the background after each assign.
+
+    Example::
+
+        pool = PublicIpPool(provider, warm=10)
+        pool.fill()
+        public = pool.assign(private_ip_id)
+        pool.release(public.ip_address)
+    """
+
+    # the prefix of the names of the ips created by the pool
+    prefix = "cloudmesh-pool"
+
+    def __init__(self, provider, warm=0, ttl=60):
+        """
+        :param provider: the oracle compute provider
+        :param warm: the number of unassigned reserved ips that are kept
+        :param ttl: the seconds after which the index is reloaded
+        """
+        self.provider = provider
+        self.warm = int(warm)
+        self.ttl = ttl
+        self.lock = threading.RLock()
+        self.loaded = None
+        self.by_id = {}
+        self.by_name = {}
+        self.by_address = {}
+        self.by_state = {}
+        self.creating = 0
+        self.refilling = None
+        self.error = None
+
+    @property
+    def virtual_network(self):
+        return self.provider.virtual_network
+
+    def load(self, force=False):
+        """
+        lists the regional public ips and indexes them, unless the index is
+        younger than ttl seconds. The ips that are being assigned stay
+        reserved for their assign.
+
+        :param force: if True the ips are listed in any case
+        """
+        with self.lock:
+            if not force and self.loaded is not None and \
+                    time() - self.loaded < self.ttl:
+                return
+            ips = []
+            for page in self.provider.pages(
+                    self.virtual_network.list_public_ips,
+                    "REGION",
+                    self.provider.compartment_id):
+                ips += page
+            assigning = list(self.by_state.get("ASSIGNING", {}))
+            self.by_id = {}
+            self.by_name = {}
+            self.by_address = {}
+            self.by_state = {}
+            for public in ips:
+                self._add(public)
+            for public_id in assigning:
+                public = self.by_id.get(public_id)
+                if public is not None:
+                    for entries in self.by_state.values():
+                        entries.pop(public_id, None)
+                    self.by_state.setdefault("ASSIGNING",
+                                             {})[public_id] = public
+            self.loaded = time()
+
+    def _add(self, public):
+        self._remove(public.id)
+        self.by_id[public.id] = public
+        if public.display_name:
+            self.by_name[public.display_name] = public
+        if public.ip_address:
+            self.by_address[public.ip_address] = public
+        self.by_state.setdefault(self.state(public), {})[public.id] = public
+
+    def _remove(self, public_id):
+        public = self.by_id.pop(public_id, None)
+        if public is None:
+            return
+        if self.by_name.get(public.display_name) is public:
+            del self.by_name[public.display_name]
+        if self.by_address.get(public.ip_address) is public:
+            del self.by_address[public.ip_address]
+        for entries in self.by_state.values():
+            entries.pop(public_id, None)
+
+    @staticmethod
+    def state(public):
+        """
+        :param public: an oci PublicIp
+        :return: ASSIGNED if the ip is given to a private ip, DETACHED for
+                 an unassigned reserved ip, otherwise the lifecycle state
+        """
+        if public.private_ip_id:
+            return "ASSIGNED"
+        if public.lifetime == "RESERVED" and \
+                public.lifecycle_state == "AVAILABLE":
+            return "DETACHED"
+        return public.lifecycle_state
+
+    def list(self, state=None):
+        """
+        :param state: ASSIGNED, DETACHED or a lifecycle state, all ips if
+                      None
+        :return: the list of oci PublicIps
+        """
+        self.load()
+        with self.lock:
+            if state is None:
+                return list(self.by_id.values())
+            return list(self.by_state.get(state, {}).values())
+
+    def find(self, ip):
+        """
+        :param ip: the name, the address or the OCID of the ip
+        :return: the oci PublicIp or None
+        """
+        self.load()
+        with self.lock:
+            return self.by_name.get(ip) or self.by_address.get(ip) or \
+                self.by_id.get(ip)
+
+    def create(self, name=None, private_ip_id=None):
+        """
+        creates a reserved ip
+
+        :param name: the name of the ip
+        :param private_ip_id: the OCID of the private ip it is assigned to
+        :return: the oci PublicIp
+        """
+        details = oci.core.models.CreatePublicIpDetails(
+            compartment_id=self.provider.compartment_id,
+            display_name=name,
+            lifetime="RESERVED",
+            private_ip_id=private_ip_id)
+        public = self.virtual_network.create_public_ip(details).data
+        with self.lock:
+            self._add(public)
+        return public
+
+    def unassigning(self):
+        """
+        :return: the list of reserved ips that are being unassigned
+        """
+        with self.lock:
+            return [public for public in
+                    self.by_state.get("UNASSIGNING", {}).values()
+                    if public.lifetime == "RESERVED"]
+
+    def fill(self, count=None, parallel=10):
+        """
+        creates reserved ips until the pool has count unassigned ones. The
+        ips that are being unassigned or created by another fill count as
+        unassigned.
+
+        :param count: the number of unassigned ips, warm if None
+        :param parallel: the number of ips created at the same time
+        :return: the list of created oci PublicIps
+        """
+        if count is None:
+            count = self.warm
+        self.load()
+        with self.lock:
+            missing = count - len(self.by_state.get("DETACHED", {})) - \
+                len(self.unassigning()) - self.creating
+            if missing <= 0:
+                return []
+            self.creating += missing
+        try:
+            stamp = int(time())
+            names = [f"{self.prefix}-{stamp}-{n}" for n in range(missing)]
+            with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+                return list(executor.map(self.create, names))
+        finally:
+            with self.lock:
+                self.creating -= missing
+
+    def refill(self):
+        """
+        tops the pool up to warm unassigned ips in a background thread. An
+        error of the refill is kept in error.
+
+        :return: the thread, or None if no refill is needed or one is
+                 running
+        """
+        if self.warm <= 0:
+            return None
+        with self.lock:
+            if self.refilling is not None and self.refilling.is_alive():
+                return None
+            self.refilling = threading.Thread(target=self._refill,
+                                              daemon=True)
+            self.refilling.start()
+            return self.refilling
+
+    def _refill(self):
+        try:
+            self.fill()
+            self.error = None
+        except Exception as e:
+            self.error = e
+
+    def settle(self):
+        """
+        gets the reserved ips that are being unassigned again, so they can
+        be reused once they are available
+
+        :return: True if an ip became available
+        """
+        available = False
+        for public in self.unassigning():
+            try:
+                public = self.virtual_network.get_public_ip(public.id).data
+            except oci.exceptions.ServiceError as e:
+                if e.status != 404:
+                    raise
+                with self.lock:
+                    self._remove(public.id)
+                continue
+            with self.lock:
+                self._add(public)
+            available = available or self.state(public) == "DETACHED"
+        return available
+
+    def _take(self, ip=None):
+        # removes an unassigned ip from the pool so concurrent assigns do
+        # not pick the same one
+        with self.lock:
+            if ip is not None:
+                public = self.find(ip)
+                if public is None:
+                    raise ValueError(f"public ip {ip} not found")
+                if public.id not in self.by_state.get("DETACHED", {}):
+                    raise ValueError(f"public ip {ip} is not available")
+            else:
+                detached = self.list("DETACHED")
+                if not detached:
+                    return None
+                public = detached[0]
+            self.by_state["DETACHED"].pop(public.id, None)
+            self.by_state.setdefault("ASSIGNING", {})[public.id] = public
+            return public
+
+    def assign(self, private_ip_id, ip=None):
+        """
+        assigns an unassigned reserved ip to a private ip with one update
+        call, or creates a new one if the pool is empty
+
+        :param private_ip_id: the OCID of the private ip
+        :param ip: the name or address of the ip, any unassigned ip if None
+        :return: the oci PublicIp
+        """
+        try:
+            public = self._take(ip)
+        except ValueError:
+            # the ip may have been released in the meantime
+            if not self.settle():
+                raise
+            public = self._take(ip)
+        if public is None and self.settle():
+            public = self._take(ip)
+        if public is None:
+            public = self.create(private_ip_id=private_ip_id)
+        else:
+            try:
+                public = self.virtual_network.update_public_ip(
+                    public.id,
+                    oci.core.models.UpdatePublicIpDetails(
+                        private_ip_id=private_ip_id)).data
+            except Exception:
+                with self.lock:
+                    self._add(public)
+                raise
+            with self.lock:
+                self._add(public)
+        self.refill()
+        return public
+
+    def release(self, ip):
+        """
+        detaches a reserved ip so it can be reused, an ephemeral ip is
+        deleted
+
+        :param ip: the name, address or OCID of the ip, or the oci PublicIp
+        :return: the oci PublicIp or None
+        """
+        public = ip if hasattr(ip, "id") else self.find(ip)
+        if public is None:
+            return None
+        if public.lifetime == "EPHEMERAL":
+            self.virtual_network.delete_public_ip(public.id)
+            with self.lock:
+                self._remove(public.id)
+            return None
+        # an empty private ip unassigns the ip, None would be left out of
+        # the request
+        public = self.virtual_network.update_public_ip(
+            public.id,
+            oci.core.models.UpdatePublicIpDetails(private_ip_id="")).data
+        with self.lock:
+            self._add(public)
+        return public
+
+    def delete(self, ip):
+        """
+        deletes an ip
+
+        :param ip: the name, address or OCID of the ip
+        :return: True if the ip was found
+        """
+        public = self.find(ip)
+        if public is None:
+            return False
+        self.virtual_network.delete_public_ip(public.id)
+        with self.lock:
+            self._remove(public.id)
+        return True
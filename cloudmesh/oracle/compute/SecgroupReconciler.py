@@ -0,0 +1,291 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cloudmesh.oracle.LazyImport import lazy_import
+
+oci = lazy_import("oci")
+
+
+class SecgroupReconciler(object):
+    """
+    Brings the rules of the network security groups in the cloud in line
+    with the local Secgroup and SecgroupRule definitions. The local
+    definitions are loaded once, the rules of each group are listed once
+    and the differences are applied with as few add and remove calls as
+    the api allows. Many groups are reconciled concurrently.
+
+    Only ingress rules are compared, egress rules of the groups are left
+    alone.
+
+    Example::
+
+        reconciler = SecgroupReconciler(provider)
+        for change in reconciler.reconcile(names=["default", "flask"]):
+            print(change["name"], change["added"], change["removed"])
+    """
+
+    # the number of rules the api accepts in one add or remove call
+    batch = 25
+
+    protocols = {
+        "tcp": "6",
+        "udp": "17",
+        "icmp": "1",
+        "all": "all",
+    }
+
+    def __init__(self, provider, groups=None, rules=None):
+        """
+        :param provider: the oracle compute provider
+        :param groups: the list of Secgroup dicts, loaded from the local
+                       database if None
+        :param rules: the list of SecgroupRule dicts, loaded from the local
+                      database if None
+        """
+        self.provider = provider
+        self.virtual_network = provider.virtual_network
+        self._groups = groups
+        self._rules = rules
+
+    def _load(self):
+        if self._groups is None or self._rules is None:
+            from cloudmesh.secgroup.Secgroup import Secgroup, SecgroupRule
+
+            if self._groups is None:
+                self._groups = Secgroup().list()
+            if self._rules is None:
+                self._rules = SecgroupRule().list()
+
+    @property
+    def groups(self):
+        """
+        :return: dict of the local groups by name
+        """
+        self._load()
+        return {group['name']: group for group in self._groups}
+
+    @property
+    def rules(self):
+        """
+        :return: dict of the local rules by name
+        """
+        self._load()
+        return {rule['name']: rule for rule in self._rules}
+
+    @staticmethod
+    def ports(ports):
+        """
+        :param ports: a port range such as 22:22, 8000 or an empty string
+        :return: the minimum and maximum port, None for all ports
+        """
+        if not ports:
+            return None, None
+        low, _, high = str(ports).partition(":")
+        return int(low), int(high or low)
+
+    @classmethod
+    def key(cls, protocol, source, low=None, high=None):
+        """
+        :return: the key that identifies equal rules
+        """
+        protocol = str(protocol).lower()
+        return ("INGRESS",
+                cls.protocols.get(protocol, protocol),
+                source or "0.0.0.0/0",
+                low,
+                high)
+
+    @classmethod
+    def rule_key(cls, rule):
+        """
+        :param rule: a SecgroupRule dict
+        :return: the key of the rule
+        """
+        low, high = cls.ports(rule.get('ports'))
+        if str(rule['protocol']).lower() in ("icmp", "1", "all"):
+            low = high = None
+        return cls.key(rule['protocol'], rule.get('ip_range'), low, high)
+
+    @classmethod
+    def security_rule_key(cls, rule):
+        """
+        :param rule: an oci SecurityRule
+        :return: the key of the rule
+        """
+        options = rule.tcp_options or rule.udp_options
+        port_range = options.destination_port_range if options else None
+        if port_range is None:
+            return cls.key(rule.protocol, rule.source)
+        return cls.key(rule.protocol, rule.source,
+                       port_range.min, port_range.max)
+
+    @staticmethod
+    def details(key, description=None):
+        """
+        :param key: the key of a rule
+        :param description: the description of the rule
+        :return: the AddSecurityRuleDetails of the rule
+        """
+        direction, protocol, source, low, high = key
+        details = oci.core.models.AddSecurityRuleDetails(
+            description=description,
+            direction=direction,
+            protocol=protocol,
+            source=source,
+            source_type='CIDR_BLOCK')
+        if low is not None:
+            port_range = oci.core.models.PortRange(min=low, max=high)
+            if protocol == "6":
+                details.tcp_options = oci.core.models.TcpOptions(
+                    destination_port_range=port_range)
+            elif protocol == "17":
+                details.udp_options = oci.core.models.UdpOptions(
+                    destination_port_range=port_range)
+        return details
+
+    def desired(self, name, rules=None):
+        """
+        :param name: the name of the local group
+        :param rules: the names of the rules, all rules of the group if None
+        :return: dict of the keys of the rules and their names
+        """
+        if rules is None:
+            group = self.groups.get(name)
+            if group is None:
+                raise ValueError(f"group {name} does not exist")
+            rules = group['rules']
+        local = self.rules
+        desired = {}
+        for rule in rules:
+            if rule == 'nothing':
+                continue
+            if rule not in local:
+                raise ValueError(f"rule {rule} can not be found")
+            desired.setdefault(self.rule_key(local[rule]), rule)
+        return desired
+
+    def actual(self, nsg_id):
+        """
+        :param nsg_id: the OCID of the network security group
+        :return: dict of the keys of the ingress rules and their ids
+        """
+        actual = {}
+        network = self.virtual_network
+        for page in self.provider.pages(
+                network.list_network_security_group_security_rules,
+                nsg_id,
+                direction='INGRESS'):
+            for rule in page:
+                actual.setdefault(self.security_rule_key(rule),
+                                  []).append(rule.id)
+        return actual
+
+    def plan(self, desired, actual, remove=True):
+        """
+        :param desired: the keys and names of the local rules
+        :param actual: the keys and ids of the rules in the cloud
+        :param remove: if False rules are only added
+        :return: the list of AddSecurityRuleDetails and the list of rule ids
+                 to remove
+        """
+        add = [self.details(key, description=name)
+               for key, name in desired.items() if key not in actual]
+        ids = []
+        for key, rule_ids in actual.items():
+            if key in desired:
+                # duplicates of a rule are removed
+                ids += rule_ids[1:]
+            elif remove:
+                ids += rule_ids
+        return add, ids
+
+    def apply(self, nsg_id, add, remove):
+        """
+        removes and adds the rules in batches. The rules are removed first
+        so the group does not exceed its rule limit.
+
+        :param nsg_id: the OCID of the network security group
+        :param add: the list of AddSecurityRuleDetails
+        :param remove: the list of rule ids
+        :return: the number of api calls
+        """
+        calls = 0
+        for start in range(0, len(remove), self.batch):
+            self.virtual_network.remove_network_security_group_security_rules(
+                nsg_id,
+                oci.core.models.RemoveNetworkSecurityGroupSecurityRulesDetails(
+                    security_rule_ids=remove[start:start + self.batch]))
+            calls += 1
+        for start in range(0, len(add), self.batch):
+            self.virtual_network.add_network_security_group_security_rules(
+                nsg_id,
+                oci.core.models.AddNetworkSecurityGroupSecurityRulesDetails(
+                    security_rules=add[start:start + self.batch]))
+            calls += 1
+        return calls
+
+    def sync(self, name, nsg_id, rules=None, remove=True):
+        """
+        reconciles one network security group
+
+        :param name: the name of the local group
+        :param nsg_id: the OCID of the network security group
+        :param rules: the names of the rules, all rules of the group if None
+        :param remove: if False rules are only added
+        :return: dict with name, id, added, removed and calls
+        """
+        add, ids = self.plan(self.desired(name, rules=rules),
+                             self.actual(nsg_id),
+                             remove=remove)
+        return {"name": name,
+                "id": nsg_id,
+                "added": len(add),
+                "removed": len(ids),
+                "calls": 1 + self.apply(nsg_id, add, ids)}
+
+    def remove(self, name, nsg_id, rules=None):
+        """
+        removes the rules from one network security group
+
+        :param name: the name of the local group
+        :param nsg_id: the OCID of the network security group
+        :param rules: the names of the rules, all rules of the group if None
+        :return: dict with name, id, added, removed and calls
+        """
+        unwanted = self.desired(name, rules=rules)
+        actual = self.actual(nsg_id)
+        keep = {key: None for key in actual if key not in unwanted}
+        add, ids = self.plan(keep, actual)
+        return {"name": name,
+                "id": nsg_id,
+                "added": len(add),
+                "removed": len(ids),
+                "calls": 1 + self.apply(nsg_id, add, ids)}
+
+    def reconcile(self, names=None, vcn_id=None, remove=True, parallel=10):
+        """
+        reconciles the network security groups that have the name of a
+        local group, in all vcns or in the given vcn
+
+        :param names: the names of the local groups, all groups if None
+        :param vcn_id: the OCID of the vcn
+        :param remove: if False rules are only added
+        :param parallel: the number of groups reconciled at the same time
+        :return: generator of the results of sync as the groups finish
+        """
+        if names is None:
+            names = list(self.groups)
+        names = set(names)
+        nsgs = []
+        for page in self.provider.pages(
+                self.virtual_network.list_network_security_groups,
+                self.provider.compartment_id,
+                vcn_id=vcn_id,
+                lifecycle_state='AVAILABLE'):
+            nsgs += [nsg for nsg in page if nsg.display_name in names]
+
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as executor:
+            futures = [executor.submit(self.sync, nsg.display_name, nsg.id,
+                                       remove=remove)
+                       for nsg in nsgs]
+            for future in as_completed(futures):
+                yield future.result()
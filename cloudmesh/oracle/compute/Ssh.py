@@ -0,0 +1,403 @@
+import ctypes
+import hashlib
+import os
+import posixpath
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+from sys import platform
+from time import time
+
+from cloudmesh.common.util import path_expand
+
+
+class disable_file_system_redirection(object):
+    """
+    lets a 32 bit python on 64 bit windows find the ssh of the system
+    """
+
+    def __enter__(self):
+        self.success = False
+        if platform.lower() == 'win32':
+            kernel32 = ctypes.windll.kernel32
+            self._revert = kernel32.Wow64RevertWow64FsRedirection
+            self.old_value = ctypes.c_long()
+            self.success = kernel32.Wow64DisableWow64FsRedirection(
+                ctypes.byref(self.old_value))
+
+    def __exit__(self, type, value, traceback):
+        if self.success:
+            self._revert(self.old_value)
+
+
+class Ssh(object):
+    """
+    An ssh session to a vm that runs all commands over one multiplexed
+    connection. The first command starts a background master connection
+    (ControlMaster) that stays open for persist seconds after the last
+    command, so further commands, also from other processes, do not make
+    a new tcp connection and key exchange. If the master can not be
+    started the commands connect directly. Windows does not support
+    multiplexing, there each command connects directly.
+
+    Without an ssh agent ssh may ask for the passphrase of the key on the
+    terminal when it connects, with a master connection this happens once.
+    The commands are started without a shell. Their output is read while
+    they run and can be passed line by line to callbacks, stdout, stderr
+    and the exit code are returned separately.
+
+    Example::
+
+        session = Ssh.session("129.0.0.1", user="ubuntu", key="~/.ssh/id_rsa")
+        result = session.run("uptime", stdout=print)
+        print(result["exit"], result["stderr"])
+    """
+
+    options = ["-o", "StrictHostKeyChecking=no",
+               "-o", "UserKnownHostsFile=/dev/null",
+               "-o", "LogLevel=ERROR"]
+
+    control_dir = "~/.cloudmesh/oracle/ssh"
+
+    _lock = threading.Lock()
+    _sessions = {}
+
+    def __init__(self, host, user=None, key=None, port=22, persist=600,
+                 connect_timeout=30):
+        """
+        :param host: the ip address or name of the vm
+        :param user: the user name on the vm
+        :param key: the private key file
+        :param port: the ssh port
+        :param persist: the seconds the master connection stays open after
+                        the last command
+        :param connect_timeout: the seconds to wait for a connection
+        """
+        self.host = host
+        self.user = user
+        self.key = path_expand(key) if key else None
+        self.port = port
+        self.persist = persist
+        self.connect_timeout = connect_timeout
+        self.location = host if user is None else f"{user}@{host}"
+        self.multiplex = platform.lower() != 'win32'
+        digest = hashlib.sha1(
+            f"{self.location}:{port}:{self.key}".encode("utf-8")).hexdigest()
+        self.control_path = os.path.join(path_expand(self.control_dir),
+                                         digest[:20])
+        self.lock = threading.Lock()
+        self.opened = False
+        self.error = None
+
+    @classmethod
+    def session(cls, host, user=None, key=None, port=22, **kwargs):
+        """
+        returns the shared session to a vm and creates it on first use
+
+        :param host: the ip address or name of the vm
+        :param user: the user name on the vm
+        :param key: the private key file
+        :param port: the ssh port
+        :return: the session
+        """
+        key_id = (host, user, key, port)
+        with cls._lock:
+            if key_id not in cls._sessions:
+                cls._sessions[key_id] = cls(host, user=user, key=key,
+                                            port=port, **kwargs)
+            return cls._sessions[key_id]
+
+    def batch(self):
+        """
+        :return: True if ssh can authenticate without asking for a
+                 passphrase, i.e. the master connection is running or an
+                 ssh agent is available
+        """
+        return self.opened or bool(os.environ.get("SSH_AUTH_SOCK"))
+
+    def options_list(self, batch=None):
+        """
+        :param batch: if True ssh fails instead of asking for a password or
+                      passphrase, if None only if batch() is True, so a
+                      key with a passphrase and no agent is asked for once
+                      when the master connection starts
+        :return: the options of ssh and scp for the vm without the port
+        """
+        if batch is None:
+            batch = self.batch()
+        # ssh uses the first value of an option, so BatchMode is only
+        # given here
+        options = self.options + [
+            "-o", f"BatchMode={'yes' if batch else 'no'}",
+            "-o", f"ConnectTimeout={self.connect_timeout}"]
+        if self.key:
+            options += ["-i", self.key]
+        if self.multiplex:
+            options += ["-o", f"ControlPath={self.control_path}"]
+        return options
+
+    def args(self, *options, batch=None):
+        """
+        :param options: additional options of ssh
+        :param batch: if True ssh fails instead of asking for a password or
+                      passphrase, if None only if batch() is True
+        :return: the arguments of an ssh call to the vm without the command
+        """
+        return ["ssh"] + self.options_list(batch=batch) + \
+            ["-p", str(self.port)] + list(options)
+
+    def is_open(self):
+        """
+        :return: True if the master connection is running
+        """
+        if not self.multiplex or not os.path.exists(self.control_path):
+            return False
+        try:
+            result = subprocess.run(
+                self.args("-O", "check", self.location),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=10)
+        except subprocess.TimeoutExpired:
+            return False
+        return result.returncode == 0
+
+    def open(self):
+        """
+        starts the master connection in the background if it is not
+        running
+
+        :return: True if the master connection is running
+        """
+        if not self.multiplex:
+            return False
+        with self.lock:
+            if self.opened and os.path.exists(self.control_path):
+                return True
+            if self.is_open():
+                self.opened = True
+                return True
+            os.makedirs(os.path.dirname(self.control_path), mode=0o700,
+                        exist_ok=True)
+            if os.path.exists(self.control_path):
+                # the socket of a master that is gone
+                os.remove(self.control_path)
+            with tempfile.TemporaryFile() as errors:
+                try:
+                    # -f returns once the connection is authenticated
+                    result = subprocess.run(
+                        self.args("-o", "ControlMaster=yes",
+                                  "-o", f"ControlPersist={self.persist}",
+                                  "-N", "-f", self.location),
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=errors,
+                        timeout=self.connect_timeout + 10)
+                except subprocess.TimeoutExpired:
+                    self.error = "timeout"
+                    return False
+                if result.returncode != 0:
+                    errors.seek(0)
+                    self.error = errors.read().decode("utf-8",
+                                                      errors="replace")
+                    return False
+            self.opened = True
+            self.error = None
+            return True
+
+    def close(self):
+        """
+        stops the master connection
+        """
+        with self.lock:
+            self.opened = False
+            if self.multiplex and os.path.exists(self.control_path):
+                subprocess.run(self.args("-O", "exit", self.location),
+                               stdin=subprocess.DEVNULL,
+                               stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+
+    @classmethod
+    def close_all(cls):
+        """
+        stops the master connections of all sessions
+        """
+        with cls._lock:
+            sessions = list(cls._sessions.values())
+            cls._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    @staticmethod
+    def _read(stream, lines, callback):
+        for raw in iter(stream.readline, b''):
+            line = raw.decode("utf-8", errors="replace")
+            lines.append(line)
+            if callback is not None:
+                callback(line)
+        stream.close()
+
+    def run(self, command, timeout=None, stdout=None, stderr=None,
+            agent=False):
+        """
+        runs a command on the vm
+
+        :param command: the command, a string that is run by the shell of
+                        the vm
+        :param timeout: the seconds after which the command is killed
+        :param stdout: a function that is called with each line of the
+                       output as it arrives
+        :param stderr: a function that is called with each line of the
+                       error output as it arrives
+        :param agent: if True the ssh agent is forwarded to the vm
+        :return: dict with host, command, exit (None after a timeout),
+                 stdout, stderr, seconds and timeout
+        """
+        options = ["-o", "ForwardAgent=yes"] if agent else []
+        return self.call(self.args(*options, self.location, command),
+                         command,
+                         timeout=timeout,
+                         stdout=stdout,
+                         stderr=stderr)
+
+    def remote(self, path):
+        """
+        :param path: a path on the vm
+        :return: the path as argument of scp and rsync
+        """
+        return f"{self.location}:{path}"
+
+    def copy(self, source, destination, get=False, delta=True,
+             timeout=None):
+        """
+        copies a file or directory to or from the vm over the shared
+        connection. With delta rsync is used if it is installed, it only
+        sends the changed parts of files that exist already. Otherwise
+        scp is used, it copies a directory into destination if
+        destination is an existing directory.
+
+        :param source: the local path, or the path on the vm if get is True
+        :param destination: the path on the vm, or the local path if get
+                            is True
+        :param get: if True the file is copied from the vm
+        :param delta: if True rsync is used if it is installed
+        :param timeout: the seconds after which the copy is killed
+        :return: dict like run with the copy as command
+        """
+        if get:
+            source = self.remote(source)
+        else:
+            if os.path.isdir(source):
+                source = os.path.join(source, "")
+            destination = self.remote(destination)
+        if delta and shutil.which("rsync"):
+            shell = " ".join(shlex.quote(arg) for arg in
+                             ["ssh"] + self.options_list() +
+                             ["-p", str(self.port)])
+            args = ["rsync", "-az", "--partial", "-e", shell,
+                    source, destination]
+        else:
+            args = ["scp", "-r", "-q", "-P", str(self.port)] + \
+                self.options_list() + [source, destination]
+        return self.call(args,
+                         f"{args[0]} {source} {destination}",
+                         timeout=timeout)
+
+    def relay(self, path, host, user=None, directory=False, delta=True,
+              timeout=None):
+        """
+        copies a file or directory from this vm to another vm, e.g. over
+        the private network. The ssh agent is forwarded, so the key of the
+        other vm has to be loaded in the local ssh agent, and this vm can
+        use the agent while the copy runs. The host key of the other vm is
+        not checked. rsync is used if it is installed on both vms and delta
+        is True, otherwise scp.
+
+        :param path: the path on both vms
+        :param host: the address of the other vm as seen from this vm
+        :param user: the user name on the other vm
+        :param directory: True if path is a directory
+        :param delta: if True rsync is used if it is installed
+        :param timeout: the seconds after which the copy is killed
+        :return: dict like run
+        """
+        location = host if user is None else f"{user}@{host}"
+        options = " ".join(self.options + ["-o", "BatchMode=yes"])
+        target = shlex.quote(f"{location}:{path}")
+        command = f"scp -r -q {options} {shlex.quote(path)} {target}"
+        if delta:
+            source = posixpath.join(path, "") if directory else path
+            shell = shlex.quote(f"ssh {options}")
+            command = f"(command -v rsync >/dev/null && " \
+                      f"rsync -az --partial -e {shell} " \
+                      f"{shlex.quote(source)} {target}) || {command}"
+        return self.run(command, timeout=timeout, agent=True)
+
+    def call(self, args, command, timeout=None, stdout=None, stderr=None):
+        """
+        runs ssh, scp or rsync with the shared connection
+
+        :param args: the arguments of the program
+        :param command: the command that is returned in the result
+        :param timeout: the seconds after which the program is killed
+        :param stdout: a function called with each line of the output
+        :param stderr: a function called with each line of the errors
+        :return: dict with host, command, exit (None after a timeout),
+                 stdout, stderr, seconds and timeout
+        """
+        if self.multiplex:
+            self.open()
+        start = time()
+        with disable_file_system_redirection():
+            process = subprocess.Popen(
+                args,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE)
+        out = []
+        err = []
+        readers = [
+            threading.Thread(target=self._read,
+                             args=(process.stdout, out, stdout),
+                             daemon=True),
+            threading.Thread(target=self._read,
+                             args=(process.stderr, err, stderr),
+                             daemon=True)
+        ]
+        for reader in readers:
+            reader.start()
+        timed_out = False
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            timed_out = True
+        for reader in readers:
+            # after a kill the master can still hold the pipes of the
+            # command, the readers are not waited for then
+            reader.join(timeout=1 if timed_out else None)
+        return {
+            "host": self.host,
+            "command": command,
+            "exit": None if timed_out else process.returncode,
+            "stdout": "".join(out),
+            "stderr": "".join(err),
+            "seconds": round(time() - start, 3),
+            "timeout": timed_out
+        }
+
+    def interactive(self):
+        """
+        opens an interactive shell on the vm. ssh may ask for the
+        passphrase of the key if no master connection is running.
+
+        :return: the exit code of ssh
+        """
+        if self.multiplex:
+            self.open()
+        with disable_file_system_redirection():
+            return subprocess.call(self.args(self.location, batch=False))
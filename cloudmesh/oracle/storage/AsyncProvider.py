@@ -0,0 +1,515 @@
+import asyncio
+import copy
+import functools
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudmesh.oracle.LazyImport import lazy_import
+from cloudmesh.oracle.storage.Provider import Provider
+
+oci = lazy_import("oci")
+
+
+class AsyncProvider(object):
+    """
+    An asyncio interface to the oracle storage provider. The blocking sdk
+    calls run on a managed thread pool and a semaphore limits the objects
+    in flight, so hundreds of objects can be moved at the same time from one
+    event loop.
+
+    The files are read and written in chunks of chunk_size bytes, each
+    chunk is one call on the thread pool, so a transfer only holds a thread
+    while a chunk or a request is in progress. Large files are uploaded in
+    parts with the manifest of the storage Provider, so an interrupted
+    upload can be resumed by either provider, and large objects are
+    downloaded as byte ranges. The oci sdk has no asyncio transport, so
+    each request still blocks a thread while it runs.
+
+    Example::
+
+        async with AsyncProvider(service="oracle") as storage:
+            async for obj in storage.list_objects(prefix="data/"):
+                print(obj.name)
+            await storage.put(source="~/data", destination="data",
+                              recursive=True)
+    """
+
+    # the number of bytes read from or written to a file at a time
+    chunk_size = 1024 * 1024
+
+    def __init__(self,
+                 service=None,
+                 config="~/.cloudmesh/cloudmesh.yaml",
+                 provider=None,
+                 workers=64,
+                 limit=None):
+        """
+        :param service: the name of the storage service in the yaml file
+        :param config: the location of the yaml file
+        :param provider: an existing storage Provider to use
+        :param workers: the number of threads running transfers
+        :param limit: the maximum number of transfers in flight, defaults to
+                      workers
+        """
+        self.provider = provider or Provider(service=service, config=config)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.limit = limit or workers
+        self._semaphore = None
+        self._transfers = None
+        self._parts = None
+        self._temps = itertools.count()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    @property
+    def semaphore(self):
+        # created on first use so that it belongs to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    @property
+    def transfers(self):
+        # the objects in flight, so only limit files are open at a time
+        if self._transfers is None:
+            self._transfers = asyncio.Semaphore(self.limit)
+        return self._transfers
+
+    @property
+    def parts(self):
+        # at most workers parts of all uploads are held in memory
+        if self._parts is None:
+            self._parts = asyncio.Semaphore(max(1, self.provider.workers))
+        return self._parts
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking call on the executor
+
+        :param func: the function
+        :return: the result of the function
+        """
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs))
+
+    async def read(self, path, offset=0, size=None):
+        """
+        reads a part of a file chunk by chunk
+
+        :param path: the local file
+        :param offset: the position of the first byte
+        :param size: the number of bytes, the rest of the file if None
+        :return: the bytes
+        """
+        if size is None:
+            size = await self.run(os.path.getsize, path) - offset
+        data = bytearray()
+        f = await self.run(open, path, 'rb')
+        try:
+            await self.run(f.seek, offset)
+            while len(data) < size:
+                chunk = await self.run(
+                    f.read, min(self.chunk_size, size - len(data)))
+                if not chunk:
+                    break
+                data += chunk
+        finally:
+            await self.run(f.close)
+        return bytes(data)
+
+    async def write(self, response, fd, offset=0, lock=None):
+        """
+        writes the data of a get_object response chunk by chunk at the
+        given position of an open file
+
+        :param response: the get_object response
+        :param fd: the file descriptor
+        :param offset: the position of the first byte
+        :param lock: the lock used when os.pwrite is not available
+        :return: the number of bytes written
+        """
+        stream = response.data.raw.stream(self.chunk_size,
+                                          decode_content=False)
+        written = 0
+        while True:
+            chunk = await self.run(next, stream, None)
+            if chunk is None:
+                return written
+            await self.run(self.provider.write_at, fd, chunk,
+                           offset + written, lock)
+            written += len(chunk)
+
+    async def upload_file(self, source, destination):
+        """
+        uploads a single file like the upload_file of the storage Provider
+
+        :param source: the local file
+        :param destination: the object name
+        :return: dict
+        """
+        provider = self.provider
+        async with self.transfers:
+            size = await self.run(os.path.getsize, source)
+            if size >= provider.multipart_threshold:
+                return await self.upload_multipart(source, destination)
+            data = await self.read(source, size=size)
+            response = await self.run(provider.object_storage.put_object,
+                                      provider.namespace,
+                                      provider.bucket_name,
+                                      destination,
+                                      data)
+        return {
+            "fileName": destination,
+            "lastModificationDate": response.headers.get('last-modified'),
+            "contentLength": str(size),
+            "md5": response.headers.get('opc-content-md5')
+        }
+
+    async def upload_multipart(self, source, destination):
+        """
+        uploads a large file in parts like the upload_multipart of the
+        storage Provider, the parts are read and uploaded concurrently
+
+        :param source: the local file
+        :param destination: the object name
+        :return: dict
+        """
+        provider = self.provider
+        size = await self.run(os.path.getsize, source)
+        path = provider.manifest_path(destination)
+
+        for attempt in range(provider.restarts + 1):
+            manifest = await self.run(provider.start_multipart, source,
+                                      destination)
+            count, errors, expired = await self.upload_parts(
+                source, destination, size, manifest, path)
+            if not expired:
+                break
+            # the upload expired or was aborted, start over
+            await self.run(os.remove, path)
+        else:
+            raise RuntimeError(
+                f"the upload of {destination} expired "
+                f"{provider.restarts + 1} times: {errors[0]}")
+
+        if errors:
+            raise RuntimeError(
+                f"{len(errors)} of {count} parts of {destination} failed, "
+                f"call put again to resume the upload: {errors[0]}")
+
+        return await self.run(provider.commit_multipart, destination,
+                              manifest)
+
+    async def upload_parts(self, source, destination, size, manifest,
+                           path):
+        """
+        uploads the parts of a multipart upload that are not in the
+        manifest
+
+        :param source: the local file
+        :param destination: the object name
+        :param size: the size of the file
+        :param manifest: the manifest of the upload
+        :param path: the location of the manifest
+        :return: the number of parts, the list of errors and True if the
+                 upload does not exist anymore
+        """
+        provider = self.provider
+        part_size = manifest['part_size']
+        count = max(1, -(-size // part_size))
+        missing = [n for n in range(1, count + 1)
+                   if str(n) not in manifest['parts']]
+        lock = asyncio.Lock()
+
+        async def upload_part(n):
+            offset = (n - 1) * part_size
+            async with self.parts:
+                data = await self.read(source, offset,
+                                       min(part_size, size - offset))
+                response = await self.run(
+                    provider.object_storage.upload_part,
+                    provider.namespace, provider.bucket_name, destination,
+                    manifest['upload_id'], n, data)
+            async with lock:
+                manifest['parts'][str(n)] = response.headers['etag']
+                await self.run(provider.write_manifest, path,
+                               copy.deepcopy(manifest))
+
+        results = await asyncio.gather(*[upload_part(n) for n in missing],
+                                       return_exceptions=True)
+        errors = [result for result in results
+                  if isinstance(result, Exception)]
+        expired = any(isinstance(error, oci.exceptions.ServiceError) and
+                      error.status == 404 for error in errors)
+        return count, errors, expired
+
+    async def download_file(self, source, destination, size=None):
+        """
+        downloads a single object like the download_file of the storage
+        Provider. The data is written to a temporary file that replaces
+        destination once the download is complete. Objects of at least
+        multipart_threshold bytes are fetched as byte ranges of part_size
+        concurrently, the ranges after the first with the etag of the first.
+
+        :param source: the object name
+        :param destination: the local file
+        :param size: the object size, if known from the listing
+        :return: dict
+        """
+        provider = self.provider
+        temp = f"{destination}.{os.getpid()}-{next(self._temps)}.part"
+        async with self.transfers:
+            f = await self.run(open, temp, 'wb')
+            try:
+                try:
+                    if size is None or size < provider.multipart_threshold:
+                        response = await self.run(
+                            provider.object_storage.get_object,
+                            provider.namespace, provider.bucket_name,
+                            source)
+                        await self.write(response, f.fileno())
+                        headers = response.headers
+                    else:
+                        await self.run(f.truncate, size)
+                        headers = await self.download_ranges(
+                            source, f.fileno(), size)
+                finally:
+                    await self.run(f.close)
+                await self.run(os.replace, temp, destination)
+            except BaseException:
+                if await self.run(os.path.exists, temp):
+                    await self.run(os.remove, temp)
+                raise
+
+        if size is None or size < provider.multipart_threshold:
+            return provider.extract_file_dict(source, headers)
+        return {
+            "fileName": source,
+            "lastModificationDate": headers.get('last-modified'),
+            "contentLength": str(size)
+        }
+
+    async def download_ranges(self, source, fd, size):
+        """
+        downloads an object as byte ranges of part_size concurrently into
+        a preallocated file
+
+        :param source: the object name
+        :param fd: the file descriptor of the preallocated file
+        :param size: the object size
+        :return: the headers of the first response
+        """
+        provider = self.provider
+        part_size = provider.part_size
+        ranges = [(start, min(start + part_size, size) - 1)
+                  for start in range(0, size, part_size)]
+        lock = threading.Lock()
+
+        async def download_range(start, end, etag=None):
+            response = await self.run(provider.object_storage.get_object,
+                                      provider.namespace,
+                                      provider.bucket_name,
+                                      source,
+                                      range=f"bytes={start}-{end}",
+                                      if_match=etag)
+            written = await self.write(response, fd, start, lock)
+            if written != end - start + 1:
+                raise IOError(f"incomplete range {start}-{end} of "
+                              f"{source}: {written} bytes")
+            return response.headers
+
+        headers = await download_range(*ranges[0])
+        etag = headers.get('etag')
+        await asyncio.gather(*[download_range(start, end, etag)
+                               for start, end in ranges[1:]])
+        return headers
+
+    async def list_objects(self, prefix=None,
+                           fields="name,size,timeCreated,md5"):
+        """
+        lists all objects with the given prefix page by page
+
+        :param prefix: the prefix of the object names
+        :param fields: the fields returned for each object
+        :return: async generator of object summaries
+        """
+        provider = self.provider
+        kwargs = {"fields": fields}
+        if prefix:
+            kwargs["prefix"] = prefix
+        start = None
+        while True:
+            if start is not None:
+                kwargs["start"] = start
+            response = await self.run(provider.object_storage.list_objects,
+                                      provider.namespace,
+                                      provider.bucket_name,
+                                      **kwargs)
+            for obj in response.data.objects:
+                yield obj
+            start = response.data.next_start_with
+            if not start:
+                break
+
+    async def _gather(self, calls):
+        """
+        runs the calls concurrently and separates results from failures
+
+        :param calls: list of (key, coroutine) tuples
+        :return: the list of results and the list of failed (key, error)
+                 tuples
+        """
+        results = await asyncio.gather(*[call for key, call in calls],
+                                       return_exceptions=True)
+        done = []
+        failed = []
+        for (key, call), result in zip(calls, results):
+            if isinstance(result, Exception):
+                failed.append((key, str(result)))
+            else:
+                done.append(result)
+        return done, failed
+
+    async def list(self, source=None, recursive=True):
+        """
+        lists the objects with the prefix source
+
+        :param source: the prefix
+        :param recursive: unused, all objects with the prefix are listed
+        :return: dict
+        """
+        provider = self.provider
+        prefix = provider.get_filename(str(provider.get_os_path(source)))
+        objlist = [provider.extract_object_dict(obj)
+                   async for obj in self.list_objects(prefix=prefix)]
+        return provider.update_dict(objlist)
+
+    async def put(self, source=None, destination=None, recursive=False):
+        """
+        uploads a file or all files of a directory concurrently
+
+        :param source: the local file or directory
+        :param destination: the object name or directory
+        :param recursive: include the subdirectories of a directory
+        :return: dict
+        """
+        provider = self.provider
+        source = provider.get_os_path(source)
+        destination = provider.get_os_path(destination)
+
+        if not await self.run(provider.bucket_exists, provider.bucket_name):
+            await self.run(provider.bucket_create, provider.bucket_name)
+
+        if os.path.isfile(source):
+            files = [(source, str(destination))]
+        elif os.path.isdir(source):
+            files = [
+                (f, str(destination / os.path.relpath(f, source)))
+                for f in await self.run(provider.ls_files, source, recursive)
+            ]
+        else:
+            print("Source not found")
+            return []
+
+        uploaded, failed = await self._gather(
+            [(name, self.upload_file(f, name)) for f, name in files])
+        for name, error in failed:
+            print(f"failed {name}: {error}")
+        return provider.update_dict(uploaded)
+
+    async def get(self, source=None, destination=None, recursive=True):
+        """
+        downloads the objects with the prefix source concurrently
+
+        :param source: the prefix
+        :param destination: the local file or directory
+        :param recursive: unused, all objects with the prefix are downloaded
+        :return: dict
+        """
+        provider = self.provider
+        prefix = str(provider.get_os_path(source))
+        destination = provider.get_os_path(destination)
+        objs = [obj async for obj in self.list_objects(
+            prefix=prefix, fields="name,size")]
+
+        is_target_dir = os.path.isdir(destination)
+        if len(objs) > 1 and not is_target_dir:
+            print("Please provide a directory to copy multiple files.")
+            return []
+
+        calls = []
+        targets = {}
+        collisions = []
+        for obj in objs:
+            target = destination / os.path.basename(obj.name) \
+                if is_target_dir else destination
+            if target in targets:
+                # objects with the same base name are not written at once
+                collisions.append(
+                    (obj.name, f"{target} is also the destination of "
+                               f"{targets[target]}"))
+                continue
+            targets[target] = obj.name
+            calls.append((obj.name, self.download_file(obj.name, target,
+                                                       obj.size)))
+        downloaded, failed = await self._gather(calls)
+        failed = collisions + failed
+        for name, error in failed:
+            print(f"failed {name}: {error}")
+        return provider.update_dict(downloaded)
+
+    async def delete(self, source=None, recursive=True):
+        """
+        deletes the objects with the prefix source concurrently
+
+        :param source: the prefix
+        :param recursive: unused, all objects with the prefix are deleted
+        :return: dict
+        """
+        provider = self.provider
+        prefix = str(provider.get_os_path(source))
+
+        async def delete_object(obj):
+            await self.run(provider.object_storage.delete_object,
+                           provider.namespace,
+                           provider.bucket_name,
+                           obj.name)
+            return provider.extract_object_dict(obj)
+
+        deleted, failed = await self._gather(
+            [(obj.name, delete_object(obj))
+             async for obj in self.list_objects(prefix=prefix)])
+        for name, error in failed:
+            print(f"failed {name}: {error}")
+        return provider.update_dict(deleted)
+
+    async def search(self, directory=None, filename=None, recursive=False):
+        """
+        searches for objects with the file name
+
+        :param directory: the directory to search in
+        :param filename: the file name
+        :param recursive: include the subdirectories of the directory
+        :return: dict
+        """
+        provider = self.provider
+        if recursive is False:
+            prefix = str(provider.get_os_path(directory) / filename) \
+                if directory else filename
+        else:
+            prefix = str(directory) if directory else None
+        found = [provider.extract_object_dict(obj)
+                 async for obj in self.list_objects(prefix=prefix)
+                 if os.path.basename(obj.name) == filename]
+        return provider.update_dict(found)
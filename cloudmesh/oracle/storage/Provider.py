@@ -1,14 +1,27 @@
-import oci
 from pprint import pprint
+import base64
+import hashlib
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import textwrap
 
 from cloudmesh.storage.StorageABC import StorageABC
 from cloudmesh.configuration.Config import Config
+from cloudmesh.common.util import path_expand
+from cloudmesh.oracle.Clients import Clients
+from cloudmesh.oracle.LazyImport import lazy_import
+
+oci = lazy_import("oci")
 
 
 class Provider(StorageABC):
+    # the number of times a multipart upload is started over after it
+    # expired or was aborted on the server
+    restarts = 2
+
     sample = textwrap.dedent("""
     cloudmesh:
       storage:
@@ -24,6 +37,12 @@ class Provider(StorageABC):
           default:
             directory: .
             bucket: home
+            workers: 16
+            multipart_threshold: 134217728
+            part_size: 67108864
+            pool_size: 50
+            keep_alive: true
+            metrics: true
           credentials:
             user: {user}
             fingerprint: {fingerprint}
@@ -76,18 +95,35 @@ class Provider(StorageABC):
         super().__init__(service=service, config=config)
 
         # Get credentials
-        configure = Config(config)["cloudmesh"]["storage"]["oracle"][
-            "credentials"]
-        credential = self._get_credentials(configure)
-        self.object_storage = oci.object_storage.ObjectStorageClient(credential)
-        self.compartment_id = credential["compartment_id"]
-        self.namespace = self.object_storage.get_namespace().data
+        spec = Config(config)["cloudmesh"]["storage"]["oracle"]
+        configure = spec["credentials"]
+        self.credential = self._get_credentials(configure)
+        self.compartment_id = self.credential["compartment_id"]
 
         # Get defaults
-        self.bucket_name = Config(config)["cloudmesh"]["storage"]["oracle"][
-            "default"]["bucket"]
+        default = spec["default"]
+        Clients.configure(pool_size=default.get("pool_size"),
+                          keep_alive=default.get("keep_alive"),
+                          metrics=default.get("metrics"))
+        self.bucket_name = default["bucket"]
+        self.workers = int(default.get("workers", 16))
+        self.multipart_threshold = int(
+            default.get("multipart_threshold", 128 * 1024 * 1024))
+        self.part_size = int(default.get("part_size", 64 * 1024 * 1024))
+        # at most workers parts of all uploads are held in memory
+        self.part_slots = threading.BoundedSemaphore(max(1, self.workers))
+        self.manifest_dir = path_expand("~/.cloudmesh/oracle/uploads")
+        self.checksum_cache = path_expand("~/.cloudmesh/oracle/md5.json")
         self.storage_dict = {}
 
+    @property
+    def object_storage(self):
+        return Clients.get("object_storage", self.credential)
+
+    @property
+    def namespace(self):
+        return Clients.namespace(self.credential)
+
     def update_dict(self, elements, kind=None):
         # this is an internal function for building dict object
         d = []
@@ -134,6 +170,49 @@ class Provider(StorageABC):
         }
         return info
 
+    @staticmethod
+    def extract_object_dict(obj):
+        """
+        builds the file dict from an object summary of list_objects
+
+        :param obj: the object summary listed with the fields of
+                    list_objects_iter
+        :return: dict
+        """
+        return {
+            "fileName": obj.name,
+            "lastModificationDate": str(obj.time_created),
+            "contentLength": str(obj.size),
+            "md5": obj.md5
+        }
+
+    def list_objects_iter(self, prefix=None,
+                          fields="name,size,timeCreated,md5"):
+        """
+        lists all objects with the given prefix following the pagination of
+        list_objects
+
+        :param prefix: the prefix of the object names
+        :param fields: the fields returned for each object
+        :return: generator of object summaries
+        """
+        kwargs = {"fields": fields}
+        if prefix:
+            kwargs["prefix"] = prefix
+        start = None
+        while True:
+            if start is None:
+                response = self.object_storage.list_objects(
+                    self.namespace, self.bucket_name, **kwargs)
+            else:
+                response = self.object_storage.list_objects(
+                    self.namespace, self.bucket_name, start=start, **kwargs)
+            for obj in response.data.objects:
+                yield obj
+            start = response.data.next_start_with
+            if not start:
+                break
+
     # Function to extract obj dict from metadata
     def get_and_extract_file_dict(self, filename):
 
@@ -143,6 +222,440 @@ class Provider(StorageABC):
 
         return self.extract_file_dict(filename, metadata.headers)
 
+    def upload_file(self, source, destination):
+        """
+        uploads a single file and builds its dict from the response headers
+        of put_object, so no head_object call is needed. Files larger than
+        multipart_threshold are uploaded with upload_multipart.
+
+        :param source: the local file
+        :param destination: the object name
+        :return: dict
+        """
+        if os.path.getsize(source) >= self.multipart_threshold:
+            return self.upload_multipart(source, destination)
+
+        with open(source, 'rb') as f:
+            response = self.object_storage.put_object(self.namespace,
+                                                      self.bucket_name,
+                                                      destination,
+                                                      f)
+        return {
+            "fileName": destination,
+            "lastModificationDate": response.headers.get('last-modified'),
+            "contentLength": str(os.path.getsize(source)),
+            "md5": response.headers.get('opc-content-md5')
+        }
+
+    def manifest_path(self, destination):
+        """
+        the location of the local manifest of a multipart upload
+
+        :param destination: the object name
+        :return: the path of the manifest
+        """
+        key = f"{self.namespace}/{self.bucket_name}/{destination}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.manifest_dir, f"{digest}.json")
+
+    @staticmethod
+    def read_manifest(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def write_manifest(path, manifest):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+
+    def abort_upload(self, destination):
+        """
+        aborts an interrupted multipart upload and removes its manifest
+
+        :param destination: the object name
+        :return: True if an upload was aborted
+        """
+        path = self.manifest_path(destination)
+        manifest = self.read_manifest(path)
+        if manifest is None:
+            return False
+        try:
+            self.object_storage.abort_multipart_upload(
+                self.namespace, self.bucket_name, destination,
+                manifest['upload_id'])
+        except oci.exceptions.ServiceError as e:
+            # the upload is already gone
+            if e.status != 404:
+                raise
+        os.remove(path)
+        return True
+
+    def upload_multipart(self, source, destination, workers=None):
+        """
+        uploads a large file in parts of part_size bytes with a pool of
+        workers. The committed parts are recorded in a local manifest, so
+        calling it again after an interruption only uploads the missing
+        parts. The manifest is removed after the upload is committed. An
+        upload that expired on the server is started over at most restarts
+        times. The parts of all uploads of the provider share workers
+        slots, so at most workers parts are held in memory at a time.
+
+        :param source: the local file
+        :param destination: the object name
+        :param workers: the number of concurrent part uploads
+        :return: dict
+        """
+        workers = workers or self.workers
+        size = os.path.getsize(source)
+        path = self.manifest_path(destination)
+
+        for attempt in range(self.restarts + 1):
+            manifest = self.start_multipart(source, destination)
+            count, errors, expired = self.upload_parts(
+                source, destination, size, manifest, path, workers)
+            if not expired:
+                break
+            # the upload expired or was aborted, start over
+            os.remove(path)
+        else:
+            raise RuntimeError(
+                f"the upload of {destination} expired "
+                f"{self.restarts + 1} times: {errors[0]}")
+
+        if errors:
+            raise RuntimeError(
+                f"{len(errors)} of {count} parts of {destination} failed, "
+                f"call put again to resume the upload: {errors[0]}")
+
+        return self.commit_multipart(destination, manifest)
+
+    def start_multipart(self, source, destination):
+        """
+        returns the manifest of the interrupted multipart upload of the
+        file or creates a new upload. An upload of a file that changed since
+        the interruption is aborted.
+
+        :param source: the local file
+        :param destination: the object name
+        :return: the manifest
+        """
+        size = os.path.getsize(source)
+        mtime = os.path.getmtime(source)
+        path = self.manifest_path(destination)
+        manifest = self.read_manifest(path)
+        if manifest is not None and \
+                (manifest['source'] != os.path.abspath(source) or
+                 manifest['size'] != size or
+                 manifest['mtime'] != mtime):
+            # the file changed since the interrupted upload
+            self.abort_upload(destination)
+            manifest = None
+
+        if manifest is None:
+            details = oci.object_storage.models.CreateMultipartUploadDetails(
+                object=destination)
+            upload = self.object_storage.create_multipart_upload(
+                self.namespace, self.bucket_name, details).data
+            manifest = {
+                "source": os.path.abspath(source),
+                "size": size,
+                "mtime": mtime,
+                "upload_id": upload.upload_id,
+                "part_size": self.part_size,
+                "parts": {}
+            }
+            self.write_manifest(path, manifest)
+        else:
+            print(f"resuming upload of {destination}: "
+                  f"{len(manifest['parts'])} parts already committed")
+        return manifest
+
+    def commit_multipart(self, destination, manifest):
+        """
+        commits the uploaded parts and removes the manifest. If the parts
+        can not be committed the upload is aborted.
+
+        :param destination: the object name
+        :param manifest: the manifest with the etags of all parts
+        :return: dict
+        """
+        path = self.manifest_path(destination)
+        parts = [
+            oci.object_storage.models.CommitMultipartUploadPartDetails(
+                part_num=int(n), etag=etag)
+            for n, etag in sorted(manifest['parts'].items(),
+                                  key=lambda part: int(part[0]))
+        ]
+        try:
+            response = self.object_storage.commit_multipart_upload(
+                self.namespace, self.bucket_name, destination,
+                manifest['upload_id'],
+                oci.object_storage.models.CommitMultipartUploadDetails(
+                    parts_to_commit=parts))
+        except oci.exceptions.ServiceError as e:
+            if 400 <= e.status < 500:
+                # the parts can not be committed, do not resume them
+                self.abort_upload(destination)
+            raise
+        os.remove(path)
+
+        return {
+            "fileName": destination,
+            "lastModificationDate": response.headers.get('last-modified'),
+            "contentLength": str(manifest['size']),
+            "md5": response.headers.get('opc-multipart-md5')
+        }
+
+    def upload_parts(self, source, destination, size, manifest, path,
+                     workers):
+        """
+        uploads the parts of a multipart upload that are not in the
+        manifest
+
+        :param source: the local file
+        :param destination: the object name
+        :param size: the size of the file
+        :param manifest: the manifest of the upload
+        :param path: the location of the manifest
+        :param workers: the number of concurrent part uploads
+        :return: the number of parts, the list of errors and True if the
+                 upload does not exist anymore
+        """
+        part_size = manifest['part_size']
+        count = max(1, -(-size // part_size))
+        missing = [n for n in range(1, count + 1)
+                   if str(n) not in manifest['parts']]
+        lock = threading.Lock()
+
+        def upload_part(n):
+            offset = (n - 1) * part_size
+            with self.part_slots:
+                with open(source, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read(min(part_size, size - offset))
+                response = self.object_storage.upload_part(
+                    self.namespace, self.bucket_name, destination,
+                    manifest['upload_id'], n, data)
+            with lock:
+                manifest['parts'][str(n)] = response.headers['etag']
+                self.write_manifest(path, manifest)
+
+        errors = []
+        expired = False
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(upload_part, n) for n in missing]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except oci.exceptions.ServiceError as e:
+                    if e.status == 404:
+                        expired = True
+                        for pending in futures:
+                            pending.cancel()
+                    errors.append(e)
+                except Exception as e:
+                    errors.append(e)
+        return count, errors, expired
+
+    def upload_files(self, files, workers=None):
+        """
+        uploads the files with a pool of workers and prints the progress
+        after each finished file
+
+        :param files: list of (source, destination) tuples
+        :param workers: the number of concurrent uploads, defaults to the
+                        workers value in the yaml file
+        :return: the list of uploaded dicts and the list of failed
+                 (destination, error) tuples
+        """
+        workers = workers or self.workers
+        uploaded = []
+        failed = []
+        total = len(files)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self.upload_file, source, destination):
+                    destination
+                for source, destination in files
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                destination = futures[future]
+                try:
+                    uploaded.append(future.result())
+                    print(f"[{done}/{total}] uploaded {destination}")
+                except Exception as e:
+                    failed.append((destination, str(e)))
+                    print(f"[{done}/{total}] failed {destination}: {e}")
+        return uploaded, failed
+
+    @staticmethod
+    def write_stream(stream, fd, offset, lock=None):
+        """
+        writes a response stream at the given position of an open file
+
+        :param stream: the data of a get_object response
+        :param fd: the file descriptor
+        :param offset: the position of the first byte
+        :param lock: the lock used when os.pwrite is not available
+        :return: the number of bytes written
+        """
+        written = 0
+        for chunk in stream.raw.stream(1024 * 1024, decode_content=False):
+            Provider.write_at(fd, chunk, offset + written, lock)
+            written += len(chunk)
+        return written
+
+    @staticmethod
+    def write_at(fd, data, offset, lock=None):
+        """
+        writes data at the given position of an open file
+
+        :param fd: the file descriptor
+        :param data: the bytes
+        :param offset: the position of the first byte
+        :param lock: the lock used when os.pwrite is not available
+        """
+        if hasattr(os, "pwrite"):
+            os.pwrite(fd, data, offset)
+        else:
+            with lock:
+                os.lseek(fd, offset, os.SEEK_SET)
+                os.write(fd, data)
+
+    def download_file(self, source, destination, size=None, workers=None):
+        """
+        downloads a single object. The data is written to a temporary file
+        next to destination that replaces destination once the download is
+        complete, so a failed download leaves no partial file. Objects of at
+        least multipart_threshold bytes are fetched as byte ranges of
+        part_size in parallel and written into a preallocated file. The
+        ranges after the first are requested with the etag of the first, so
+        an object that is overwritten during the download fails instead of
+        mixing two versions.
+
+        :param source: the object name
+        :param destination: the local file
+        :param size: the object size, if known from the listing
+        :param workers: the number of concurrent range requests
+        :return: dict
+        """
+        temp = f"{destination}.{os.getpid()}-{threading.get_ident()}.part"
+        try:
+            if size is None or size < self.multipart_threshold:
+                response = self.object_storage.get_object(self.namespace,
+                                                          self.bucket_name,
+                                                          source)
+                with open(temp, 'wb') as f:
+                    for chunk in response.data.raw.stream(
+                            1024 * 1024, decode_content=False):
+                        f.write(chunk)
+                os.replace(temp, destination)
+                return self.extract_file_dict(source, response.headers)
+
+            headers = self.download_ranges(source, temp, size, workers)
+            os.replace(temp, destination)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+        return {
+            "fileName": source,
+            "lastModificationDate": headers.get('last-modified'),
+            "contentLength": str(size)
+        }
+
+    def download_ranges(self, source, destination, size, workers=None):
+        """
+        downloads an object as byte ranges of part_size in parallel into a
+        preallocated file
+
+        :param source: the object name
+        :param destination: the local file
+        :param size: the object size
+        :param workers: the number of concurrent range requests
+        :return: the headers of the first response
+        """
+        workers = workers or self.workers
+        ranges = [(start, min(start + self.part_size, size) - 1)
+                  for start in range(0, size, self.part_size)]
+        lock = threading.Lock()
+
+        with open(destination, 'wb') as f:
+            f.truncate(size)
+            fd = f.fileno()
+
+            def download_range(start, end, etag=None):
+                response = self.object_storage.get_object(
+                    self.namespace, self.bucket_name, source,
+                    range=f"bytes={start}-{end}",
+                    if_match=etag)
+                written = self.write_stream(response.data, fd, start, lock)
+                if written != end - start + 1:
+                    raise IOError(f"incomplete range {start}-{end} of "
+                                  f"{source}: {written} bytes")
+                return response.headers
+
+            headers = download_range(*ranges[0])
+            etag = headers.get('etag')
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+                futures = [executor.submit(download_range, start, end, etag)
+                           for start, end in ranges[1:]]
+                for future in as_completed(futures):
+                    future.result()
+        return headers
+
+    def download_files(self, files, workers=None):
+        """
+        downloads the objects with a pool of workers and prints the progress
+        after each finished object. An object whose destination is also the
+        destination of an earlier object is not downloaded and reported as
+        failed.
+
+        :param files: list of (source, destination, size) tuples
+        :param workers: the number of concurrent downloads
+        :return: the list of downloaded dicts and the list of failed
+                 (source, error) tuples
+        """
+        workers = workers or self.workers
+        downloaded = []
+        failed = []
+        total = len(files)
+        targets = {}
+        unique = []
+        for source, destination, size in files:
+            target = os.path.abspath(destination)
+            if target in targets:
+                error = f"{destination} is also the destination of " \
+                        f"{targets[target]}"
+                failed.append((source, error))
+                print(f"[{len(failed)}/{total}] failed {source}: {error}")
+            else:
+                targets[target] = source
+                unique.append((source, destination, size))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self.download_file, source, destination,
+                                size): source
+                for source, destination, size in unique
+            }
+            for done, future in enumerate(as_completed(futures),
+                                          start=len(failed) + 1):
+                source = futures[future]
+                try:
+                    downloaded.append(future.result())
+                    print(f"[{done}/{total}] downloaded {source}")
+                except Exception as e:
+                    failed.append((source, str(e)))
+                    print(f"[{done}/{total}] failed {source}: {e}")
+        return downloaded, failed
+
     def bucket_create(self, name=None):
         if name is None:
             name = self.bucket_name
@@ -191,7 +704,8 @@ class Provider(StorageABC):
         print("Creating directories without creating a file is not supported "
               "in Oracle")
 
-    def list(self, source=None, dir_only=False, recursive=True):
+    def list(self, source=None, dir_only=False, recursive=True,
+             metadata=False):
         """
         lists the information as dict
 
@@ -199,6 +713,8 @@ class Provider(StorageABC):
         :param dir_only: Only the directory names
         :param recursive: in case of directory the recursive refers to all
                           subdirectories in the specified source
+        :param metadata: if True the dicts are built from a head_object call
+                         for each object instead of the listing
         :return: dict
 
         """
@@ -211,29 +727,63 @@ class Provider(StorageABC):
 
         if not updated_source:
             # Get all items from bucket
-            objs = self.object_storage.list_objects(
-                self.namespace, self.bucket_name).data.objects
+            objs = self.list_objects_iter()
         else:
             # Get items from bucket that start with name 'source'
-            objs = self.object_storage.list_objects(
-                self.namespace, self.bucket_name, prefix=source) \
-                .data.objects
+            objs = self.list_objects_iter(prefix=source)
 
         # Extract information of matched objects
         for obj in objs:
-            print(obj.name)
-            dir_files_list.append(self.get_and_extract_file_dict(obj.name))
+            if metadata:
+                dir_files_list.append(self.get_and_extract_file_dict(obj.name))
+            else:
+                dir_files_list.append(self.extract_object_dict(obj))
 
         self.storage_dict['objlist'] = dir_files_list
         return self.update_dict(self.storage_dict['objlist'])
 
+    def delete_objects(self, objs, workers=None):
+        """
+        deletes the objects with a pool of workers. Failed deletions are
+        counted and reported instead of stopping the remaining ones.
+
+        :param objs: the object summaries as returned by list_objects_iter
+        :param workers: the number of concurrent deletions
+        :return: the list of deleted dicts and the list of failed
+                 (name, error) tuples
+        """
+        workers = workers or self.workers
+        deleted = []
+        failed = []
+        total = len(objs)
+
+        def delete_object(obj):
+            self.object_storage.delete_object(self.namespace,
+                                              self.bucket_name,
+                                              obj.name)
+            return self.extract_object_dict(obj)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(delete_object, obj): obj.name
+                       for obj in objs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    deleted.append(future.result())
+                except Exception as e:
+                    failed.append((futures[future], str(e)))
+                if done % 1000 == 0 or done == total:
+                    print(f"[{done}/{total}] deleted {len(deleted)}, "
+                          f"failed {len(failed)}")
+        return deleted, failed
+
     # function to delete file or directory
-    def delete(self, source=None, recursive=True):
+    def delete(self, source=None, recursive=True, workers=None):
         """
         deletes the source
         :param source: the source which either can be a directory or file
         :param recursive: in case of directory the recursive refers to all
                           subdirectories in the specified source
+        :param workers: the number of concurrent deletions
         :return: dict
         """
 
@@ -248,28 +798,27 @@ class Provider(StorageABC):
         is_source_dir = os.path.isdir(trimmed_source)
         dict_obj = []
 
-        objs = self.object_storage.list_objects(
-            self.namespace, self.bucket_name, prefix=trimmed_source)
-
         if recursive is False and is_source_dir:
-            self.storage_dict['message'] = "The directory has child files. " \
-                                           "Please select the recursive option."
+            self.storage_dict['message'] = \
+                "The directory has child files. " \
+                "Please select the recursive option."
         else:
-            for obj in objs.data.objects:
-                # Save deleted object details to be updated in the db
-                dict_obj.append(self.get_and_extract_file_dict(obj.name))
-
-                # Delete object
-                self.object_storage.delete_object(self.namespace,
-                                                  self.bucket_name,
-                                                  obj.name)
-
-            self.storage_dict['message'] = 'Source Deleted'
+            objs = list(self.list_objects_iter(prefix=trimmed_source))
+            dict_obj, failed = self.delete_objects(objs, workers=workers)
+
+            self.storage_dict['failed'] = failed
+            if failed:
+                self.storage_dict['message'] = \
+                    f'Source Deleted, {len(failed)} of {len(objs)} ' \
+                    f'objects failed'
+            else:
+                self.storage_dict['message'] = 'Source Deleted'
         self.storage_dict['objlist'] = dict_obj
         return self.update_dict(self.storage_dict['objlist'])
 
     # function to upload file
-    def put(self, source=None, destination=None, recursive=False):
+    def put(self, source=None, destination=None, recursive=False,
+            workers=None):
         """
         puts the source on the service
         :param source: the source file
@@ -277,6 +826,7 @@ class Provider(StorageABC):
                             directory or file
         :param recursive: in case of directory the recursive refers to all
                           subdirectories in the specified source
+        :param workers: the number of concurrent uploads for a directory
         :return: dict
         """
 
@@ -297,33 +847,26 @@ class Provider(StorageABC):
 
         if is_source_file is True:
             # Its a file and need to be uploaded to the destination
-            self.object_storage.put_object(self.namespace,
-                                           self.bucket_name,
-                                           str(trimmed_destination),
-                                           open(trimmed_source, 'rb'))
-
-            # make head call since file upload does not return
-            # obj dict to extract meta data
             files_uploaded.append(
-                self.get_and_extract_file_dict(str(trimmed_destination)))
+                self.upload_file(trimmed_source, str(trimmed_destination)))
 
             self.storage_dict['message'] = 'Source uploaded'
         elif is_source_dir is True:
             # Its a directory, get all files from the directory to upload
-            for f in self.ls_files(trimmed_source, recursive):
-                dest_file_name = str(trimmed_destination /
-                                     os.path.relpath(f, trimmed_source))
-                # Object upload
-                self.object_storage.put_object(
-                    self.namespace, self.bucket_name,
-                    dest_file_name,
-                    open(f, 'rb'))
-
-                # Extract header data from object
-                files_uploaded.append(
-                    self.get_and_extract_file_dict(dest_file_name))
-
-            self.storage_dict['message'] = 'Source uploaded'
+            files = [
+                (f, str(trimmed_destination /
+                        os.path.relpath(f, trimmed_source)))
+                for f in self.ls_files(trimmed_source, recursive)
+            ]
+            files_uploaded, failed = self.upload_files(files, workers=workers)
+
+            self.storage_dict['failed'] = failed
+            if failed:
+                self.storage_dict['message'] = \
+                    f'Source uploaded, {len(failed)} of {len(files)} ' \
+                    f'files failed'
+            else:
+                self.storage_dict['message'] = 'Source uploaded'
         else:
             self.storage_dict['message'] = 'Source not found'
 
@@ -332,7 +875,8 @@ class Provider(StorageABC):
         return self.update_dict(self.storage_dict['objlist'])
 
     # function to download file or directory
-    def get(self, source=None, destination=None, recursive=True):
+    def get(self, source=None, destination=None, recursive=True,
+            workers=None):
         """
         gets the source from the service
         :param source: the source which either can be a directory or file
@@ -340,6 +884,7 @@ class Provider(StorageABC):
                             or file
         :param recursive: in case of directory the recursive refers to all
                           subdirectories in the specified source
+        :param workers: the number of concurrent downloads
         :return: dict
         """
         self.storage_dict['action'] = 'get'
@@ -350,40 +895,37 @@ class Provider(StorageABC):
         trimmed_source = str(self.get_os_path(source))
         trimmed_destination = self.get_os_path(destination)
 
-        file_objs = self.object_storage.list_objects(
-            self.namespace, self.bucket_name, prefix=trimmed_source)
+        file_objs = list(self.list_objects_iter(prefix=trimmed_source,
+                                                fields="name,size"))
 
         files_downloaded = []
         is_target_dir = os.path.isdir(trimmed_destination)
 
-        if len(file_objs.data.objects) > 1 and not is_target_dir:
+        if len(file_objs) > 1 and not is_target_dir:
             print("Please provide a directory to copy multiple files.")
+        elif not is_target_dir and \
+            not os.path.isdir(os.path.dirname(
+                os.path.abspath(trimmed_destination))):
+            self.storage_dict['message'] = 'Destination not found'
         else:
-            for file_obj in file_objs.data.objects:
-
-                obj_data = self.object_storage.get_object(self.namespace,
-                                                          self.bucket_name,
-                                                          file_obj.name)
-
-                try:
-                    if is_target_dir:
-                        with open(trimmed_destination / os.path.basename(
-                            file_obj.name), 'wb') as f:
-                            for chunk in obj_data.data.raw.stream(
-                                1024 * 1024, decode_content=False):
-                                f.write(chunk)
-                    else:
-                        with open(trimmed_destination, 'wb') as f:
-                            for chunk in obj_data.data.raw.stream(
-                                1024 * 1024, decode_content=False):
-                                f.write(chunk)
-
-                    files_downloaded.append(
-                        self.extract_file_dict(file_obj.name,
-                                               obj_data.headers))
-                    self.storage_dict['message'] = 'Source downloaded'
-                except FileNotFoundError as e:
-                    self.storage_dict['message'] = 'Destination not found'
+            files = []
+            for file_obj in file_objs:
+                if is_target_dir:
+                    target = trimmed_destination / os.path.basename(
+                        file_obj.name)
+                else:
+                    target = trimmed_destination
+                files.append((file_obj.name, target, file_obj.size))
+
+            files_downloaded, failed = self.download_files(files,
+                                                           workers=workers)
+            self.storage_dict['failed'] = failed
+            if failed:
+                self.storage_dict['message'] = \
+                    f'Source downloaded, {len(failed)} of {len(files)} ' \
+                    f'files failed'
+            else:
+                self.storage_dict['message'] = 'Source downloaded'
 
         self.storage_dict['objlist'] = files_downloaded
         pprint(self.storage_dict['objlist'])
@@ -393,7 +935,8 @@ class Provider(StorageABC):
     def search(self,
                directory=None,
                filename=None,
-               recursive=False):
+               recursive=False,
+               metadata=False):
         """
          searches for the source in all the folders on the cloud.
 
@@ -401,6 +944,8 @@ class Provider(StorageABC):
         :param filename: filename
         :param recursive: in case of directory the recursive refers to all
                           subdirectories in the specified source
+        :param metadata: if True the dicts are built from a head_object call
+                         for each found object instead of the listing
         :return: dict
         """
 
@@ -415,20 +960,20 @@ class Provider(StorageABC):
             file_path = self.get_os_path(directory) / filename
 
         if recursive is False:
-            objs = self.object_storage.list_objects(
-                self.namespace, self.bucket_name, prefix=str(file_path))
+            objs = self.list_objects_iter(prefix=str(file_path))
         elif directory is None:
-            objs = self.object_storage.list_objects(
-                self.namespace, self.bucket_name)
+            objs = self.list_objects_iter()
         else:
-            objs = self.object_storage.list_objects(
-                self.namespace, self.bucket_name, prefix=str(directory))
+            objs = self.list_objects_iter(prefix=str(directory))
 
         info_list = []
 
-        for obj in objs.data.objects:
+        for obj in objs:
             if os.path.basename(obj.name) == filename:
-                info_list.append(self.get_and_extract_file_dict(obj.name))
+                if metadata:
+                    info_list.append(self.get_and_extract_file_dict(obj.name))
+                else:
+                    info_list.append(self.extract_object_dict(obj))
 
         self.storage_dict['objlist'] = info_list
 
@@ -439,3 +984,109 @@ class Provider(StorageABC):
 
         pprint(self.storage_dict)
         return self.update_dict(self.storage_dict['objlist'])
+
+    @staticmethod
+    def md5(filename):
+        """
+        the base64 encoded md5 of a file as reported by object storage
+
+        :param filename: the local file
+        :return: the checksum
+        """
+        digest = hashlib.md5()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return base64.b64encode(digest.digest()).decode("utf-8")
+
+    def sync(self, source=None, destination=None, delete=False,
+             workers=None):
+        """
+        synchronizes the local directory source with the objects under the
+        prefix destination. Only new and changed files are uploaded. A file
+        is unchanged if its size equals the object size and its md5 equals
+        the object md5, or, for multipart objects without a plain md5, if it
+        was not modified after the object was created. The md5 checksums are
+        cached by size and mtime, so unchanged files are not hashed again.
+
+        :param source: the local directory
+        :param destination: the destination directory in the bucket
+        :param delete: if True objects without a local file are deleted
+        :param workers: the number of concurrent comparisons and transfers
+        :return: dict
+        """
+        workers = workers or self.workers
+        self.storage_dict['action'] = 'sync'
+        self.storage_dict['source'] = source
+        self.storage_dict['destination'] = destination
+
+        trimmed_source = self.get_os_path(source)
+        trimmed_destination = self.get_os_path(destination or "")
+        if not os.path.isdir(trimmed_source):
+            self.storage_dict['message'] = 'Source not found'
+            self.storage_dict['objlist'] = []
+            return self.update_dict(self.storage_dict['objlist'])
+
+        if not self.bucket_exists(self.bucket_name):
+            self.bucket_create(self.bucket_name)
+
+        # the trailing / keeps backup from matching backup2/...
+        prefix = self.get_filename(str(trimmed_destination)).rstrip('/')
+        if prefix:
+            prefix += '/'
+        remote = {obj.name: obj for obj in self.list_objects_iter(prefix)
+                  if obj.name.startswith(prefix)}
+        local = {
+            self.get_filename(str(trimmed_destination /
+                                  os.path.relpath(f, trimmed_source))): f
+            for f in self.ls_files(trimmed_source, True)
+        }
+
+        cache = self.read_manifest(self.checksum_cache) or {}
+        lock = threading.Lock()
+
+        def changed(name, filename):
+            obj = remote.get(name)
+            stat = os.stat(filename)
+            if obj is None or obj.size != stat.st_size:
+                return True
+            if not obj.md5 or '-' in obj.md5:
+                return stat.st_mtime > obj.time_created.timestamp()
+            key = os.path.abspath(filename)
+            with lock:
+                cached = cache.get(key)
+            if cached and cached[0] == stat.st_size and \
+                    cached[1] == stat.st_mtime:
+                checksum = cached[2]
+            else:
+                checksum = self.md5(filename)
+                with lock:
+                    cache[key] = [stat.st_size, stat.st_mtime, checksum]
+            return checksum != obj.md5
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            flags = executor.map(lambda item: changed(*item), local.items())
+            files = [(filename, name)
+                     for (name, filename), flag in zip(local.items(), flags)
+                     if flag]
+        self.write_manifest(self.checksum_cache, cache)
+
+        uploaded, failed = self.upload_files(files, workers=workers)
+
+        deleted = []
+        if delete:
+            stale = [obj for name, obj in remote.items()
+                     if name not in local and name.startswith(prefix)]
+            if stale:
+                deleted, failed_deletes = self.delete_objects(stale,
+                                                              workers=workers)
+                failed += failed_deletes
+
+        self.storage_dict['deleted'] = deleted
+        self.storage_dict['failed'] = failed
+        self.storage_dict['message'] = \
+            f'Source synchronized, {len(uploaded)} uploaded, ' \
+            f'{len(deleted)} deleted, ' \
+            f'{len(local) - len(files)} unchanged, {len(failed)} failed'
+        self.storage_dict['objlist'] = uploaded
+        return self.update_dict(self.storage_dict['objlist'])
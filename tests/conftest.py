@@ -0,0 +1,55 @@
+"""
+Fixtures that run the providers against the local stand-in of the oci
+services in benchmarks/fakeoci.py. No cloudmesh.yaml, no credentials and no
+network are needed. The tests are skipped if oci or the cloudmesh packages
+are not installed.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+try:
+    import oci  # noqa: F401
+    import cloudmesh.common  # noqa: F401
+except ImportError:
+    collect_ignore_glob = ["test_*.py"]
+else:
+    import benchmark
+    from fakeoci import FakeService
+
+    from cloudmesh.oracle.Clients import Clients
+    from cloudmesh.oracle.Metrics import Metrics
+
+    @pytest.fixture
+    def service(monkeypatch):
+        """
+        a fake service without latency whose clients are used by the
+        providers
+        """
+        monkeypatch.setattr(Metrics, "enabled", False)
+        service = FakeService(latency=0.0)
+        Clients.clear()
+        for kind, client in service.clients().items():
+            Clients.set(kind, benchmark.CREDENTIAL, client)
+        yield service
+        Clients.clear()
+
+    @pytest.fixture
+    def compute(service, tmp_path):
+        """
+        a compute provider with its local state in tmp_path
+        """
+        return benchmark.compute_provider(str(tmp_path))
+
+    @pytest.fixture
+    def storage(service, tmp_path):
+        """
+        a storage provider with its local state in tmp_path and an empty
+        home bucket
+        """
+        service.object_storage.add_bucket("home")
+        return benchmark.storage_provider(str(tmp_path), workers=4)
@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_benchmark_runs_from_any_directory(tmp_path):
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "benchmark.py"),
+         "--scales", "10", "--operations", "list,search", "--latency", "0",
+         "--save", str(tmp_path / "results.json")],
+        cwd=str(tmp_path), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert "error" not in result.stdout
+    assert (tmp_path / "results.json").exists()
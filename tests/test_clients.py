@@ -0,0 +1,74 @@
+import oci
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from cloudmesh.oracle.Clients import Clients
+from cloudmesh.oracle.Metrics import Metrics
+
+
+@pytest.fixture
+def credential(monkeypatch, tmp_path):
+    """
+    a credential with a generated key file and an empty registry
+    """
+    monkeypatch.setattr(Metrics, "enabled", False)
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048,
+                                   backend=default_backend())
+    key_file = tmp_path / "oci_api_key.pem"
+    key_file.write_bytes(key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption()))
+    Clients.clear()
+    yield {
+        "user": "ocid1.user.oc1..test",
+        "fingerprint": "00:00:00:00:00:00:00:00:00:00:00:00:00:00:00:00",
+        "key_file": str(key_file),
+        "pass_phrase": None,
+        "tenancy": "ocid1.tenancy.oc1..test",
+        "region": "us-ashburn-1"
+    }
+    Clients.clear()
+
+
+def test_clients_are_shared_per_credential_and_region(credential,
+                                                      monkeypatch):
+    signers = []
+    signer = oci.signer.Signer
+    monkeypatch.setattr(oci.signer, "Signer",
+                        lambda **kwargs: signers.append(kwargs) or
+                        signer(**kwargs))
+    compute = Clients.get("compute", credential)
+    assert Clients.get("compute", credential) is compute
+    network = Clients.get("virtual_network", credential)
+    other = Clients.get("compute", dict(credential, region="us-phoenix-1"))
+    assert other is not compute
+    assert network.base_client.signer is compute.base_client.signer
+    # the key file is loaded once for all kinds and regions
+    assert len(signers) == 1
+
+
+def test_clients_remount_the_connection_pool(credential, monkeypatch):
+    monkeypatch.setattr(Clients, "pool_size", 7)
+    monkeypatch.setattr(Clients, "keep_alive", False)
+    session = Clients.get("object_storage", credential).base_client.session
+    adapter = session.get_adapter("https://objectstorage.example.com")
+    assert adapter._pool_maxsize == 7
+    assert adapter._pool_connections == 7
+    assert session.headers["Connection"] == "close"
+
+
+def test_namespace_is_cached(credential):
+    class ObjectStorage(object):
+        calls = 0
+
+        def get_namespace(self):
+            ObjectStorage.calls += 1
+            return oci.response.Response(200, {}, "ns", None)
+
+    Clients.set("object_storage", credential, ObjectStorage())
+    assert Clients.namespace(credential) == "ns"
+    assert Clients.namespace(credential) == "ns"
+    assert ObjectStorage.calls == 1
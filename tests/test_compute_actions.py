@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+
+def test_reboot_many_requires_names(compute, service):
+    with pytest.raises(ValueError):
+        compute.reboot_many(names=None)
+
+
+def test_reboot_many_waits_for_the_reboot(compute, service, monkeypatch):
+    instance, = service.seed_instances(1)
+    # the vm accepts the reset but stays running
+    monkeypatch.setattr(
+        service.compute, "instance_action",
+        lambda instance_id, action: service.compute.get_instance(
+            instance_id))
+    result, = compute.reboot_many([instance.display_name], wait=True,
+                                  timeout=0.2)
+    assert result["result"] == "timeout"
+
+
+def test_reboot_many_without_wait(compute, service):
+    instance, = service.seed_instances(1)
+    result, = compute.reboot_many([instance.display_name])
+    assert result["result"] == "ok"
+
+
+def test_async_reboot_waits_for_the_reboot(compute, service, monkeypatch):
+    from cloudmesh.oracle.compute.AsyncProvider import AsyncProvider
+
+    instance, = service.seed_instances(1)
+    monkeypatch.setattr(
+        service.compute, "instance_action",
+        lambda instance_id, action: service.compute.get_instance(
+            instance_id))
+
+    async def reboot():
+        async with AsyncProvider(provider=compute) as provider:
+            return await provider.reboot(instance.display_name, wait=True,
+                                         timeout=0.2)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(reboot())
@@ -0,0 +1,51 @@
+import oci
+import pytest
+
+from cloudmesh.oracle.compute.InstanceCache import InstanceCache
+
+
+def test_cache_reads_changes_of_other_processes(tmp_path):
+    filename = str(tmp_path / "instances.json")
+    first = InstanceCache(filename=filename)
+    second = InstanceCache(filename=filename)
+    first.put("vm", "ocid1")
+    assert second.get("vm") == "ocid1"
+    first.put("vm", "ocid2")
+    assert second.get("vm") == "ocid2"
+
+
+def test_action_resolves_a_recreated_vm(compute, service):
+    old, = service.seed_instances(1)
+    compute.instances.put(old.display_name, old.id)
+    service.compute.terminate_instance(old.id)
+    new, = service.seed_instances(1)
+    assert new.display_name == old.display_name
+    compute.stop(old.display_name)
+    assert service.compute.get_instance(new.id).data.lifecycle_state in \
+        ["STOPPING", "STOPPED"]
+    assert compute.instances.get(new.display_name) == new.id
+
+
+def test_find_instance_skips_terminated_vms(compute, service):
+    instance, = service.seed_instances(1)
+    compute.instances.put(instance.display_name, instance.id)
+    service.compute.terminate_instance(instance.id)
+    assert compute.find_instance(instance.display_name) is None
+
+
+def test_stop_only_ignores_conflicts_of_stopped_vms(compute, service,
+                                                    monkeypatch):
+    instance, = service.seed_instances(1)
+
+    def conflict(*args, **kwargs):
+        raise oci.exceptions.ServiceError(409, "Conflict", {}, "busy")
+
+    action = service.compute.instance_action
+    monkeypatch.setattr(service.compute, "instance_action", conflict)
+    with pytest.raises(oci.exceptions.ServiceError):
+        compute.stop(instance.display_name)
+
+    monkeypatch.setattr(service.compute, "instance_action", action)
+    action(instance.id, "SOFTSTOP")
+    monkeypatch.setattr(service.compute, "instance_action", conflict)
+    compute.stop(instance.display_name)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import oci
+
+
+def test_create_many_shares_one_network(compute, service):
+    service.seed_images()
+    vms = compute.create_many(names="vm[1-4]", image="image-0001",
+                              size="VM.Standard2.1")
+    assert sorted(vm["name"] for vm in vms) == ["vm1", "vm2", "vm3", "vm4"]
+    assert all(vm["_lifecycle_state"] == "RUNNING" for vm in vms)
+    assert service.calls["create_vcn"] == 1
+    assert service.calls["launch_instance"] == 4
+    network = compute.networks.get("cloudmesh")
+    assert sorted(network["instances"]) == \
+        sorted(vm["oracle_id"] for vm in vms)
+
+    compute.create_many(names=["vm5"], image="image-0001",
+                        size="VM.Standard2.1")
+    assert service.calls["create_vcn"] == 1
+
+
+def test_create_many_launches_concurrently(compute, service, monkeypatch):
+    service.seed_images()
+    launch_instance = service.compute.launch_instance
+    lock = threading.Lock()
+    state = {"running": 0, "most": 0}
+
+    def counted(*args, **kwargs):
+        with lock:
+            state["running"] += 1
+            state["most"] = max(state["most"], state["running"])
+        try:
+            time.sleep(0.02)
+            return launch_instance(*args, **kwargs)
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(service.compute, "launch_instance", counted)
+    compute.create_many(names="vm[1-6]", image="image-0001",
+                        size="VM.Standard2.1", parallel=3)
+    assert state["most"] == 3
+
+
+def test_create_many_keeps_the_launched_vms(compute, service, monkeypatch):
+    service.seed_images()
+    launch_instance = service.compute.launch_instance
+
+    def failing(details, *args, **kwargs):
+        if details.display_name == "vm2":
+            raise oci.exceptions.ServiceError(500, "InternalError", {},
+                                              "broken")
+        return launch_instance(details, *args, **kwargs)
+
+    monkeypatch.setattr(service.compute, "launch_instance", failing)
+    vms = compute.create_many(names="vm[1-3]", image="image-0001",
+                              size="VM.Standard2.1")
+    assert sorted(vm["name"] for vm in vms) == ["vm1", "vm3"]
@@ -0,0 +1,23 @@
+def test_images_iter_forwards_filters(service, compute):
+    service.seed_images(5)
+    assert len(list(compute.images_iter())) == 5
+    assert list(compute.images_iter(operating_system="Oracle Linux")) == []
+    found = list(compute.images_iter(display_name="image-0003"))
+    assert [image['name'] for image in found] == ["image-0003"]
+
+
+def test_list_iter_looks_up_once(service, compute):
+    service.page_size = 10
+    service.seed_instances(50)
+    service.calls.clear()
+    compute.vm_lookup()
+    lookup = dict(service.calls)
+
+    service.calls.clear()
+    vms = list(compute.list_iter())
+    assert len(vms) == 50
+    assert all(vm['ip_public'] and vm['ip_private'] and vm['_image']
+               for vm in vms)
+    # five pages of instances, but the images and ips are listed once
+    assert service.calls.pop("list_instances") == 5
+    assert dict(service.calls) == lookup
@@ -0,0 +1,93 @@
+import multiprocessing
+
+from cloudmesh.oracle.compute.NetworkPool import NetworkPool
+
+
+def terminate(service, instance):
+    service.compute.terminate_instance(instance.id)
+
+
+def test_release_keeps_network_found_in_the_cloud(compute, service):
+    vcn, subnet = service.seed_network()
+    instance, = service.seed_instances(1, subnet=subnet)
+    network = compute.network()
+    assert network["vcn_id"] == vcn.id
+    compute.networks.attach(network["name"], [instance.id])
+    terminate(service, instance)
+    assert compute.release_network(instance.id, vcn.id, subnet.id) is False
+    assert service.calls["delete_vcn"] == 0
+    assert compute.networks.get(network["name"]) is None
+
+
+def test_release_keeps_network_used_by_other_vms(compute, service):
+    vcn, subnet = service.seed_network()
+    mine, other = service.seed_instances(2, subnet=subnet)
+    compute.networks.add("cloudmesh", vcn_id=vcn.id, subnet_id=subnet.id,
+                         owned=True)
+    compute.networks.attach("cloudmesh", [mine.id])
+    terminate(service, mine)
+    assert compute.release_network(mine.id, vcn.id, subnet.id) is False
+    assert service.calls["delete_vcn"] == 0
+
+
+def test_release_deletes_network_of_vm_created_before_the_pool(
+        compute, service):
+    vcn, subnet = service.seed_network()
+    instance, = service.seed_instances(1, subnet=subnet)
+    terminate(service, instance)
+    assert compute.release_network(instance.id, vcn.id, subnet.id) is True
+    assert service.calls["delete_vcn"] == 1
+
+
+def test_release_keeps_pool_vcn_of_unknown_instance(compute, service):
+    vcn, subnet = service.seed_network()
+    instance, = service.seed_instances(1, subnet=subnet)
+    compute.networks.add("cloudmesh", vcn_id=vcn.id, subnet_id=subnet.id,
+                         owned=True)
+    terminate(service, instance)
+    assert compute.release_network(instance.id, vcn.id, subnet.id) is False
+    assert service.calls["delete_vcn"] == 0
+
+
+def test_network_replaces_deleted_subnet(compute, service):
+    vcn, subnet = service.seed_network()
+    compute.networks.add("cloudmesh", vcn_id=vcn.id, subnet_id=subnet.id)
+    service.virtual_network.delete_subnet(subnet.id)
+    network = compute.network("cloudmesh")
+    assert network["subnet_id"] != subnet.id
+    assert compute.networks.get("cloudmesh")["subnet_id"] == \
+        network["subnet_id"]
+
+
+def add_networks(filename, prefix):
+    pool = NetworkPool(filename=filename)
+    for i in range(20):
+        pool.add(f"{prefix}-{i}", vcn_id=f"vcn-{prefix}-{i}")
+
+
+def test_pool_keeps_networks_of_concurrent_processes(tmp_path):
+    filename = str(tmp_path / "networks.json")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=add_networks,
+                                 args=(filename, f"p{i}"))
+                 for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    pool = NetworkPool(filename=filename)
+    assert all(pool.get(f"p{i}-{j}") for i in range(4) for j in range(20))
+
+
+def test_release_deletes_owned_network(compute, service):
+    vcn, subnet = service.seed_network()
+    instance, = service.seed_instances(1, subnet=subnet)
+    for name in ["cloudmesh", "alias"]:
+        compute.networks.add(name, vcn_id=vcn.id, subnet_id=subnet.id,
+                             owned=True)
+    compute.networks.attach("cloudmesh", [instance.id])
+    terminate(service, instance)
+    assert compute.release_network(instance.id) is True
+    assert service.calls["delete_vcn"] == 1
+    assert compute.networks.get("cloudmesh") is None
+    assert compute.networks.get("alias") is None
@@ -0,0 +1,77 @@
+import threading
+from time import sleep
+
+
+class FakeSsh(object):
+    """
+    records the copies of put_iter instead of running scp or rsync
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, log, vm, failing):
+        self.log = log
+        self.vm = vm
+        self.failing = failing
+
+    def result(self, exit):
+        sleep(0.01)
+        return {"host": self.vm["ip_public"], "command": "copy",
+                "exit": exit, "stdout": "", "stderr": "", "seconds": 0.01,
+                "timeout": False}
+
+    def copy(self, source, destination, delta=True, timeout=None):
+        with self.lock:
+            self.log.append((None, self.vm["name"]))
+        return self.result(0)
+
+    def relay(self, path, host, user=None, directory=False, delta=True,
+              timeout=None):
+        with self.lock:
+            self.log.append((self.vm["name"], host))
+        return self.result(1 if host in self.failing else 0)
+
+
+def vms(count):
+    return [{"name": f"vm{i}", "ip_public": f"129.0.0.{i}",
+             "ip_private": f"10.0.0.{i}", "_image": "ubuntu-20"}
+            for i in range(count)]
+
+
+def put(compute, monkeypatch, tmp_path, count, failing=()):
+    log = []
+    monkeypatch.setattr(compute, "ssh_session",
+                        lambda vm: FakeSsh(log, vm, failing))
+    results = list(compute.put_iter(source=str(tmp_path),
+                                    destination="app", vms=vms(count),
+                                    parallel=8, seeds=1, fanout=2))
+    return results, log
+
+
+def test_put_fans_out_from_the_seeds(compute, monkeypatch, tmp_path):
+    results, log = put(compute, monkeypatch, tmp_path, 12)
+    assert sorted(result["name"] for result in results) == \
+        sorted(vm["name"] for vm in vms(12))
+    assert all(result["exit"] == 0 for result in results)
+    assert results[0]["source"] is None
+    done = set()
+    for result in results:
+        # a vm only relays the files after it received them
+        assert result["source"] is None or result["source"] in done
+        done.add(result["name"])
+    relayed = [result for result in results if result["source"]]
+    assert relayed
+    assert len(log) == 12
+
+
+def test_put_falls_back_to_the_workstation(compute, monkeypatch, tmp_path):
+    results, log = put(compute, monkeypatch, tmp_path, 6,
+                       failing={f"10.0.0.{i}" for i in range(6)})
+    # every relay fails, so all vms get the files from the workstation
+    assert sorted(result["name"] for result in results) == \
+        sorted(vm["name"] for vm in vms(6))
+    assert all(result["source"] is None for result in results)
+    assert all(result["exit"] == 0 for result in results)
+    relays = [entry for entry in log if entry[0] is not None]
+    assert relays
+    assert len(log) == 6 + len(relays)
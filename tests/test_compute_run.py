@@ -0,0 +1,66 @@
+import threading
+from time import sleep
+
+
+def vms(count):
+    return [{"name": f"vm{i}", "ip_public": f"129.0.0.{i}"}
+            for i in range(count)]
+
+
+def fake_execute(exits, delays=None, running=None):
+    """
+    :param exits: the exit code by vm name, None for a timeout
+    :param delays: the seconds a command takes by vm name
+    :param running: a dict that records the most concurrent commands
+    """
+    lock = threading.Lock()
+
+    def execute(vm=None, command=None, timeout=None):
+        if running is not None:
+            with lock:
+                running["now"] += 1
+                running["most"] = max(running["most"], running["now"])
+        sleep((delays or {}).get(vm["name"], 0.01))
+        if running is not None:
+            with lock:
+                running["now"] -= 1
+        exit = exits.get(vm["name"], 0)
+        return {"host": vm["ip_public"], "command": command, "exit": exit,
+                "stdout": f"{vm['name']}\n", "stderr": "", "seconds": 0.01,
+                "timeout": exit is None}
+
+    return execute
+
+
+def test_run_many_summarizes_the_results(compute, monkeypatch):
+    monkeypatch.setattr(compute, "execute", fake_execute(
+        {"vm1": 1, "vm2": None, "vm3": 255}))
+    printed = []
+    summary = compute.run_many("uptime",
+                               vms=vms(5) + [{"name": "noip",
+                                              "ip_public": None}],
+                               output=printed.append)
+    assert summary["vms"] == 6
+    assert (summary["ok"], summary["failed"], summary["timeout"],
+            summary["unreachable"]) == (2, 1, 1, 2)
+    assert sorted(summary["errors"]) == ["noip", "vm1", "vm2", "vm3"]
+    assert len(printed) == 6
+
+
+def test_run_many_streams_results_as_vms_finish(compute, monkeypatch):
+    running = {"now": 0, "most": 0}
+    monkeypatch.setattr(compute, "execute", fake_execute(
+        {}, delays={"vm0": 0.2}, running=running))
+    names = []
+    compute.run_many("uptime", vms=vms(8), parallel=4,
+                     output=lambda result: names.append(result["name"]))
+    assert names[-1] == "vm0"
+    assert running["most"] == 4
+
+
+def test_run_many_selects_vms_by_pattern(compute, service, monkeypatch):
+    service.seed_instances(4, prefix="web")
+    monkeypatch.setattr(compute, "execute", fake_execute({}))
+    summary = compute.run_many("uptime", names="web*", output=print)
+    assert summary["vms"] == 4
+    assert summary["ok"] == 4
@@ -0,0 +1,26 @@
+import pytest
+
+
+def test_wait_finds_the_public_ip(compute, service, monkeypatch):
+    instance, = service.seed_instances(1)
+    private = service.private_by_vnic[
+        service.attachments_by_instance[instance.id][0].vnic_id]
+    public = service.public_by_private[private.id]
+    monkeypatch.setattr(compute, "port_open", lambda ip: ip is not None)
+    monkeypatch.setattr(compute, "ssh",
+                        lambda vm=None, command=None: "IAmReady\n")
+    vm = {"name": instance.display_name, "oracle_id": instance.id}
+    assert compute.wait(vm=vm, interval=0.01, timeout=1) is True
+    assert vm["ip_public"] == public.ip_address
+
+
+def test_wait_raises_unexpected_errors(compute, service, monkeypatch):
+    instance, = service.seed_instances(1)
+
+    def broken(*args, **kwargs):
+        raise ValueError("broken")
+
+    monkeypatch.setattr(service.compute, "get_instance", broken)
+    vm = {"name": instance.display_name, "oracle_id": instance.id}
+    with pytest.raises(ValueError):
+        compute.wait(vm=vm, interval=0.01, timeout=1)
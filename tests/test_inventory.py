@@ -0,0 +1,44 @@
+import oci
+
+
+def test_refresh_prunes_deleted_images(compute, service):
+    service.seed_images(3)
+    compute.refresh("image")
+    assert len(compute.inventory.find("image")) == 3
+    removed = service.images.list()[0]
+    del service.images[removed.id]
+    compute.default["inventory"] = {"image": 0}
+    compute.refresh("image")
+    names = [image["name"] for image in compute.inventory.find("image")]
+    assert len(names) == 2
+    assert removed.display_name not in names
+
+
+def test_flavor_lists_again_on_a_miss(compute, service):
+    compute.refresh("flavor")
+    service.shapes.append(oci.core.models.Shape(shape="VM.Custom.1"))
+    assert compute.flavor("VM.Custom.1")["name"] == "VM.Custom.1"
+    assert compute.flavor("VM.Unknown") is None
+
+
+def test_rename_keeps_the_vm_in_the_cached_list(compute, service):
+    service.seed_instances(3)
+    assert len(compute.list(cached=True)) == 3
+    compute.rename("vm000001", "vmX")
+    names = sorted(vm["name"] for vm in compute.list(cached=True))
+    assert names == ["vm000002", "vm000003", "vmX"]
+    vm, = compute.inventory.find("vm", name="vmX")
+    assert vm["ip_public"]
+
+
+def test_refresh_picks_up_renames_made_elsewhere(compute, service):
+    instance, _ = service.seed_instances(2)
+    name = instance.display_name
+    compute.refresh("vm")
+    service.compute.update_instance(
+        instance.id, oci.core.models.UpdateInstanceDetails(
+            display_name="renamed"))
+    compute.default["inventory"] = {"vm": 0}
+    compute.refresh("vm")
+    assert compute.inventory.find("vm", name="renamed")
+    assert not compute.inventory.find("vm", name=name)
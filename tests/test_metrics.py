@@ -0,0 +1,90 @@
+import json
+import multiprocessing
+
+import pytest
+
+from cloudmesh.oracle.Metrics import Metrics
+
+
+@pytest.fixture
+def metrics(monkeypatch, tmp_path):
+    """
+    the Metrics of this process, saved to tmp_path
+    """
+    monkeypatch.setattr(Metrics, "filename", str(tmp_path / "metrics.json"))
+    monkeypatch.setattr(Metrics, "_operations", {})
+    monkeypatch.setattr(Metrics, "_registered", True)
+    return Metrics
+
+
+def record(filename, count):
+    Metrics.filename = filename
+    Metrics._registered = True
+    Metrics._operations = {}
+    for i in range(count):
+        Metrics.record("compute.get_instance", 0.001)
+    Metrics.save()
+
+
+def test_instrumented_client_records_calls_and_errors(metrics, service):
+    instance, = service.seed_instances(1)
+    client = metrics.instrument("compute", service.compute)
+    client.get_instance(instance.id)
+    with pytest.raises(Exception):
+        client.get_instance("ocid1.instance.missing")
+    entry, = metrics.stats()
+    assert entry["operation"] == "compute.get_instance"
+    assert entry["count"] == 2
+    assert entry["errors"] == 1
+    assert entry["polls"] == 0
+
+
+def test_polls_are_exported(metrics):
+    metrics.call("compute.get_instance", lambda: None)
+    metrics.call("compute.get_instance", lambda: None, poll=True)
+    text = metrics.prometheus()
+    assert 'oci_requests_total{operation="compute.get_instance"} 2' in text
+    assert 'oci_request_polls_total{operation="compute.get_instance"} 1' \
+        in text
+    assert "retries" not in text
+
+
+def test_save_merges_older_files(metrics):
+    with open(metrics.filename, 'w') as f:
+        json.dump({"compute.get_instance": {
+            "count": 3, "errors": {"404": 1}, "retries": 2, "seconds": 1.0,
+            "sent": 0, "received": 10, "buckets": []}}, f)
+    metrics.record("compute.get_instance", 0.001, poll=True, status=404)
+    metrics.save()
+    assert metrics.operations() == {}
+    entry, = metrics.stats(saved=True)
+    assert entry["count"] == 4
+    assert entry["errors"] == 2
+    assert entry["polls"] == 3
+    assert entry["received"] == 10
+
+
+def test_concurrent_saves_keep_all_calls(metrics):
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=record,
+                                 args=(metrics.filename, 50))
+                 for i in range(8)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    entry, = metrics.stats(saved=True)
+    assert entry["count"] == 400
+
+
+def test_stats_command(metrics, capsys):
+    pytest.importorskip("cloudmesh.shell")
+    from cloudmesh.oracle.command.oracle import OracleCommand
+
+    metrics.record("compute.get_instance", 0.001, poll=True)
+    metrics.save()
+    OracleCommand().do_oracle("stats --prometheus")
+    assert 'oci_request_polls_total{operation="compute.get_instance"} 1' \
+        in capsys.readouterr().out
+    OracleCommand().do_oracle("stats --reset")
+    assert metrics.stats(saved=True) == []
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from cloudmesh.oracle.compute.PublicIpPool import PublicIpPool
+
+
+def test_assign_refills_the_pool(compute, service):
+    pool = PublicIpPool(compute, warm=2)
+    pool.fill()
+    pool.assign("ocid1.privateip.first")
+    pool.refilling.join()
+    assert pool.error is None
+    assert len(pool.list("DETACHED")) == 2
+    assert service.calls["create_public_ip"] == 3
+
+
+def test_released_ips_are_reused(compute, service):
+    pool = PublicIpPool(compute)
+    public = pool.assign("ocid1.privateip.first")
+    service.provision = 0.05
+    pool.release(public)
+    assert pool.fill(1) == []
+    time.sleep(0.1)
+    again = pool.assign("ocid1.privateip.second")
+    assert again.id == public.id
+    assert service.calls["create_public_ip"] == 1
+
+
+def test_concurrent_fills_create_count_ips(compute, service, monkeypatch):
+    create = service.virtual_network.create_public_ip
+
+    def slow(*args, **kwargs):
+        time.sleep(0.02)
+        return create(*args, **kwargs)
+
+    monkeypatch.setattr(service.virtual_network, "create_public_ip", slow)
+    pool = PublicIpPool(compute)
+    threads = [threading.Thread(target=pool.fill, args=(3,))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert service.calls["create_public_ip"] == 3
+
+
+def test_reload_keeps_ips_that_are_being_assigned(compute, service):
+    pool = PublicIpPool(compute, ttl=0)
+    pool.fill(1)
+    taken = pool._take()
+    pool.load()
+    assert pool._take() is None
+    assert pool.find(taken.id).id == taken.id
+
+
+def test_attach_looks_up_the_vm_once(compute, service):
+    instance, = service.seed_instances(1)
+    compute.instances.put(instance.display_name, instance.id)
+    service.calls.clear()
+    compute.attach_public_ip(instance.display_name)
+    assert service.calls["list_vnic_attachments"] == 1
+    assert service.calls["get_public_ip_by_private_ip_id"] == 1
+
+
+def test_attach_of_the_assigned_ip_is_a_noop(compute, service):
+    instance, = service.seed_instances(1)
+    compute.attach_public_ip(instance.display_name)
+    public = compute.public_ip_of(compute.get_private_ipobj(instance.id))
+    assert public.lifetime == "RESERVED"
+    service.calls.clear()
+    compute.attach_public_ip(instance.display_name, ip=public.ip_address)
+    assert service.calls["update_public_ip"] == 0
+    assert compute.public_ip_of(
+        compute.get_private_ipobj(instance.id)).id == public.id
@@ -0,0 +1,107 @@
+import functools
+
+import pytest
+
+from cloudmesh.oracle.compute import Provider as provider_module
+from cloudmesh.oracle.compute.SecgroupReconciler import SecgroupReconciler
+
+RULES = [
+    {"name": "ssh", "protocol": "tcp", "ports": "22:22",
+     "ip_range": "0.0.0.0/0"},
+    {"name": "http", "protocol": "tcp", "ports": "80:80",
+     "ip_range": "0.0.0.0/0"},
+    {"name": "ping", "protocol": "icmp", "ports": "",
+     "ip_range": "10.0.0.0/8"},
+]
+
+GROUPS = [
+    {"name": "web", "description": "web", "rules": ["ssh", "http", "ping"]},
+    {"name": "admin", "description": "admin", "rules": ["ssh"]},
+]
+
+
+@pytest.fixture
+def reconciler(compute):
+    return SecgroupReconciler(compute, groups=GROUPS, rules=RULES)
+
+
+@pytest.fixture
+def vcn(service):
+    vcn, _ = service.seed_network()
+    return vcn
+
+
+def test_sync_adds_missing_rules_in_one_batch(compute, service, reconciler,
+                                              vcn):
+    nsg = compute.add_secgroup("web", vcn_id=vcn.id)
+    result = reconciler.sync("web", nsg.id)
+    assert (result["added"], result["removed"], result["calls"]) == (3, 0, 2)
+    assert service.calls["add_network_security_group_security_rules"] == 1
+    assert len(reconciler.actual(nsg.id)) == 3
+
+
+def test_sync_without_changes_only_lists(compute, service, reconciler, vcn):
+    nsg = compute.add_secgroup("web", vcn_id=vcn.id)
+    reconciler.sync("web", nsg.id)
+    result = reconciler.sync("web", nsg.id)
+    assert (result["added"], result["removed"], result["calls"]) == (0, 0, 1)
+
+
+def test_sync_removes_rules_that_are_not_defined(compute, reconciler, vcn):
+    nsg = compute.add_secgroup("admin", vcn_id=vcn.id)
+    reconciler.sync("web", nsg.id)
+    result = reconciler.sync("admin", nsg.id)
+    assert (result["added"], result["removed"], result["calls"]) == (0, 2, 2)
+    assert list(reconciler.actual(nsg.id)) == \
+        [reconciler.rule_key(RULES[0])]
+    result = reconciler.sync("web", nsg.id, remove=False)
+    assert result["removed"] == 0
+
+
+def test_apply_splits_the_rules_into_batches(compute, service, reconciler,
+                                             vcn):
+    nsg = compute.add_secgroup("web", vcn_id=vcn.id)
+    reconciler.batch = 2
+    add, ids = reconciler.plan(reconciler.desired("web"), {})
+    assert len(add) == 3 and ids == []
+    assert reconciler.apply(nsg.id, add, ids) == 2
+    add, ids = reconciler.plan({}, reconciler.actual(nsg.id))
+    assert add == [] and len(ids) == 3
+    assert reconciler.apply(nsg.id, add, ids) == 2
+    assert reconciler.actual(nsg.id) == {}
+
+
+def test_plan_removes_duplicates(reconciler):
+    key = reconciler.rule_key(RULES[0])
+    add, ids = reconciler.plan({key: "ssh"}, {key: ["a", "b"]})
+    assert add == [] and ids == ["b"]
+
+
+def test_reconcile_all_groups(compute, reconciler, vcn):
+    web = compute.add_secgroup("web", vcn_id=vcn.id)
+    admin = compute.add_secgroup("admin", vcn_id=vcn.id)
+    compute.add_secgroup("other", vcn_id=vcn.id)
+    results = {result["name"]: result
+               for result in reconciler.reconcile(parallel=2)}
+    assert sorted(results) == ["admin", "web"]
+    assert results["web"]["id"] == web.id
+    assert results["admin"]["added"] == 1
+    assert admin.id == results["admin"]["id"]
+
+
+def test_remove_rules_from_secgroup(compute, service, monkeypatch, vcn):
+    monkeypatch.setattr(provider_module, "SecgroupReconciler",
+                        functools.partial(SecgroupReconciler,
+                                          groups=GROUPS, rules=RULES))
+    nsg = compute.add_secgroup("web", vcn_id=vcn.id)
+    compute.upload_secgroup("web")
+    result = compute.remove_rules_from_secgroup("web", ["ssh", "http"])
+    assert (result["removed"], result["calls"]) == (2, 2)
+    reconciler = SecgroupReconciler(compute, groups=GROUPS, rules=RULES)
+    assert list(reconciler.actual(nsg.id)) == \
+        [reconciler.rule_key(RULES[2])]
+
+
+def test_remove_secgroup(compute, vcn):
+    compute.add_secgroup("web", vcn_id=vcn.id)
+    assert compute.remove_secgroup("web") is True
@@ -0,0 +1,53 @@
+import asyncio
+
+from cloudmesh.oracle.compute import Ssh as ssh_module
+from cloudmesh.oracle.compute.Ssh import Ssh
+
+
+def batch_modes(args):
+    return [arg for arg in args if arg.startswith("BatchMode=")]
+
+
+def test_commands_do_not_ask_for_passwords_with_an_agent(monkeypatch):
+    monkeypatch.setenv("SSH_AUTH_SOCK", "/tmp/agent.sock")
+    session = Ssh("10.0.0.1", user="ubuntu", key="/tmp/id_rsa")
+    assert batch_modes(session.args(session.location, "uptime")) == \
+        ["BatchMode=yes"]
+
+
+def test_commands_may_ask_for_a_passphrase_without_an_agent(monkeypatch):
+    monkeypatch.delenv("SSH_AUTH_SOCK", raising=False)
+    session = Ssh("10.0.0.1", user="ubuntu", key="/tmp/id_rsa")
+    assert batch_modes(session.args(session.location, "uptime")) == \
+        ["BatchMode=no"]
+    session.opened = True
+    assert batch_modes(session.args(session.location, "uptime")) == \
+        ["BatchMode=yes"]
+
+
+def test_interactive_may_ask_for_a_passphrase(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ssh_module.subprocess, "call",
+                        lambda args: calls.append(args) or 0)
+    session = Ssh("10.0.0.1", user="ubuntu", key="/tmp/id_rsa")
+    session.multiplex = False
+    assert session.interactive() == 0
+    assert batch_modes(calls[0]) == ["BatchMode=no"]
+
+
+def test_async_ssh_without_command_is_interactive(compute, monkeypatch):
+    from cloudmesh.oracle.compute.AsyncProvider import AsyncProvider
+
+    calls = []
+    monkeypatch.setattr(ssh_module.subprocess, "call",
+                        lambda args: calls.append(args) or 0)
+    session = Ssh("10.0.0.1", user="ubuntu", key="/tmp/id_rsa")
+    session.multiplex = False
+    monkeypatch.setattr(compute, "ssh_session", lambda vm: session)
+
+    async def ssh():
+        async with AsyncProvider(provider=compute) as provider:
+            return await provider.ssh(vm={"name": "vm1"})
+
+    assert asyncio.run(ssh()) is None
+    assert batch_modes(calls[0]) == ["BatchMode=no"]
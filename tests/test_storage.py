@@ -0,0 +1,278 @@
+import asyncio
+import os
+import threading
+import time
+
+import oci
+import pytest
+
+
+def write(path, size):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return str(path)
+
+
+def test_upload_multipart_restarts_are_bounded(storage, service,
+                                               monkeypatch, tmp_path):
+    storage.multipart_threshold = 1024
+    storage.part_size = 1024
+    source = write(tmp_path / "big", 4096)
+
+    def expired(*args, **kwargs):
+        raise oci.exceptions.ServiceError(404, "NotFound", {}, "gone")
+
+    monkeypatch.setattr(service.object_storage, "upload_part", expired)
+    with pytest.raises(RuntimeError):
+        storage.upload_multipart(source, "big")
+    assert service.calls["create_multipart_upload"] == storage.restarts + 1
+
+
+def test_upload_files_bounds_parts_in_memory(storage, service, monkeypatch,
+                                             tmp_path):
+    storage.multipart_threshold = 1024
+    storage.part_size = 1024
+    files = [(write(tmp_path / f"file{n}", 8 * 1024), f"file{n}")
+             for n in range(4)]
+    upload_part = service.object_storage.upload_part
+    lock = threading.Lock()
+    state = {"running": 0, "most": 0}
+
+    def counted(*args, **kwargs):
+        with lock:
+            state["running"] += 1
+            state["most"] = max(state["most"], state["running"])
+        try:
+            time.sleep(0.01)
+            return upload_part(*args, **kwargs)
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(service.object_storage, "upload_part", counted)
+    uploaded, failed = storage.upload_files(files, workers=4)
+    assert not failed
+    assert len(uploaded) == 4
+    assert state["most"] <= storage.workers
+
+
+def test_download_fails_if_object_changes(storage, service, monkeypatch,
+                                          tmp_path):
+    storage.multipart_threshold = 1024
+    storage.part_size = 1024
+    name, = service.seed_objects(1, prefix="big/", size=4096)
+    get_object = service.object_storage.get_object
+
+    def overwrite(*args, **kwargs):
+        response = get_object(*args, **kwargs)
+        service.seed_objects(1, prefix="big/", size=4096)
+        return response
+
+    monkeypatch.setattr(service.object_storage, "get_object", overwrite)
+    destination = tmp_path / "big"
+    with pytest.raises(oci.exceptions.ServiceError) as e:
+        storage.download_file(name, str(destination), size=4096, workers=1)
+    assert e.value.status == 412
+    # neither the destination nor the temporary file is left behind
+    assert not [f for f in os.listdir(tmp_path) if f.startswith("big")]
+
+
+def test_download_files_rejects_same_destination(storage, service,
+                                                 tmp_path):
+    first, = service.seed_objects(1, prefix="a/")
+    second, = service.seed_objects(1, prefix="b/")
+    destination = str(tmp_path / "file")
+    downloaded, failed = storage.download_files(
+        [(first, destination, 256), (second, destination, 256)])
+    assert [d["fileName"] for d in downloaded] == [first]
+    assert [source for source, error in failed] == [second]
+
+
+def test_sync_delete_keeps_objects_of_other_prefixes(storage, service,
+                                                     tmp_path):
+    store = service.object_storage.store("home")
+    for name in ["backup/old.txt", "backup2/keep.txt"]:
+        store.put(name, b"data", "md5")
+    source = tmp_path / "source"
+    source.mkdir()
+    write(source / "new.txt", 16)
+    storage.sync(str(source), "backup", delete=True)
+    assert sorted(store.objects) == ["backup/new.txt", "backup2/keep.txt"]
+
+
+def test_async_get_rejects_same_destination(storage, service, tmp_path):
+    from cloudmesh.oracle.storage.AsyncProvider import AsyncProvider
+
+    service.seed_objects(1, prefix="data/a/")
+    service.seed_objects(1, prefix="data/b/")
+    target = tmp_path / "target"
+    target.mkdir()
+
+    async def get():
+        async with AsyncProvider(provider=storage) as provider:
+            return await provider.get(source="data", destination=str(target))
+
+    downloaded = asyncio.run(get())
+    assert len(downloaded) == 1
+    assert os.listdir(target) == ["file-000001"]
+
+
+def test_put_uploads_a_directory_without_head_object(storage, service,
+                                                     tmp_path):
+    source = tmp_path / "source"
+    (source / "sub").mkdir(parents=True)
+    write(source / "a.txt", 16)
+    write(source / "sub" / "b.txt", 32)
+    entries = storage.put(str(source), "backup", recursive=True)
+    store = service.object_storage.store("home")
+    assert sorted(store.objects) == ["backup/a.txt", "backup/sub/b.txt"]
+    assert sorted((entry["fileName"], entry["contentLength"])
+                  for entry in entries) == \
+        [("backup/a.txt", "16"), ("backup/sub/b.txt", "32")]
+    assert all(entry["md5"] for entry in entries)
+    assert service.calls["head_object"] == 0
+
+
+def test_put_reports_failed_files(storage, service, monkeypatch, tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for n in range(4):
+        write(source / f"file{n}", 16)
+    put_object = service.object_storage.put_object
+
+    def failing(namespace, bucket, name, *args, **kwargs):
+        if name.endswith("file2"):
+            raise oci.exceptions.ServiceError(500, "InternalError", {},
+                                              "broken")
+        return put_object(namespace, bucket, name, *args, **kwargs)
+
+    monkeypatch.setattr(service.object_storage, "put_object", failing)
+    entries = storage.put(str(source), "backup", recursive=True)
+    assert len(entries) == 3
+    assert [name for name, error in storage.storage_dict["failed"]] == \
+        ["backup/file2"]
+
+
+def test_list_pages_through_the_prefix_without_head_object(storage,
+                                                           service,
+                                                           monkeypatch):
+    monkeypatch.setattr(service, "object_page_size", 10)
+    names = service.seed_objects(25, prefix="logs/", size=64)
+    service.seed_objects(5, prefix="other/")
+    entries = storage.list("logs")
+    assert [entry["fileName"] for entry in entries] == names
+    assert all(entry["contentLength"] == "64" and entry["md5"]
+               for entry in entries)
+    assert service.calls["list_objects"] == 3
+    assert service.calls["head_object"] == 0
+
+
+def test_list_and_search_read_metadata_on_request(storage, service):
+    names = service.seed_objects(3, prefix="logs/")
+    assert len(storage.list("logs", metadata=True)) == 3
+    assert service.calls["head_object"] == 3
+    found = storage.search(directory="logs", filename="file-000002")
+    assert [entry["fileName"] for entry in found] == [names[1]]
+    assert service.calls["head_object"] == 3
+
+
+def test_delete_removes_all_pages_of_a_prefix(storage, service,
+                                              monkeypatch):
+    monkeypatch.setattr(service, "object_page_size", 10)
+    service.seed_objects(25, prefix="build/")
+    service.seed_objects(2, prefix="keep/")
+    entries = storage.delete("build")
+    assert len(entries) == 25
+    assert sorted(service.object_storage.store("home").objects) == \
+        ["keep/file-000001", "keep/file-000002"]
+    assert service.calls["head_object"] == 0
+
+
+def test_delete_objects_continues_after_failures(storage, service,
+                                                 monkeypatch):
+    names = service.seed_objects(6, prefix="build/")
+    delete_object = service.object_storage.delete_object
+
+    def failing(namespace, bucket, name, *args, **kwargs):
+        if name == names[2]:
+            raise oci.exceptions.ServiceError(500, "InternalError", {},
+                                              "broken")
+        return delete_object(namespace, bucket, name, *args, **kwargs)
+
+    monkeypatch.setattr(service.object_storage, "delete_object", failing)
+    objs = list(storage.list_objects_iter(prefix="build/"))
+    deleted, failed = storage.delete_objects(objs, workers=3)
+    assert len(deleted) == 5
+    assert [name for name, error in failed] == [names[2]]
+    assert list(service.object_storage.store("home").objects) == [names[2]]
+
+
+def test_async_put_and_get_move_files_in_chunks(storage, service,
+                                                tmp_path):
+    from cloudmesh.oracle.storage.AsyncProvider import AsyncProvider
+
+    storage.multipart_threshold = 4096
+    storage.part_size = 4096
+    source = tmp_path / "source"
+    source.mkdir()
+    small = write(source / "small", 1000)
+    big = write(source / "big", 10000)
+    target = tmp_path / "target"
+    target.mkdir()
+
+    async def transfer():
+        async with AsyncProvider(provider=storage) as provider:
+            provider.chunk_size = 512
+            uploaded = await provider.put(source=str(source),
+                                          destination="data",
+                                          recursive=True)
+            downloaded = await provider.get(source="data",
+                                            destination=str(target))
+            return uploaded, downloaded
+
+    uploaded, downloaded = asyncio.run(transfer())
+    assert sorted(entry["fileName"] for entry in uploaded) == \
+        ["data/big", "data/small"]
+    assert len(downloaded) == 2
+    assert service.calls["upload_part"] == 3
+    assert service.calls["put_object"] == 1
+    # one request for the small object and three ranges for the big one
+    assert service.calls["get_object"] == 4
+    for path in [small, big]:
+        with open(path, "rb") as f, \
+                open(target / os.path.basename(path), "rb") as g:
+            assert f.read() == g.read()
+    assert sorted(os.listdir(target)) == ["big", "small"]
+
+
+def test_async_upload_resumes_an_interrupted_upload(storage, service,
+                                                    monkeypatch, tmp_path):
+    from cloudmesh.oracle.storage.AsyncProvider import AsyncProvider
+
+    storage.multipart_threshold = 1024
+    storage.part_size = 1024
+    source = write(tmp_path / "big", 4096)
+    upload_part = service.object_storage.upload_part
+    state = {"failed": False}
+
+    def interrupted(*args, **kwargs):
+        if args[4] == 3 and not state["failed"]:
+            state["failed"] = True
+            raise oci.exceptions.ServiceError(500, "InternalError", {},
+                                              "broken")
+        return upload_part(*args, **kwargs)
+
+    monkeypatch.setattr(service.object_storage, "upload_part", interrupted)
+
+    async def upload():
+        async with AsyncProvider(provider=storage) as provider:
+            return await provider.upload_file(source, "big")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(upload())
+    assert service.calls["upload_part"] == 3
+    entry = asyncio.run(upload())
+    assert entry["contentLength"] == "4096"
+    # only the failed part is uploaded again
+    assert service.calls["upload_part"] == 4
+    assert service.calls["create_multipart_upload"] == 1